@@ -21,6 +21,8 @@ class Settings(BaseSettings):
     EVALUATOR_MODEL: str = "deepseek-chat"  # DeepSeek for evaluation (cost-effective)
     ANSWER_GEN_MODEL: str = "deepseek-chat"  # DeepSeek for answering
     EMBEDDING_MODEL: str = "text-embedding-3-large"  # OpenAI embeddings
+    EMBEDDING_PROVIDER: str = "openai"  # openai, or hashed_ngram (local, offline, sub-millisecond)
+    LOCAL_EMBEDDING_DIMENSION: int = 512  # hashed_ngram output dimension
 
     # Sampling Configuration
     DEFAULT_SAMPLE_SIZE: int = 100
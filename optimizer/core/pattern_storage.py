@@ -17,16 +17,22 @@ from optimizer.pattern_db.embedder import Embedder
 class PatternStorage:
     """Store and retrieve error patterns using vector similarity search"""
 
-    def __init__(self):
+    def __init__(self, embedder: Optional[Embedder] = None):
+        """
+        Args:
+            embedder: Embedder to index and search with (default: EMBEDDING_PROVIDER)
+        """
         self.settings = get_settings()
-        self.embedder = Embedder()
+        self.embedder = embedder or Embedder()
 
         # Storage paths
         self.storage_dir = Path(self.settings.CACHE_DIR) / "error_patterns"
         self.storage_dir.mkdir(parents=True, exist_ok=True)
 
+        # Patterns are shared; each embedding provider has its own index
+        index_tag = self.embedder.provider.index_tag
         self.patterns_file = self.storage_dir / "patterns.json"
-        self.index_file = self.storage_dir / "patterns.index"
+        self.index_file = self.storage_dir / (f"patterns.{index_tag}.index" if index_tag else "patterns.index")
 
         # In-memory storage
         self.patterns: List[Dict[str, Any]] = []
@@ -51,9 +57,47 @@ class PatternStorage:
                 logger.warning(f"Failed to load patterns: {e}. Starting fresh.")
                 self.patterns = []
                 self.index = None
+        elif self.patterns_file.exists() and not self.embedder.provider.remote:
+            # Local embeddings are free: index the stored patterns with this provider
+            try:
+                with open(self.patterns_file, 'r', encoding='utf-8') as f:
+                    self.patterns = json.load(f)
+                self._rebuild_index()
+            except Exception as e:
+                logger.warning(f"Failed to index patterns locally: {e}. Starting fresh.")
+                self.patterns = []
+                self.index = None
         else:
             logger.info("No existing error patterns found. Starting fresh.")
 
+        # A local index is stale if LOCAL_EMBEDDING_DIMENSION changed or patterns were
+        # added through another provider since it was built
+        if (
+            self.index is not None
+            and not self.embedder.provider.remote
+            and (self.index.d != self.embedder.dimension or self.index.ntotal != len(self.patterns))
+        ):
+            logger.info(
+                f"Local pattern index is stale ({self.index.ntotal} x {self.index.d}, "
+                f"expected {len(self.patterns)} x {self.embedder.dimension})"
+            )
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Re-embed every stored pattern with the current provider and save the new index"""
+        descriptions = [p['description'] for p in self.patterns]
+        provider = self.embedder.provider
+        if not getattr(provider, 'fitted', True):
+            provider.fit(descriptions)
+
+        self.index = faiss.IndexFlatL2(self.embedder.dimension)
+        if descriptions:
+            embeddings = self.embedder.embed_batch(descriptions, show_progress=False)
+            self.index.add(np.array(embeddings, dtype=np.float32))
+        self._save()
+
+        logger.info(f"Indexed {len(self.patterns)} error patterns with the {provider.name} embedding provider")
+
     def _save(self):
         """Save patterns and index to disk"""
         try:
@@ -168,13 +212,48 @@ class PatternStorage:
             logger.debug("No patterns in storage yet")
             return []
 
+        try:
+            # Embed the question
+            query_embedding = self.embedder.embed(question)
+        except Exception as e:
+            logger.error(f"Failed to retrieve patterns: {e}")
+            return []
+
+        return self.search(query_embedding, k=k, category=category, min_severity=min_severity, threshold=threshold)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        category: Optional[str] = None,
+        min_severity: str = "minor",
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve top-k most relevant error patterns for an already embedded question.
+
+        Lets callers embed the question themselves (e.g. asynchronously, with
+        their own cache) and only run the FAISS search here.
+
+        Args:
+            query_embedding: Embedding of the question
+            k: Number of patterns to retrieve
+            category: Optional filter by category (diseases, vaccines, etc.)
+            min_severity: Minimum severity to include (critical > major > minor)
+            threshold: Minimum relevance score (0-1, uses PATTERN_RELEVANCE_THRESHOLD if None)
+
+        Returns:
+            List of relevant patterns sorted by relevance (may be empty if none meet threshold)
+        """
+        if self.index is None or len(self.patterns) == 0:
+            logger.debug("No patterns in storage yet")
+            return []
+
         # Get threshold from settings if not provided
         if threshold is None:
             threshold = getattr(self.settings, 'PATTERN_RELEVANCE_THRESHOLD', 0.0)
 
         try:
-            # Embed the question
-            query_embedding = self.embedder.embed(question)
             query_np = np.array([query_embedding], dtype=np.float32)
 
             # Search for similar patterns (get more than k for filtering)
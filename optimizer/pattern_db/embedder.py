@@ -1,29 +1,45 @@
 """
 Text embedding service with caching.
+
+Embeddings come from a pluggable provider (EMBEDDING_PROVIDER, see
+`embedding_providers`): the OpenAI API by default, or a local offline backend.
+Only remote providers' embeddings are cached on disk.
 """
 
 import pickle
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 from loguru import logger
 import hashlib
 
-from autoeval.services.api_client import get_api_client
 from autoeval.config.settings import get_settings
+from optimizer.pattern_db.embedding_providers import EmbeddingProvider, get_embedding_provider
 
 
 class Embedder:
     """Text embedding service with disk caching"""
 
-    def __init__(self):
+    def __init__(self, provider: Optional[EmbeddingProvider] = None):
+        """
+        Args:
+            provider: Embedding provider (default: EMBEDDING_PROVIDER)
+        """
         self.settings = get_settings()
-        self.api_client = get_api_client()
+        self.provider = provider or get_embedding_provider()
         self.cache_file = Path(self.settings.CACHE_DIR) / "embeddings" / "embedding_cache.pkl"
         self.cache: Dict[str, List[float]] = {}
 
-        if self.settings.USE_EMBEDDING_CACHE:
+        # Local embeddings are cheaper to recompute than to look up and persist
+        self.use_cache = self.settings.USE_EMBEDDING_CACHE and self.provider.remote
+
+        if self.use_cache:
             self._load_cache()
 
+    @property
+    def dimension(self) -> int:
+        """Length of the embedding vectors"""
+        return self.provider.dimension
+
     def _load_cache(self):
         """Load embedding cache from disk"""
         if self.cache_file.exists():
@@ -39,7 +55,7 @@ class Embedder:
 
     def _save_cache(self):
         """Save embedding cache to disk"""
-        if not self.settings.USE_EMBEDDING_CACHE:
+        if not self.use_cache:
             return
 
         try:
@@ -89,15 +105,15 @@ class Embedder:
         cache_key = self._get_cache_key(text)
 
         # Check cache
-        if self.settings.USE_EMBEDDING_CACHE and cache_key in self.cache:
+        if self.use_cache and cache_key in self.cache:
             logger.debug("Cache hit")
             return self.cache[cache_key]
 
         # Generate embedding
-        embedding = self.api_client.get_embedding(text)
+        embedding = self.provider.embed(text)
 
         # Save to cache
-        if self.settings.USE_EMBEDDING_CACHE:
+        if self.use_cache:
             self.cache[cache_key] = embedding
             self._save_cache()
 
@@ -128,26 +144,26 @@ class Embedder:
 
                 cache_key = self._get_cache_key(text)
 
-                if self.settings.USE_EMBEDDING_CACHE and cache_key in self.cache:
+                if self.use_cache and cache_key in self.cache:
                     embeddings.append(self.cache[cache_key])
                     cache_hits += 1
                 else:
-                    embedding = self.api_client.get_embedding(text)
+                    embedding = self.provider.embed(text)
                     embeddings.append(embedding)
 
-                    if self.settings.USE_EMBEDDING_CACHE:
+                    if self.use_cache:
                         self.cache[cache_key] = embedding
 
             except Exception as e:
                 logger.error(f"Failed to embed text {i}: {e}")
                 logger.debug(f"Failed text preview: {text[:200]}...")
                 # Use zero vector as placeholder for failed embeddings
-                embeddings.append([0.0] * self.settings.EMBEDDING_DIMENSION)
+                embeddings.append([0.0] * self.dimension)
                 errors += 1
                 continue
 
         # Save cache after batch
-        if self.settings.USE_EMBEDDING_CACHE:
+        if self.use_cache:
             self._save_cache()
 
         logger.info(f"Batch complete: {cache_hits}/{len(texts)} cache hits, {errors} errors")
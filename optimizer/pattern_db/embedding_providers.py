@@ -0,0 +1,266 @@
+"""
+Pluggable embedding providers for Embedder.
+
+- openai: OpenAI embeddings API (EMBEDDING_MODEL, EMBEDDING_DIMENSION); a
+  network round-trip per uncached text
+- hashed_ngram: local, offline CPU embedding - character n-gram TF-IDF
+  (hashed, so no vocabulary) followed by a sparse random projection to
+  LOCAL_EMBEDDING_DIMENSION dimensions; well under a millisecond per question
+
+Vectors from different providers are not comparable, so every index built
+from embeddings is tagged with its provider (`index_tag`) and a provider only
+ever searches indexes built with it. Use tools/compare_embedding_recall.py to
+check how closely the local provider reproduces the remote model's rankings.
+"""
+
+import hashlib
+import json
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from loguru import logger
+
+from autoeval.config.settings import get_settings
+
+
+class EmbeddingProvider:
+    """Interface of an embedding backend"""
+
+    # Provider name (EMBEDDING_PROVIDER)
+    name = ''
+    # Whether embedding needs a network call (remote results are worth caching)
+    remote = False
+
+    @property
+    def dimension(self) -> int:
+        """Length of the embedding vectors"""
+        raise NotImplementedError
+
+    @property
+    def index_tag(self) -> str:
+        """Tag for index files built with this provider ('' keeps the original file names)"""
+        return self.name
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Embed one text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector
+        """
+        raise NotImplementedError
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts (one at a time unless the provider batches)"""
+        return [self.embed(text) for text in texts]
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API (the model stored indexes were originally built with)"""
+
+    name = 'openai'
+    remote = True
+
+    def __init__(self):
+        from autoeval.services.api_client import get_api_client
+
+        self.settings = get_settings()
+        self.api_client = get_api_client()
+
+    @property
+    def dimension(self) -> int:
+        return self.settings.EMBEDDING_DIMENSION
+
+    @property
+    def index_tag(self) -> str:
+        return ''
+
+    def embed(self, text: str) -> List[float]:
+        return self.api_client.get_embedding(text)
+
+
+# Whitespace runs collapse to one space before n-grams are taken
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Document-frequency buckets for the IDF table (n-grams are hashed, not stored)
+IDF_BUCKETS = 1 << 20
+
+
+def _ngram_hash(ngram: str) -> bytes:
+    return hashlib.blake2b(ngram.encode('utf-8'), digest_size=16).digest()
+
+
+class HashedNgramEmbeddingProvider(EmbeddingProvider):
+    """
+    Local character n-gram TF-IDF embeddings with a sparse random projection.
+
+    Features:
+    - Character n-grams (default 1-3), which suit Chinese text without a tokenizer
+    - Sublinear term frequency, optional IDF fitted on a corpus (`fit`)
+    - Each n-gram is projected onto `nonzeros` random +/-1 coordinates derived
+      from its hash, so no vocabulary or projection matrix is stored
+    - L2-normalized output (FAISS L2 distance then ranks like cosine similarity)
+    """
+
+    name = 'hashed_ngram'
+    remote = False
+
+    def __init__(
+        self,
+        dimension: int = 512,
+        ngram_range: Tuple[int, int] = (1, 3),
+        nonzeros: int = 4,
+        idf_path: Optional[Path] = None
+    ):
+        """
+        Initialize local embedding provider.
+
+        Args:
+            dimension: Output dimension (at most 65536)
+            ngram_range: Smallest and largest character n-gram
+            nonzeros: Coordinates each n-gram is projected onto (at most 4)
+            idf_path: JSON file holding the fitted IDF table (loaded if present, written by fit)
+        """
+        self._dimension = dimension
+        self.ngram_range = ngram_range
+        self.nonzeros = nonzeros
+        self.idf_path = idf_path
+
+        self.idf: Dict[int, float] = {}
+        self.default_idf = 1.0
+        if idf_path is not None and idf_path.exists():
+            self._load_idf()
+
+        self._projection = lru_cache(maxsize=65536)(self._project_ngram)
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def fitted(self) -> bool:
+        """Whether an IDF table has been fitted or loaded"""
+        return bool(self.idf)
+
+    def _ngrams(self, text: str) -> Dict[str, int]:
+        """Character n-gram counts of a normalized text"""
+        text = _WHITESPACE_RE.sub(' ', text.lower()).strip()
+        counts: Dict[str, int] = {}
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            for i in range(len(text) - n + 1):
+                ngram = text[i:i + n]
+                if ngram != ' ':
+                    counts[ngram] = counts.get(ngram, 0) + 1
+        return counts
+
+    def _project_ngram(self, ngram: str) -> Tuple[Tuple[int, ...], Tuple[int, ...], int]:
+        """(coordinates, signs, IDF bucket) of an n-gram, all derived from its hash"""
+        digest = _ngram_hash(ngram)
+        positions = tuple(
+            int.from_bytes(digest[2 * i:2 * i + 2], 'little') % self._dimension
+            for i in range(self.nonzeros)
+        )
+        sign_bits = digest[15]
+        signs = tuple(1 if (sign_bits >> i) & 1 else -1 for i in range(self.nonzeros))
+        bucket = int.from_bytes(digest[8:12], 'little') % IDF_BUCKETS
+        return positions, signs, bucket
+
+    def embed(self, text: str) -> List[float]:
+        vector = [0.0] * self._dimension
+        for ngram, count in self._ngrams(text).items():
+            positions, signs, bucket = self._projection(ngram)
+            weight = (1.0 + math.log(count)) * self.idf.get(bucket, self.default_idf)
+            for position, sign in zip(positions, signs):
+                vector[position] += sign * weight
+
+        norm = math.sqrt(sum(value * value for value in vector))
+        if norm > 0:
+            vector = [value / norm for value in vector]
+        return vector
+
+    def fit(self, corpus: Iterable[str]):
+        """
+        Fit the IDF table on a corpus (e.g. the stored pattern descriptions) and save it.
+
+        Embeddings change after fitting: rebuild indexes built before.
+
+        Args:
+            corpus: Documents to count n-gram document frequencies in
+        """
+        doc_freq: Dict[int, int] = {}
+        documents = 0
+        for text in corpus:
+            documents += 1
+            for bucket in {self._projection(ngram)[2] for ngram in self._ngrams(text)}:
+                doc_freq[bucket] = doc_freq.get(bucket, 0) + 1
+
+        self.idf = {
+            bucket: math.log((1 + documents) / (1 + df)) + 1.0
+            for bucket, df in doc_freq.items()
+        }
+        # Unseen n-grams are as informative as the rarest ones
+        self.default_idf = math.log(1 + documents) + 1.0
+        logger.info(f"Fitted local embedding IDF on {documents} documents ({len(self.idf)} n-gram buckets)")
+
+        if self.idf_path is not None:
+            self._save_idf()
+
+    def _load_idf(self):
+        try:
+            with open(self.idf_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.idf = {int(bucket): value for bucket, value in state['idf'].items()}
+            self.default_idf = state['default_idf']
+            logger.info(f"Loaded local embedding IDF ({len(self.idf)} n-gram buckets)")
+        except Exception as e:
+            logger.warning(f"Failed to load local embedding IDF: {e}. Using term frequency only.")
+            self.idf = {}
+            self.default_idf = 1.0
+
+    def _save_idf(self):
+        try:
+            self.idf_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.idf_path, 'w', encoding='utf-8') as f:
+                json.dump({'default_idf': self.default_idf, 'idf': self.idf}, f)
+        except Exception as e:
+            logger.warning(f"Failed to save local embedding IDF: {e}")
+
+
+EMBEDDING_PROVIDERS = ('openai', 'hashed_ngram')
+
+# Providers by name (shared by every Embedder)
+_providers: Dict[str, EmbeddingProvider] = {}
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Get an embedding provider.
+
+    Args:
+        name: 'openai' or 'hashed_ngram' (default: EMBEDDING_PROVIDER)
+
+    Returns:
+        Shared provider instance
+    """
+    settings = get_settings()
+    name = name or settings.EMBEDDING_PROVIDER
+    if name not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{name}' (expected one of {', '.join(EMBEDDING_PROVIDERS)})")
+
+    provider = _providers.get(name)
+    if provider is None:
+        if name == 'hashed_ngram':
+            provider = HashedNgramEmbeddingProvider(
+                dimension=settings.LOCAL_EMBEDDING_DIMENSION,
+                idf_path=Path(settings.CACHE_DIR) / "embeddings" / "hashed_ngram_idf.json"
+            )
+        else:
+            provider = OpenAIEmbeddingProvider()
+        _providers[name] = provider
+    return provider
@@ -20,15 +20,17 @@ class VectorStore:
     def __init__(self):
         self.settings = get_settings()
         self.embedder = get_embedder()
-        self.dimension = self.settings.EMBEDDING_DIMENSION
+        self.dimension = self.embedder.dimension
 
         self.index = None
         self.metadata: List[Dict] = []
         self.texts: List[str] = []
 
-        self.index_path = Path(self.settings.CACHE_DIR) / "vector_store" / "index.faiss"
-        self.metadata_path = Path(self.settings.CACHE_DIR) / "vector_store" / "metadata.pkl"
-        self.texts_path = Path(self.settings.CACHE_DIR) / "vector_store" / "texts.pkl"
+        # Each embedding provider gets its own index (vectors are not comparable across providers)
+        store_dir = Path(self.settings.CACHE_DIR) / "vector_store" / self.embedder.provider.index_tag
+        self.index_path = store_dir / "index.faiss"
+        self.metadata_path = store_dir / "metadata.pkl"
+        self.texts_path = store_dir / "texts.pkl"
 
     def build(self, entities_dict: Dict[str, List[MedicalEntity]], show_progress: bool = True):
         """
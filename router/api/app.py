@@ -2,6 +2,9 @@
 FastAPI application for Smart Router API.
 """
 
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
@@ -9,7 +12,7 @@ from loguru import logger
 import sys
 
 from router.api.schemas import (
-    RouteRequest, RouteResponse, WeaknessPattern,
+    RouteRequest, RouteResponse, BatchRouteRequest, BatchRouteResponse,
     PromptRequest, PromptResponse,
     HealthResponse, StatsResponse, ReloadResponse
 )
@@ -17,9 +20,25 @@ from router.api.llm_schemas import (
     ChatCompletionRequest, ChatCompletionResponse,
     ChatMessage, ErrorResponse
 )
+from router.api.responses import FastJSONResponse, GuardedStreamingResponse
 from router.core.decision_engine import get_decision_engine, reload_decision_engine
-from router.utils.prompt_builder import PromptBuilder
-from router.services.llm_client import get_llm_client
+from router.core.data_watcher import get_data_watcher
+from router.core.latency_budget import (
+    PATTERN_RETRIEVAL, PROMPT_BUILD, ROUTING, WEAKNESS_ENHANCEMENT, LatencyBudget,
+    get_stage_latencies, start_latency_budget, upstream_stage
+)
+from router.core.routing_executor import get_routing_executor
+from router.services.llm_client import get_llm_client, with_routing_decision
+from router.services.admission import AdmissionMiddleware, get_admission_controller
+from router.services.concurrency import UpstreamBusyError
+from router.services.pattern_retrieval import format_pattern_context, get_pattern_retriever
+from router.services.response_cache import completion_fingerprint, data_version, get_response_cache, is_deterministic
+from router.services.single_flight import get_single_flight
+from router.utils.prompt_builder import get_prompt_cache
+from router.utils.token_estimator import estimate_tokens
+from router.utils.metrics import (
+    InFlightMiddleware, metrics_enabled, monitor_event_loop_lag, start_metrics_server
+)
 from router.config.settings import get_router_settings
 from fastapi.responses import StreamingResponse
 
@@ -39,9 +58,13 @@ def create_app() -> FastAPI:
         description="Intelligent routing for LLM queries with weakness pattern matching",
         version="1.0.0",
         docs_url="/docs",
-        redoc_url="/redoc"
+        redoc_url="/redoc",
+        default_response_class=FastJSONResponse
     )
 
+    # Shed chat completions beyond the in-flight cap (added first so CORS headers wrap rejections)
+    app.add_middleware(AdmissionMiddleware)
+
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -51,6 +74,15 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # In-flight request gauges (exported with the other metrics on METRICS_PORT)
+    app.add_middleware(InFlightMiddleware)
+
+    def inline_reload_enabled() -> bool:
+        """Per-request hot-reload checks are only needed when no background watcher runs"""
+        return settings.ENABLE_HOT_RELOAD and not get_data_watcher().is_running()
+
+    background_tasks = []
+
     # Initialize components on startup
     @app.on_event("startup")
     async def startup_event():
@@ -66,6 +98,24 @@ def create_app() -> FastAPI:
         logger.info(f"✓ Loaded {stats['total_entities']} entities")
         logger.info(f"✓ Loaded {stats['weakness_patterns']} weakness patterns")
         logger.info(f"✓ Hot-reload: {'enabled' if settings.ENABLE_HOT_RELOAD else 'disabled'}")
+
+        executor = get_routing_executor()
+        logger.info(f"✓ Routing execution: {executor.mode} (pool size {executor.max_workers})")
+
+        # Watch data files in the background instead of on every request
+        if settings.ENABLE_HOT_RELOAD:
+            get_data_watcher().start()
+
+        # Load the error-pattern store (FAISS index) off the event loop
+        if settings.ENABLE_PATTERN_RETRIEVAL:
+            retriever = await asyncio.to_thread(get_pattern_retriever)
+            logger.info(f"✓ Pattern retrieval: {'enabled' if retriever is not None else 'unavailable'}")
+
+        # Prometheus metrics on a separate port
+        start_metrics_server()
+        if metrics_enabled():
+            background_tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+
         logger.info(f"🚀 Router API running on http://{settings.HOST}:{settings.PORT}")
         logger.info("=" * 60)
 
@@ -73,11 +123,15 @@ def create_app() -> FastAPI:
     async def shutdown_event():
         """Cleanup on shutdown"""
         logger.info("Smart Router API shutting down...")
+        get_data_watcher().stop()
+        for task in background_tasks:
+            task.cancel()
+        get_routing_executor().shutdown()
 
     # ===== API Endpoints =====
 
     @app.post("/api/v1/route", response_model=RouteResponse, tags=["Routing"])
-    async def route_question(request: RouteRequest) -> RouteResponse:
+    async def route_question(request: RouteRequest) -> FastJSONResponse:
         """
         Get routing decision for a question.
 
@@ -89,36 +143,54 @@ def create_app() -> FastAPI:
         The router automatically checks for data updates if hot-reload is enabled.
         """
         try:
-            engine = get_decision_engine()
-
-            decision = engine.get_routing_decision(
+            decision = await get_routing_executor().get_routing_decision(
                 question=request.question,
                 entity_type=request.entity_type,
                 min_confidence=request.min_confidence or 0.70,
-                auto_reload=settings.ENABLE_HOT_RELOAD
+                auto_reload=inline_reload_enabled()
             )
 
-            # Convert weakness patterns to schema
-            weakness_patterns = [
-                WeaknessPattern(**pattern)
-                for pattern in decision['weakness_patterns']
-            ]
+            # Response models stay declared for the OpenAPI docs; the payload is
+            # rendered directly (weakness patterns are pre-serialized per snapshot)
+            return FastJSONResponse(_route_payload(decision))
 
-            return RouteResponse(
-                use_patterns=decision['use_patterns'],
-                rag_reason=decision['rag_reason'],
-                rag_confidence=decision['rag_confidence'],
-                weakness_patterns=weakness_patterns,
-                has_weaknesses=decision['has_weaknesses'],
-                last_reload_check=decision['last_reload_check']
+        except Exception as e:
+            logger.error(f"Routing error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.post("/api/v1/route:batch", response_model=BatchRouteResponse, tags=["Routing"])
+    async def route_batch(request: BatchRouteRequest) -> FastJSONResponse:
+        """
+        Get routing decisions for many questions in one call.
+
+        Uses the same decision engine as /api/v1/route: all questions are
+        routed against one routing snapshot, repeated questions are computed
+        once, and the batch is split across the routing pool.
+        """
+        if len(request.items) > settings.BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch too large: {len(request.items)} items (max {settings.BATCH_MAX_ITEMS})"
             )
 
+        try:
+            decisions = await get_routing_executor().get_routing_decisions(
+                items=[(item.question, item.entity_type) for item in request.items],
+                min_confidence=request.min_confidence or 0.70,
+                auto_reload=inline_reload_enabled()
+            )
+
+            return FastJSONResponse({
+                'count': len(decisions),
+                'results': [_route_payload(decision) for decision in decisions]
+            })
+
         except Exception as e:
-            logger.error(f"Routing error: {e}")
+            logger.error(f"Batch routing error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
 
     @app.post("/api/v1/prompt", response_model=PromptResponse, tags=["Routing"])
-    async def get_enhanced_prompt(request: PromptRequest) -> PromptResponse:
+    async def get_enhanced_prompt(request: PromptRequest) -> FastJSONResponse:
         """
         Get enhanced prompt with weakness patterns injected.
 
@@ -130,43 +202,34 @@ def create_app() -> FastAPI:
         Use this endpoint to get a complete prompt for your LLM call.
         """
         try:
-            engine = get_decision_engine()
-            prompt_builder = PromptBuilder()
+            executor = get_routing_executor()
 
             # Get routing decision
-            decision = engine.get_routing_decision(
+            decision = await executor.get_routing_decision(
                 question=request.question,
                 entity_type=request.entity_type,
-                auto_reload=settings.ENABLE_HOT_RELOAD
+                auto_reload=inline_reload_enabled()
             )
 
+            # Keep only the weakness reminders that fit the token budget
+            weakness_patterns = decision['weakness_patterns']
+            budget = _prompt_token_budget(request.max_prompt_tokens, decision['routing_tier'])
+            if budget is not None and weakness_patterns:
+                weakness_patterns, _ = await executor.fit_prompt_budget(request.base_prompt, weakness_patterns, budget)
+
             # Build enhanced prompt
-            enhanced_prompt = prompt_builder.build_prompt(
+            enhanced_prompt = await executor.build_prompt(
                 base_prompt=request.base_prompt,
-                weakness_patterns=decision['weakness_patterns']
+                weakness_patterns=weakness_patterns
             )
 
-            # Convert for response
-            weakness_patterns = [
-                WeaknessPattern(**pattern)
-                for pattern in decision['weakness_patterns']
-            ]
-
-            routing_response = RouteResponse(
-                use_patterns=decision['use_patterns'],
-                rag_reason=decision['rag_reason'],
-                rag_confidence=decision['rag_confidence'],
-                weakness_patterns=weakness_patterns,
-                has_weaknesses=decision['has_weaknesses'],
-                last_reload_check=decision['last_reload_check']
-            )
-
-            return PromptResponse(
-                enhanced_prompt=enhanced_prompt,
-                use_patterns=decision['use_patterns'],
-                weakness_patterns_applied=len(decision['weakness_patterns']),
-                routing_decision=routing_response
-            )
+            return FastJSONResponse({
+                'enhanced_prompt': enhanced_prompt,
+                'estimated_tokens': estimate_tokens(enhanced_prompt),
+                'use_patterns': decision['use_patterns'],
+                'weakness_patterns_applied': len(weakness_patterns),
+                'routing_decision': _route_payload(decision)
+            })
 
         except Exception as e:
             logger.error(f"Prompt building error: {e}")
@@ -223,18 +286,38 @@ def create_app() -> FastAPI:
         try:
             engine = get_decision_engine()
             stats = engine.get_stats()
-
-            return StatsResponse(**stats)
+            response_cache = get_response_cache()
+            prompt_cache = get_prompt_cache()
+            admission = get_admission_controller()
+            retriever = get_pattern_retriever()
+
+            return StatsResponse(
+                **stats,
+                data_watcher=get_data_watcher().get_stats(),
+                routing_executor=get_routing_executor().get_stats(),
+                prompt_cache=prompt_cache.get_stats() if prompt_cache is not None else None,
+                admission=admission.get_stats() if admission is not None else None,
+                upstream_limiters=get_llm_client().get_stats(),
+                upstream_resilience=get_llm_client().get_resilience_stats(),
+                upstream_prefix_cache=get_llm_client().get_prefix_cache_stats(),
+                pattern_retrieval=retriever.get_stats() if retriever is not None else None,
+                stage_latencies=get_stage_latencies().get_stats(),
+                response_cache=response_cache.get_stats() if response_cache is not None else None,
+                single_flight=get_single_flight().get_stats()
+            )
 
         except Exception as e:
             logger.error(f"Stats error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
 
     @app.post("/api/v1/reload", response_model=ReloadResponse, tags=["Management"])
-    async def force_reload() -> ReloadResponse:
+    def force_reload() -> ReloadResponse:
         """
         Force reload of router data.
 
+        Runs in FastAPI's threadpool, so rebuilding the snapshot does not
+        block the event loop.
+
         This endpoint:
         - Checks if data files have been updated
         - Reloads if updates detected
@@ -254,6 +337,9 @@ def create_app() -> FastAPI:
                 engine = reload_decision_engine()
                 reloaded = True
 
+            # Process-mode routing workers hold their own copy of the data
+            get_routing_executor().restart()
+
             stats = engine.get_stats()
 
             return ReloadResponse(
@@ -288,6 +374,9 @@ def create_app() -> FastAPI:
         - x_min_confidence: Minimum pattern retrieval confidence threshold (default: 0.70)
         - x_disable_routing: Skip routing, call LLM directly (default: False)
         - x_disable_weaknesses: Skip weakness patterns (default: False)
+        - x_timeout_ms: Deadline for the request; upstream work is cancelled when it passes
+        - x_latency_budget_ms: Time to the start of the response; optional stages
+          that would not fit are skipped (listed in x_routing_decision.skipped_stages)
 
         Example usage:
         ```python
@@ -307,19 +396,21 @@ def create_app() -> FastAPI:
         )
         ```
         """
+        deadline = _request_deadline(request)
+        latency_budget = start_latency_budget(request.x_latency_budget_ms, request.model, request.stream)
         try:
             # Handle streaming separately
             if request.stream:
-                return await _handle_streaming_completion(request)
+                return await _handle_streaming_completion(request, deadline, latency_budget)
 
             # Disable routing if requested
             if request.x_disable_routing:
                 logger.info("Routing disabled, calling LLM directly")
-                llm_client = get_llm_client()
-                response = await llm_client.async_chat_completion(request, enhanced_messages=None)
-                response.x_routing_decision = None
-                response.x_enhanced_prompt_used = False
-                return response
+                response = await _with_deadline(
+                    _complete(request, enhanced_messages=None, routing_tier='disabled'),
+                    deadline
+                )
+                return _completion_response(response, decision=None, enhanced=False)
 
             # Step 1: Extract user question from messages
             user_messages = [m for m in request.messages if m.role == "user"]
@@ -328,81 +419,41 @@ def create_app() -> FastAPI:
 
             question = user_messages[-1].content  # Last user message
 
-            # Step 2: Get routing decision
+            # Step 2: Get routing decision (and relevant error patterns, concurrently)
             logger.info(f"Getting routing decision for: {question[:100]}...")
-            engine = get_decision_engine()
-            decision = engine.get_routing_decision(
-                question=question,
-                entity_type=request.x_entity_type,
-                min_confidence=request.x_min_confidence or 0.70,
-                auto_reload=settings.ENABLE_HOT_RELOAD
-            )
+            decision, rag_context = await _route_chat(request, question, latency_budget)
 
             logger.info(f"Routing decision: use_patterns={decision['use_patterns']}, "
                        f"confidence={decision['rag_confidence']:.2f}, "
                        f"weaknesses={len(decision['weakness_patterns'])}")
 
             # Step 3: Build enhanced prompt
-            enhanced_messages = None
-            if not request.x_disable_weaknesses and decision['weakness_patterns']:
-                prompt_builder = PromptBuilder()
-
-                # Find or create system message
-                system_message_idx = next(
-                    (i for i, m in enumerate(request.messages) if m.role == "system"),
-                    None
-                )
-
-                if system_message_idx is not None:
-                    # Enhance existing system prompt
-                    base_prompt = request.messages[system_message_idx].content
-                else:
-                    # Use default base prompt
-                    base_prompt = None
-
-                # Build enhanced prompt with weakness patterns
-                enhanced_system_prompt = prompt_builder.build_prompt(
-                    base_prompt=base_prompt,
-                    weakness_patterns=decision['weakness_patterns']
-                )
-
-                # Reconstruct messages with enhanced system prompt
-                enhanced_messages = []
-
-                # Add enhanced system message first
-                enhanced_messages.append(ChatMessage(
-                    role="system",
-                    content=enhanced_system_prompt
-                ))
+            enhanced_messages = await _enhance_messages(request, decision, rag_context, latency_budget)
+            decision = _with_skipped_stages(decision, latency_budget)
 
-                # Add other messages (skip original system if existed)
-                for i, msg in enumerate(request.messages):
-                    if msg.role != "system":
-                        enhanced_messages.append(msg)
-
-                logger.info(f"Enhanced prompt with {len(decision['weakness_patterns'])} weakness patterns")
-
-            # Step 4: Call LLM API
-            llm_client = get_llm_client()
-            response = await llm_client.async_chat_completion(
-                request=request,
-                enhanced_messages=enhanced_messages
+            # Step 4: Call LLM API (or serve a cached deterministic response)
+            response = await _with_deadline(
+                _complete(request, enhanced_messages, routing_tier=decision['routing_tier']),
+                deadline
             )
 
             # Step 5: Add routing metadata to response
-            response.x_routing_decision = decision
-            response.x_enhanced_prompt_used = enhanced_messages is not None
-
-            return response
+            return _completion_response(response, decision, enhanced=enhanced_messages is not None)
 
         except HTTPException:
             raise
+        except UpstreamBusyError as e:
+            raise _busy_error(e)
         except Exception as e:
             logger.error(f"Chat completion error: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def _handle_streaming_completion(request: ChatCompletionRequest):
-        """Handle streaming chat completion"""
+    async def _handle_streaming_completion(
+        request: ChatCompletionRequest,
+        deadline: Optional[float],
+        latency_budget: Optional[LatencyBudget]
+    ):
+        """Handle streaming chat completion (closing the upstream stream on disconnect or deadline)"""
         try:
             # Get routing decision first (same as non-streaming)
             user_messages = [m for m in request.messages if m.role == "user"]
@@ -416,53 +467,389 @@ def create_app() -> FastAPI:
             enhanced_messages = None
 
             if not request.x_disable_routing:
-                engine = get_decision_engine()
-                decision = engine.get_routing_decision(
-                    question=question,
-                    entity_type=request.x_entity_type,
-                    min_confidence=request.x_min_confidence or 0.70,
-                    auto_reload=settings.ENABLE_HOT_RELOAD
-                )
-                routing_decision = decision
+                decision, rag_context = await _route_chat(request, question, latency_budget)
 
                 # Build enhanced prompt if needed
-                if not request.x_disable_weaknesses and decision['weakness_patterns']:
-                    prompt_builder = PromptBuilder()
-
-                    system_message_idx = next(
-                        (i for i, m in enumerate(request.messages) if m.role == "system"),
-                        None
-                    )
-
-                    base_prompt = request.messages[system_message_idx].content if system_message_idx is not None else None
-                    enhanced_system_prompt = prompt_builder.build_prompt(
-                        base_prompt=base_prompt,
-                        weakness_patterns=decision['weakness_patterns']
-                    )
-
-                    enhanced_messages = [ChatMessage(role="system", content=enhanced_system_prompt)]
-                    for msg in request.messages:
-                        if msg.role != "system":
-                            enhanced_messages.append(msg)
+                enhanced_messages = await _enhance_messages(request, decision, rag_context, latency_budget)
+                routing_decision = _with_skipped_stages(decision, latency_budget)
+
+            # Replay a cached deterministic response as SSE
+            _, _, cached = await _cache_lookup(request, enhanced_messages)
+            if cached is not None:
+                return StreamingResponse(
+                    get_response_cache().replay_sse(cached, routing_decision),
+                    media_type="text/event-stream"
+                )
 
-            # Stream response
+            # Stream response (identical concurrent streams share one upstream stream)
             llm_client = get_llm_client()
 
-            return StreamingResponse(
-                llm_client.async_chat_completion_stream(
+            # Relay mode forwards upstream SSE bytes without re-encoding every chunk
+            stream_method = (
+                llm_client.async_chat_completion_relay if settings.STREAM_RELAY
+                else llm_client.async_chat_completion_stream
+            )
+
+            if settings.ENABLE_REQUEST_COALESCING and is_deterministic(request, settings.RESPONSE_CACHE_MAX_TEMPERATURE):
+                # The shared stream carries no routing metadata: each subscriber adds its own
+                stream = with_routing_decision(
+                    get_single_flight().stream(
+                        completion_fingerprint(request, enhanced_messages or request.messages, 'stream'),
+                        lambda: stream_method(request=request, enhanced_messages=enhanced_messages)
+                    ),
+                    routing_decision
+                )
+            else:
+                stream = stream_method(
                     request=request,
                     enhanced_messages=enhanced_messages,
                     routing_decision=routing_decision
-                ),
+                )
+
+            # Wait for the first chunk before sending headers, so a full
+            # upstream queue or a failed upstream call still maps to an HTTP error
+            start = time.perf_counter()
+            try:
+                first_chunk = await _with_deadline(stream.__anext__(), deadline)
+            except BaseException:
+                await stream.aclose()
+                raise
+            get_stage_latencies().observe(upstream_stage(request.model, stream=True), time.perf_counter() - start)
+
+            return GuardedStreamingResponse(
+                _prepend(first_chunk, stream),
+                deadline=deadline,
                 media_type="text/event-stream"
             )
 
         except HTTPException:
             raise
+        except UpstreamBusyError as e:
+            raise _busy_error(e)
         except Exception as e:
             logger.error(f"Streaming completion error: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
 
+    async def _cache_lookup(request: ChatCompletionRequest, enhanced_messages):
+        """
+        Look up the response cache for a request.
+
+        Returns:
+            (key, data version, cached response); key is None if the request is not cacheable
+        """
+        cache = get_response_cache()
+        if cache is None or not cache.accepts(request):
+            return None, None, None
+
+        version = data_version(get_decision_engine().snapshot)
+        key = cache.make_key(request, enhanced_messages or request.messages, version)
+        return key, version, await cache.async_get(key)
+
+    def _prompt_token_budget(requested: Optional[int], routing_tier: str) -> Optional[int]:
+        """Prompt token budget: the tier's (or global) budget, tightened by the request's own"""
+        configured = settings.TIER_MAX_PROMPT_TOKENS.get(routing_tier, settings.MAX_PROMPT_TOKENS)
+        budgets = [budget for budget in (requested, configured) if budget is not None]
+        return min(budgets) if budgets else None
+
+    async def _route_chat(
+        request: ChatCompletionRequest,
+        question: str,
+        latency_budget: Optional[LatencyBudget]
+    ):
+        """
+        Routing decision for a chat completion, with pattern retrieval running alongside.
+
+        Routing always runs (it is far below any latency budget). Pattern
+        retrieval starts first so its embeddings call overlaps weakness
+        matching; its result is used only if the decision asks for patterns.
+
+        Returns:
+            (decision, pattern context or None)
+        """
+        retrieval = _start_pattern_retrieval(request, question, latency_budget)
+
+        start = time.perf_counter()
+        try:
+            decision = await get_routing_executor().get_routing_decision(
+                question=question,
+                entity_type=request.x_entity_type,
+                min_confidence=request.x_min_confidence or 0.70,
+                auto_reload=inline_reload_enabled()
+            )
+        except BaseException:
+            if retrieval is not None:
+                retrieval.cancel()
+            raise
+        get_stage_latencies().observe(ROUTING, time.perf_counter() - start)
+
+        return decision, await _pattern_context(retrieval, decision, latency_budget)
+
+    def _start_pattern_retrieval(
+        request: ChatCompletionRequest,
+        question: str,
+        latency_budget: Optional[LatencyBudget]
+    ) -> Optional[asyncio.Task]:
+        """Start retrieving error patterns for a question (None if disabled or over the latency budget)"""
+        retriever = get_pattern_retriever()
+        if retriever is None:
+            return None
+
+        timeout = settings.PATTERN_RETRIEVAL_TIMEOUT
+        if latency_budget is not None:
+            if not latency_budget.admit(PATTERN_RETRIEVAL):
+                return None
+            timeout = min(timeout, latency_budget.slack())
+        return asyncio.create_task(retriever.retrieve(question, request.x_entity_type, timeout))
+
+    async def _pattern_context(
+        retrieval: Optional[asyncio.Task],
+        decision: Dict[str, Any],
+        latency_budget: Optional[LatencyBudget]
+    ) -> Optional[str]:
+        """Prompt context from a started retrieval, if the decision asks for patterns"""
+        if retrieval is None:
+            return None
+        if not decision['use_patterns']:
+            get_pattern_retriever().discard(retrieval)
+            return None
+
+        patterns = await retrieval
+        if patterns is None:
+            if latency_budget is not None:
+                latency_budget.skip(PATTERN_RETRIEVAL, "no result within the retrieval timeout")
+            return None
+        logger.info(f"Retrieved {len(patterns)} error patterns")
+        return format_pattern_context(patterns)
+
+    def _with_skipped_stages(decision: Dict[str, Any], latency_budget: Optional[LatencyBudget]) -> Dict[str, Any]:
+        """Decision reported to the client, listing the stages its latency budget skipped"""
+        if latency_budget is None:
+            return decision
+        # Copied: the decision itself may be shared through the decision cache
+        return dict(decision, skipped_stages=latency_budget.skipped)
+
+    def _affordable_prompt_tokens(
+        latency_budget: LatencyBudget,
+        base_prompt: Optional[str],
+        stages: List[str]
+    ) -> Optional[int]:
+        """
+        Largest enhanced system prompt the latency budget can pay for.
+
+        Prompt additions cost the prompt build plus the upstream prefill of
+        the tokens they add (priced at ROUTER_PREFILL_TOKENS_PER_SECOND).
+
+        Args:
+            latency_budget: The request's latency budget
+            base_prompt: The request's system prompt (None: the default is added)
+            stages: Stages whose additions are at stake (recorded as skipped if none fit)
+
+        Returns:
+            Token cap for the enhanced system prompt, or None if the budget
+            cannot pay for any addition
+        """
+        build_time = get_stage_latencies().estimate(PROMPT_BUILD) or 0.0
+        slack = latency_budget.slack() - build_time
+        affordable = int(slack * settings.PREFILL_TOKENS_PER_SECOND)
+        if affordable <= 0:
+            for stage in stages:
+                latency_budget.skip(stage, f"no time for prompt additions, {latency_budget.describe(slack)}")
+            return None
+        # Without a system message, the default base prompt is itself an addition
+        return (estimate_tokens(base_prompt) if base_prompt else 0) + affordable
+
+    async def _enhance_messages(
+        request: ChatCompletionRequest,
+        decision: Dict[str, Any],
+        rag_context: Optional[str] = None,
+        latency_budget: Optional[LatencyBudget] = None
+    ) -> Optional[List[ChatMessage]]:
+        """
+        Messages sent upstream with weakness reminders and retrieved pattern
+        context applied (ROUTER_PROMPT_LAYOUT).
+
+        - inline: a single system message (the request's, or the default) with
+          the additions appended
+        - prefix_cache: the system message is left as is and the additions go
+          in a second system message just before the last user message, so the
+          system prompt and conversation history stay a prefix the upstream
+          can reuse across questions
+
+        Additions that do not fit the prompt token budget, or whose prefill the
+        latency budget cannot pay for, are left out (pattern context first);
+        returns None if none are left.
+        """
+        weakness_patterns = [] if request.x_disable_weaknesses else decision['weakness_patterns']
+        if not weakness_patterns and not rag_context:
+            return None
+
+        start = time.perf_counter()
+        executor = get_routing_executor()
+        system_message = next((m for m in request.messages if m.role == "system"), None)
+        base_prompt = system_message.content if system_message is not None else None
+        conversation = [m for m in request.messages if m.role != "system"]
+
+        budget = _prompt_token_budget(request.x_max_prompt_tokens, decision['routing_tier'])
+        latency_capped = False
+        if latency_budget is not None:
+            stages = [
+                stage for stage, additions in ((WEAKNESS_ENHANCEMENT, weakness_patterns), (PATTERN_RETRIEVAL, rag_context))
+                if additions
+            ]
+            affordable = _affordable_prompt_tokens(latency_budget, base_prompt, stages)
+            if affordable is None:
+                return None
+            latency_capped = budget is None or affordable < budget
+            budget = min(budget, affordable) if budget is not None else affordable
+        if budget is not None:
+            fitted, fitted_context = await executor.fit_prompt_budget(
+                base_prompt, weakness_patterns, budget, rag_context
+            )
+            if latency_capped:
+                affords = f"the latency budget affords a {budget}-token system prompt"
+                if rag_context and not fitted_context:
+                    latency_budget.skip(PATTERN_RETRIEVAL, f"pattern context dropped: {affords}")
+                if len(fitted) < len(weakness_patterns):
+                    latency_budget.skip(
+                        WEAKNESS_ENHANCEMENT,
+                        f"kept {len(fitted)} of {len(weakness_patterns)} reminders: {affords}"
+                    )
+            weakness_patterns, rag_context = fitted, fitted_context
+            if not weakness_patterns and not rag_context:
+                logger.info(f"No weakness patterns fit the {budget}-token prompt budget")
+                return None
+
+        logger.info(
+            f"Enhanced prompt with {len(weakness_patterns)} weakness patterns"
+            + (" and pattern context" if rag_context else "")
+        )
+        try:
+            return await _layout_messages(base_prompt, weakness_patterns, rag_context, conversation)
+        finally:
+            get_stage_latencies().observe(PROMPT_BUILD, time.perf_counter() - start)
+
+    async def _layout_messages(
+        base_prompt: Optional[str],
+        weakness_patterns: List[Dict[str, Any]],
+        rag_context: Optional[str],
+        conversation: List[ChatMessage]
+    ) -> List[ChatMessage]:
+        """Place the prompt additions according to ROUTER_PROMPT_LAYOUT"""
+        executor = get_routing_executor()
+
+        if settings.PROMPT_LAYOUT != "prefix_cache":
+            enhanced_system_prompt = await executor.build_prompt(
+                base_prompt=base_prompt,
+                weakness_patterns=weakness_patterns,
+                rag_context=rag_context
+            )
+            return [ChatMessage(role="system", content=enhanced_system_prompt)] + conversation
+
+        stable, dynamic = await executor.build_prompt_sections(
+            base_prompt=base_prompt,
+            weakness_patterns=weakness_patterns,
+            rag_context=rag_context
+        )
+        last_user_idx = max(
+            (i for i, m in enumerate(conversation) if m.role == "user"),
+            default=len(conversation)
+        )
+        return (
+            [ChatMessage(role="system", content=stable)]
+            + conversation[:last_user_idx]
+            + [ChatMessage(role="system", content=dynamic)]
+            + conversation[last_user_idx:]
+        )
+
+    async def _complete(
+        request: ChatCompletionRequest,
+        enhanced_messages,
+        routing_tier: str
+    ) -> ChatCompletionResponse:
+        """Call the LLM, serving identical deterministic requests from the response cache"""
+        key, version, cached = await _cache_lookup(request, enhanced_messages)
+        if cached is not None:
+            logger.info("Response cache hit")
+            return cached
+
+        def call():
+            return get_llm_client().async_chat_completion(
+                request=request,
+                enhanced_messages=enhanced_messages
+            )
+
+        start = time.perf_counter()
+        if not settings.ENABLE_REQUEST_COALESCING or not is_deterministic(request, settings.RESPONSE_CACHE_MAX_TEMPERATURE):
+            response, shared = await call(), False
+        else:
+            # Identical concurrent deterministic requests share one upstream call
+            response, shared = await get_single_flight().do(
+                completion_fingerprint(request, enhanced_messages or request.messages),
+                call
+            )
+
+        if not shared:
+            # Only the call that actually reached the upstream is accounted
+            get_stage_latencies().observe(upstream_stage(request.model, stream=False), time.perf_counter() - start)
+            get_llm_client().record_prefix_cache_usage(request.model, routing_tier, response.usage)
+            if key is not None:
+                get_response_cache().async_put(key, response, version)
+        return response
+
+    route_fields = tuple(RouteResponse.model_fields)
+
+    def _route_payload(decision: dict) -> dict:
+        """RouteResponse-shaped view of a routing decision (weakness matches passed through as-is)"""
+        return {name: decision[name] for name in route_fields}
+
+    def _completion_response(response: ChatCompletionResponse, decision, enhanced: bool) -> FastJSONResponse:
+        """Render a completion with router metadata, without re-validating the response model"""
+        payload = response.model_dump(exclude={'x_routing_decision', 'x_enhanced_prompt_used'})
+        payload['x_routing_decision'] = decision
+        payload['x_enhanced_prompt_used'] = enhanced
+        return FastJSONResponse(payload)
+
+    async def _prepend(first_chunk, stream):
+        """Yield an already received chunk, then the rest of the stream"""
+        try:
+            yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            # Closing this iterator (disconnect, deadline) closes the upstream stream now, not on GC
+            await stream.aclose()
+
+    def _request_deadline(request: ChatCompletionRequest) -> Optional[float]:
+        """Event-loop time by which a request must finish (ROUTER_REQUEST_TIMEOUT, tightened by x_timeout_ms)"""
+        timeouts = [
+            timeout for timeout in (
+                settings.REQUEST_TIMEOUT,
+                request.x_timeout_ms / 1000 if request.x_timeout_ms else None
+            )
+            if timeout is not None
+        ]
+        if not timeouts:
+            return None
+        return asyncio.get_running_loop().time() + min(timeouts)
+
+    async def _with_deadline(awaitable, deadline: Optional[float]):
+        """Await with the request deadline; the awaited upstream work is cancelled when it passes"""
+        if deadline is None:
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, max(0.0, deadline - asyncio.get_running_loop().time()))
+        except asyncio.TimeoutError:
+            logger.warning("Request deadline exceeded, upstream call cancelled")
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+    def _busy_error(error: UpstreamBusyError) -> HTTPException:
+        """Map a per-model upstream limiter rejection to 503 + Retry-After"""
+        return HTTPException(
+            status_code=503,
+            detail=str(error),
+            headers={"Retry-After": str(int(error.retry_after))}
+        )
+
     @app.get("/", tags=["General"])
     async def root():
         """Root endpoint"""
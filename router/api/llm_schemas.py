@@ -35,6 +35,9 @@ class ChatCompletionRequest(BaseModel):
     x_min_confidence: Optional[float] = Field(0.70, description="Minimum pattern retrieval confidence")
     x_disable_routing: Optional[bool] = Field(False, description="Disable smart routing")
     x_disable_weaknesses: Optional[bool] = Field(False, description="Disable weakness patterns")
+    x_timeout_ms: Optional[int] = Field(None, ge=1, description="Deadline for the whole request in milliseconds (upstream work is cancelled when it passes)")
+    x_max_prompt_tokens: Optional[int] = Field(None, ge=1, description="Token budget for the enhanced system prompt (lowest-value reminders are dropped to fit)")
+    x_latency_budget_ms: Optional[int] = Field(None, ge=1, description="Time to the start of the response in milliseconds; optional stages that do not fit are skipped and listed in x_routing_decision.skipped_stages")
 
 
 class ChatCompletionChoice(BaseModel):
@@ -44,12 +47,31 @@ class ChatCompletionChoice(BaseModel):
     finish_reason: Optional[Literal["stop", "length", "content_filter", "null"]] = Field(None)
 
 
+class PromptTokensDetails(BaseModel):
+    """Prompt token breakdown (OpenAI format)"""
+    cached_tokens: Optional[int] = Field(None, description="Prompt tokens served from the upstream prefix cache")
+
+
 class ChatCompletionUsage(BaseModel):
     """Token usage statistics"""
     prompt_tokens: int = Field(..., description="Tokens in prompt")
     completion_tokens: int = Field(..., description="Tokens in completion")
     total_tokens: int = Field(..., description="Total tokens used")
 
+    # Upstream prefix cache usage, passed through in the provider's own format
+    prompt_tokens_details: Optional[PromptTokensDetails] = Field(None, description="OpenAI: cached prompt tokens")
+    prompt_cache_hit_tokens: Optional[int] = Field(None, description="DeepSeek: prompt tokens hitting the context cache")
+    prompt_cache_miss_tokens: Optional[int] = Field(None, description="DeepSeek: prompt tokens missing the context cache")
+
+    @property
+    def cached_tokens(self) -> int:
+        """Prompt tokens served from the upstream prefix cache (either format)"""
+        if self.prompt_cache_hit_tokens is not None:
+            return self.prompt_cache_hit_tokens
+        if self.prompt_tokens_details is not None:
+            return self.prompt_tokens_details.cached_tokens or 0
+        return 0
+
 
 class ChatCompletionResponse(BaseModel):
     """OpenAI-compatible chat completion response"""
@@ -0,0 +1,104 @@
+"""
+Response classes for the Router API.
+"""
+
+import asyncio
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, StreamingResponse
+from loguru import logger
+
+from router.utils.json_codec import dumps
+from router.utils.metrics import STREAM_ABORTS
+
+
+# Final SSE frame of a stream cut off by its deadline (OpenAI SDKs raise it as an APIError)
+DEADLINE_EXCEEDED_FRAME = b"data: " + dumps({
+    'error': {
+        'message': 'Request deadline exceeded',
+        'type': 'timeout',
+        'param': None,
+        'code': 'deadline_exceeded'
+    }
+}) + b"\n\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with `router.utils.json_codec.dumps`.
+
+    Endpoints on the hot path return this directly with plain dict content,
+    which skips FastAPI's response-model validation and `jsonable_encoder`
+    pass. Weakness matches are spliced in from their pre-serialized form.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class GuardedStreamingResponse(StreamingResponse):
+    """
+    Streaming response that stops its body iterator as soon as the client
+    disconnects or the request deadline passes.
+
+    Starlette only notices a disconnect when the next send fails (ASGI spec
+    2.4+) and leaves closing the body iterator to garbage collection, so an
+    abandoned stream keeps pulling upstream tokens meanwhile. Here a
+    disconnect listener runs alongside the stream, and the iterator (and with
+    it the upstream stream) is closed explicitly however the response ends.
+    """
+
+    def __init__(self, content, deadline: Optional[float] = None, **kwargs):
+        """
+        Initialize response.
+
+        Args:
+            content: Async iterator of SSE chunks
+            deadline: Event-loop time (`loop.time()`) at which the stream is cut off
+            **kwargs: StreamingResponse arguments
+        """
+        super().__init__(content, **kwargs)
+        self.deadline = deadline
+
+    async def __call__(self, scope, receive, send):
+        started = False
+
+        async def tracked_send(message):
+            nonlocal started
+            started = True
+            await send(message)
+
+        timeout = None
+        if self.deadline is not None:
+            timeout = max(0.0, self.deadline - asyncio.get_running_loop().time())
+
+        streaming = asyncio.ensure_future(self.stream_response(tracked_send))
+        disconnected = asyncio.ensure_future(self.listen_for_disconnect(receive))
+        try:
+            done, _ = await asyncio.wait(
+                {streaming, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if streaming in done:
+                try:
+                    streaming.result()
+                except OSError:
+                    # Disconnect noticed by a failed send
+                    STREAM_ABORTS.labels(reason='disconnect').inc()
+                return
+
+            reason = 'disconnect' if disconnected in done else 'deadline'
+            STREAM_ABORTS.labels(reason=reason).inc()
+            logger.info(f"Stream aborted ({reason}), closing upstream stream")
+            streaming.cancel()
+            await asyncio.gather(streaming, return_exceptions=True)
+
+            if reason == 'deadline':
+                if not started:
+                    await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+                await send({'type': 'http.response.body', 'body': DEADLINE_EXCEEDED_FRAME, 'more_body': False})
+        finally:
+            streaming.cancel()
+            disconnected.cancel()
+            aclose = getattr(self.body_iterator, 'aclose', None)
+            if aclose is not None:
+                await aclose()
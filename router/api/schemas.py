@@ -47,16 +47,50 @@ class RouteResponse(BaseModel):
     last_reload_check: str = Field(..., description="Last time reload was checked (ISO format)")
 
 
+class BatchRouteItem(BaseModel):
+    """One question in a batch routing request"""
+    question: str = Field(..., description="User question", min_length=1)
+    entity_type: Optional[str] = Field(None, description="Entity type hint")
+
+
+class BatchRouteRequest(BaseModel):
+    """Request for routing decisions on many questions"""
+    items: List[BatchRouteItem] = Field(..., description="Questions to route (at most ROUTER_BATCH_MAX_ITEMS)", min_length=1)
+    min_confidence: Optional[float] = Field(0.70, description="Minimum confidence for pattern retrieval (0.0-1.0)", ge=0.0, le=1.0)
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "items": [
+                        {"question": "糖尿病有哪些症状？", "entity_type": "diseases"},
+                        {"question": "HPV疫苗打几针？"}
+                    ],
+                    "min_confidence": 0.70
+                }
+            ]
+        }
+    }
+
+
+class BatchRouteResponse(BaseModel):
+    """Routing decisions for a batch, in request order"""
+    count: int = Field(..., description="Number of decisions")
+    results: List[RouteResponse] = Field(..., description="One routing decision per item")
+
+
 class PromptRequest(BaseModel):
     """Request for enhanced prompt"""
     question: str = Field(..., description="User question", min_length=1)
     entity_type: Optional[str] = Field(None, description="Entity type hint")
     base_prompt: Optional[str] = Field(None, description="Base system prompt (if not provided, uses default)")
+    max_prompt_tokens: Optional[int] = Field(None, ge=1, description="Token budget for the enhanced prompt")
 
 
 class PromptResponse(BaseModel):
     """Response with enhanced prompt"""
     enhanced_prompt: str = Field(..., description="Prompt with weakness patterns injected")
+    estimated_tokens: int = Field(..., description="Estimated token count of the enhanced prompt")
     use_patterns: bool = Field(..., description="Whether pattern retrieval should be used")
     weakness_patterns_applied: int = Field(..., description="Number of weakness patterns applied")
     routing_decision: RouteResponse = Field(..., description="Full routing decision")
@@ -83,9 +117,24 @@ class StatsResponse(BaseModel):
     ood_keywords: int
     weakness_patterns: int
     weakness_categories: Dict[str, int]
+    generation: int = Field(..., description="Routing snapshot generation (increments on every reload)")
+    snapshot_created_at: str = Field(..., description="When the current routing snapshot was built (ISO format)")
+    snapshot_source: str = Field(..., description="'json' or 'artifact:<path>' for a memory-mapped compiled artifact")
     last_reload_check: str
     entity_file_mtime: Optional[str]
     weakness_file_mtime: Optional[str]
+    decision_cache: Optional[Dict[str, Any]] = None
+    data_watcher: Optional[Dict[str, Any]] = None
+    routing_executor: Optional[Dict[str, Any]] = None
+    prompt_cache: Optional[Dict[str, Any]] = Field(None, description="Prompt cache of this worker (pool processes keep their own in process mode)")
+    admission: Optional[Dict[str, Any]] = Field(None, description="Chat completion admission control (this worker)")
+    upstream_limiters: Optional[Dict[str, Any]] = None
+    upstream_resilience: Optional[Dict[str, Any]] = Field(None, description="Upstream circuit breakers, failover/hedging counts and p95 latencies")
+    upstream_prefix_cache: Optional[Dict[str, Any]] = Field(None, description="Upstream prefix cache hit ratio per routing tier")
+    pattern_retrieval: Optional[Dict[str, Any]] = Field(None, description="Pattern retrieval outcomes and query embedding cache")
+    stage_latencies: Optional[Dict[str, Any]] = Field(None, description="Live per-stage latency estimates used by latency budgets")
+    response_cache: Optional[Dict[str, Any]] = None
+    single_flight: Optional[Dict[str, Any]] = None
 
 
 class ReloadResponse(BaseModel):
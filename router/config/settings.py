@@ -4,7 +4,7 @@ Router configuration settings.
 
 from pydantic_settings import BaseSettings
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 
 class RouterSettings(BaseSettings):
@@ -14,15 +14,25 @@ class RouterSettings(BaseSettings):
     ENTITY_NAMES_PATH: Path = Path("refs/entity_names.json")
     WEAKNESSES_PATH: Path = Path("optimizer/config/deepseek_weaknesses.json")  # Fixed: was refs/
     EVAL_LOG_PATH: Path = Path("outputs/autoeval/logs/evaluation.log")
+    ROUTING_ARTIFACT_PATH: Optional[Path] = None  # Compiled by scripts/compile_routing_artifact.py (mmap-shared by workers)
 
     # ===== Router Decision Settings =====
     RAG_MIN_CONFIDENCE: float = 0.70
     WEAKNESS_TOP_K: int = 2
     WEAKNESS_MIN_FREQUENCY: float = 0.15
 
+    # Pattern retrieval for chat completions (error-pattern store built by the optimizer; embeds questions remotely)
+    ENABLE_PATTERN_RETRIEVAL: bool = False
+    PATTERN_RETRIEVAL_TIMEOUT: float = 0.3  # Seconds; answered without patterns after that
+    PATTERN_RETRIEVAL_TOP_K: int = 3
+    PATTERN_MIN_RELEVANCE: Optional[float] = None  # None: the optimizer's PATTERN_RELEVANCE_THRESHOLD
+    EMBEDDING_CACHE_MAX_SIZE: int = 10000  # Query embeddings kept in memory (per worker)
+    EMBEDDING_CACHE_TTL: int = 86400
+
     # ===== Hot-Reload Settings =====
     ENABLE_HOT_RELOAD: bool = True
     WATCH_INTERVAL: int = 30  # Check for updates every 30 seconds
+    WATCH_BACKEND: str = "auto"  # Background watcher: auto, poll, inotify (needs watchfiles)
     AUTO_RELOAD_ON_WEAKNESS_UPDATE: bool = True
 
     # ===== API Server Settings =====
@@ -35,10 +45,75 @@ class RouterSettings(BaseSettings):
     ENABLE_CACHE: bool = True
     CACHE_TTL: int = 300  # Cache routing decisions for 5 minutes
     MAX_CACHE_SIZE: int = 10000
+    MAX_PROMPT_TOKENS: Optional[int] = None  # Token budget for enhanced system prompts (None: unbounded)
+    TIER_MAX_PROMPT_TOKENS: Dict[str, int] = {}  # Per routing tier, e.g. ROUTER_TIER_MAX_PROMPT_TOKENS='{"weakness": 1500}'
+    PROMPT_LAYOUT: str = "inline"  # inline: reminders in the system prompt; prefix_cache: stable system prompt, reminders last
+    ENABLE_PROMPT_CACHE: bool = True  # Memoize assembled prompts by (base prompt, weakness ids, context)
+    PROMPT_CACHE_MAX_SIZE: int = 1024
+    PROMPT_CACHE_TTL: int = 3600
+    ENABLE_RESPONSE_CACHE: bool = False  # Opt-in: serve identical deterministic completions from cache
+    RESPONSE_CACHE_TTL: int = 3600
+    RESPONSE_CACHE_MAX_SIZE: int = 1000  # In-memory LRU tier (per worker)
+    RESPONSE_CACHE_DB_PATH: Optional[Path] = None  # sqlite disk tier, shared by workers (e.g. outputs/router/response_cache.db)
+    RESPONSE_CACHE_MAX_TEMPERATURE: float = 0.0  # Only cache requests at or below this temperature
+    ENABLE_REQUEST_COALESCING: bool = True  # Identical in-flight deterministic completions (see RESPONSE_CACHE_MAX_TEMPERATURE) share one upstream call
+    ROUTING_EXECUTION_MODE: str = "thread"  # Where routing/prompt building runs: inline, thread, process
+    ROUTING_POOL_SIZE: int = 4  # Max threads/processes in the routing pool
+    BATCH_MAX_ITEMS: int = 10000  # Max questions per /api/v1/route:batch request
+    BATCH_CHUNK_SIZE: int = 500  # Questions per routing pool task in batch routing
+
+    # Admission control for /v1/chat/completions (per worker; other endpoints are exempt)
+    ENABLE_ADMISSION_CONTROL: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 256  # Completions handled concurrently
+    ADMISSION_QUEUE_SIZE: int = 256  # Waiting completions beyond that; more are rejected with 429
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0  # Seconds a completion may wait for admission before a 503
+
+    # ===== Upstream LLM Settings =====
+    # HTTP connection pools (per provider)
+    DEEPSEEK_MAX_CONNECTIONS: int = 100
+    DEEPSEEK_MAX_KEEPALIVE: int = 20
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept
+    UPSTREAM_CONNECT_TIMEOUT: float = 5.0
+    UPSTREAM_READ_TIMEOUT: float = 120.0  # Max gap between bytes (long for slow generations)
+    UPSTREAM_MAX_RETRIES: int = 2
+
+    REQUEST_TIMEOUT: Optional[float] = None  # Deadline (seconds) per chat completion, upstream work stops when it passes
+
+    # Latency budgets (x_latency_budget_ms): optional stages are skipped when their live estimate does not fit
+    STAGE_LATENCY_WINDOW: int = 200  # Recent samples kept per stage
+    STAGE_LATENCY_MIN_SAMPLES: int = 5  # Samples needed before a stage's p90 is used
+    PREFILL_TOKENS_PER_SECOND: float = 4000.0  # Upstream prompt processing rate, prices prompt additions in time
+    STREAM_RELAY: bool = True  # Forward upstream SSE bytes as-is (only the first frame is rewritten)
+
+    # Concurrent upstream calls per model, with a bounded wait queue
+    MODEL_MAX_CONCURRENCY: int = 32
+    MODEL_CONCURRENCY_OVERRIDES: Dict[str, int] = {}  # e.g. ROUTER_MODEL_CONCURRENCY_OVERRIDES='{"deepseek-chat": 64}'
+    MODEL_QUEUE_SIZE: int = 64
+    MODEL_QUEUE_TIMEOUT: float = 10.0  # Seconds to wait for a slot before failing with 503
+
+    # Per-upstream circuit breakers: fail fast (or fail over) while a provider is degraded
+    ENABLE_CIRCUIT_BREAKER: bool = True
+    BREAKER_WINDOW: int = 50  # Recent calls considered per upstream
+    BREAKER_MIN_CALLS: int = 10  # Calls in the window before the breaker can open
+    BREAKER_ERROR_RATE: float = 0.5  # Failure fraction that opens the breaker
+    BREAKER_SLOW_CALL_SECONDS: float = 60.0  # Slower calls (time to first chunk for streams) count as slow
+    BREAKER_SLOW_CALL_RATE: float = 0.8  # Slow-call fraction that opens the breaker
+    BREAKER_OPEN_SECONDS: float = 30.0  # Time open before a probe call is let through
+
+    # Failover and hedged requests to a fallback model
+    FALLBACK_MODELS: Dict[str, str] = {}  # e.g. ROUTER_FALLBACK_MODELS='{"deepseek-chat": "gpt-4o-mini"}'
+    ENABLE_HEDGING: bool = True  # Non-streaming: also call the fallback once the primary exceeds its p95
+    HEDGE_PERCENTILE: float = 0.95
+    HEDGE_MIN_DELAY: float = 1.0  # Never hedge earlier than this (seconds)
+    HEDGE_MIN_SAMPLES: int = 20  # Successful calls needed before the percentile is trusted
+    HEDGE_LATENCY_WINDOW: int = 200  # Recent latencies kept per model
 
     # ===== Monitoring Settings =====
     ENABLE_METRICS: bool = True
     METRICS_PORT: int = 9090
+    LOOP_LAG_INTERVAL: float = 0.5  # Event-loop lag sampling interval (seconds)
     LOG_DIR: Path = Path("outputs/router/logs")
 
     class Config:
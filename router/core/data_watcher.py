@@ -0,0 +1,181 @@
+"""
+Background watcher for router data files.
+
+Moves hot-reload off the request path: instead of every request stat-ing the
+entity and weakness files (and the unlucky one paying for the JSON parse and
+index rebuild), a daemon thread watches the files and rebuilds the routing
+snapshot on its own, then swaps it in with a single reference assignment.
+
+Backends:
+- inotify: filesystem notifications via `watchfiles` (ships with uvicorn[standard])
+- poll: check file mtimes every ROUTER_WATCH_INTERVAL seconds
+"""
+
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+from loguru import logger
+
+from router.config.settings import get_router_settings
+from router.core.decision_engine import get_decision_engine
+
+
+class DataWatcher:
+    """
+    Watches routing data files and reloads the decision engine off-thread.
+
+    Features:
+    - Polling or inotify backend (auto-selected by default)
+    - Rebuilds the routing snapshot outside of any request, then swaps it in atomically
+    - Reload counters for monitoring
+    """
+
+    def __init__(self, interval: Optional[float] = None, backend: Optional[str] = None):
+        """
+        Initialize data watcher.
+
+        Args:
+            interval: Polling interval in seconds (default: ROUTER_WATCH_INTERVAL)
+            backend: 'auto', 'poll' or 'inotify' (default: ROUTER_WATCH_BACKEND)
+        """
+        settings = get_router_settings()
+
+        self.interval = interval if interval is not None else settings.WATCH_INTERVAL
+        self.backend = self._resolve_backend(backend or settings.WATCH_BACKEND)
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.reload_count = 0
+        self.last_reload: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    def _resolve_backend(self, backend: str) -> str:
+        """Pick the watcher backend, falling back to polling"""
+        backend = backend.lower()
+        if backend not in ('auto', 'poll', 'inotify'):
+            logger.warning(f"Unknown watch backend '{backend}', using polling")
+            return 'poll'
+
+        if backend == 'poll':
+            return 'poll'
+
+        try:
+            import watchfiles  # noqa: F401
+            return 'inotify'
+        except ImportError:
+            if backend == 'inotify':
+                logger.warning("watchfiles not installed, falling back to polling")
+            return 'poll'
+
+    def start(self):
+        """Start the watcher thread (no-op if already running)"""
+        if self.is_running():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="router-data-watcher",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Data watcher started (backend={self.backend}, interval={self.interval}s)")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the watcher thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.info("Data watcher stopped")
+
+    def is_running(self) -> bool:
+        """Whether the watcher thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        """Watcher thread main loop"""
+        if self.backend == 'inotify':
+            try:
+                self._watch_events()
+                return
+            except Exception as e:
+                logger.warning(f"inotify watcher failed ({e}), falling back to polling")
+
+        while not self._stop_event.wait(self.interval):
+            self.check_once()
+
+    def _watch_events(self):
+        """Block on filesystem events for the data files' directories"""
+        from watchfiles import watch
+
+        engine = get_decision_engine()
+        watched_files = {
+            engine.entity_data_path.resolve(),
+            engine.weaknesses_path.resolve()
+        }
+        watched_dirs = sorted({str(p.parent) for p in watched_files if p.parent.exists()})
+        if not watched_dirs:
+            raise FileNotFoundError("no data directories to watch")
+
+        for changes in watch(*watched_dirs, stop_event=self._stop_event, recursive=False):
+            if any(Path(path).resolve() in watched_files for _, path in changes):
+                self.check_once()
+
+    def check_once(self) -> bool:
+        """
+        Reload the routing snapshot if the data files changed.
+
+        The replacement snapshot is fully built before it is published, so
+        concurrent requests keep using the previous one until the swap.
+
+        Returns:
+            True if reloaded, False otherwise
+        """
+        try:
+            engine = get_decision_engine()
+            if not engine.has_pending_updates():
+                return False
+
+            logger.info("Router data files changed, rebuilding routing snapshot in background...")
+            start = time.perf_counter()
+            if not engine.check_for_updates():
+                return False
+            elapsed = time.perf_counter() - start
+
+            self.reload_count += 1
+            self.last_reload = datetime.now().isoformat()
+            self.last_error = None
+            logger.info(f"✓ Background reload complete in {elapsed * 1000:.1f}ms")
+            return True
+
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Background reload failed: {e}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get watcher statistics"""
+        return {
+            'running': self.is_running(),
+            'backend': self.backend,
+            'interval': self.interval,
+            'reload_count': self.reload_count,
+            'last_reload': self.last_reload,
+            'last_error': self.last_error
+        }
+
+
+# Singleton instance
+_data_watcher: Optional[DataWatcher] = None
+
+
+def get_data_watcher() -> DataWatcher:
+    """Get the global data watcher instance"""
+    global _data_watcher
+    if _data_watcher is None:
+        _data_watcher = DataWatcher()
+    return _data_watcher
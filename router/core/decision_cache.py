@@ -0,0 +1,127 @@
+"""
+Bounded LRU + TTL cache for routing decisions.
+
+Routing decisions depend only on the question, the request hints and the
+loaded routing data, so repeat questions can skip matching entirely. The
+cache is cleared whenever the decision engine reloads its data.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize question text for cache keys.
+
+    Only surrounding whitespace is stripped: matching is case- and
+    whitespace-sensitive inside the question, so nothing else is folded.
+    """
+    return question.strip()
+
+
+class DecisionCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+
+    Features:
+    - Least-recently-used eviction once `max_size` entries are stored
+    - Entries expire `ttl` seconds after insertion
+    - Hit/miss/eviction/expiration counters for monitoring
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300):
+        """
+        Initialize decision cache.
+
+        Args:
+            max_size: Maximum number of cached decisions
+            ttl: Time-to-live per entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        question: str,
+        entity_type: Optional[str] = None,
+        min_confidence: float = 0.70,
+        generation: int = 0
+    ) -> Tuple[int, str, Optional[str], float]:
+        """
+        Build cache key from normalized question and routing hints.
+
+        The snapshot generation is part of the key, so a decision computed
+        against old data can never be served after a reload.
+        """
+        return (generation, normalize_question(question), entity_type, min_confidence)
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached decision.
+
+        Returns:
+            Cached decision, or None on miss/expiry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, decision = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return decision
+
+    def put(self, key: Hashable, decision: Dict[str, Any]):
+        """Store a decision, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, decision)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries (called on data reload)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
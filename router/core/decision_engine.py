@@ -5,17 +5,26 @@ This module provides:
 1. Weakness pattern matching (Tier 1 - HIGHEST PRIORITY)
 2. pattern retrieval decision-making for supplemental info (Tier 2)
 3. Hot-reload when weakness catalog is updated
+
+All routing data lives in an immutable `RoutingSnapshot`; reloads build a new
+snapshot off to the side and publish it with a single reference swap.
 """
 
-import json
-import os
+import threading
+import time
 from pathlib import Path
-from typing import Tuple, Set, Optional, List, Dict, Any
+from typing import Tuple, Set, Optional, Dict, Any, Mapping, Callable, List, Sequence
 from datetime import datetime
 from loguru import logger
 
+from router.core.decision_cache import DecisionCache
+from router.core.routing_artifact import load_routing_artifact
+from router.core.routing_snapshot import RoutingSnapshot, build_snapshot, get_mtime
 from router.core.weakness_matcher import WeaknessMatcher
 from router.config.settings import get_router_settings
+from router.utils.metrics import (
+    RELOAD_SECONDS, RELOADS, ROUTING_DECISION_SECONDS, record_cache_lookup
+)
 
 
 class DecisionEngine:
@@ -25,13 +34,15 @@ class DecisionEngine:
     Features:
     - Fast rule-based pattern retrieval decisions
     - Weakness pattern matching
-    - Auto-reload when weakness catalog updates
+    - Auto-reload when weakness catalog updates (atomic snapshot swap)
+    - LRU+TTL cache of routing decisions (cleared on reload)
     """
 
     def __init__(
         self,
         entity_data_path: Optional[str] = None,
-        weaknesses_path: Optional[str] = None
+        weaknesses_path: Optional[str] = None,
+        artifact_path: Optional[str] = None
     ):
         """
         Initialize decision engine.
@@ -39,124 +50,176 @@ class DecisionEngine:
         Args:
             entity_data_path: Path to entity_names.json (optional)
             weaknesses_path: Path to deepseek_weaknesses.json (optional)
+            artifact_path: Path to a compiled routing artifact (optional,
+                           default: ROUTER_ROUTING_ARTIFACT_PATH)
         """
         settings = get_router_settings()
 
         self.entity_data_path = Path(entity_data_path or settings.ENTITY_NAMES_PATH)
         self.weaknesses_path = Path(weaknesses_path or settings.WEAKNESSES_PATH)
 
-        # Load entity names
-        self.entities_by_category = self._load_entities()
-        self.all_entities_set = self._build_entity_set()
+        artifact_path = artifact_path or settings.ROUTING_ARTIFACT_PATH
+        self.artifact_path = Path(artifact_path) if artifact_path else None
 
-        # Initialize weakness matcher
-        self.weakness_matcher = WeaknessMatcher(str(self.weaknesses_path))
+        # Serializes snapshot builders; request paths never take this lock
+        self._reload_lock = threading.Lock()
 
-        # Track file modification times for hot-reload
-        self._entity_mtime = self._get_mtime(self.entity_data_path)
-        self._weakness_mtime = self._get_mtime(self.weaknesses_path)
-        self._last_reload_check = datetime.now()
+        # Called with each newly published snapshot (e.g. to invalidate derived caches)
+        self._reload_listeners: List[Callable[[RoutingSnapshot], None]] = []
 
-        # Define category keywords (learned from database)
-        self.category_keywords = {
-            'diseases': {
-                '糖尿病', '高血压', '白血病', '肺结节', '半月板', '游走脾',
-                '沙门氏菌', '卡波西肉瘤', '家族性高胆固醇血症', '类鼻疽',
-                '疾病', '症状', '治疗', '病因'
-            },
-            'examinations': {
-                '检查', '筛查', 'CT', 'MRI', 'X光', '超声', 'B超',
-                '血常规', '尿检', '心电图', '胃镜', '肠镜', '活检'
-            },
-            'surgeries': {
-                '手术', '术后', '操作', '切除', '置换', '移植',
-                '微创', '开放', '腹腔镜', '穿刺'
-            },
-            'vaccines': {
-                '疫苗', '接种', '注射', '免疫', '预防针',
-                '乙肝', '流感', '肺炎', '狂犬', 'HPV'
-            }
-        }
+        # Load routing data into the first snapshot
+        self._snapshot = self._build_snapshot(generation=1)
+        self._last_reload_check = datetime.now()
 
-        # Known out-of-database topics (learned from failed retrievals)
-        self.ood_keywords = {
-            '摇晃综合征', '婴儿摇晃', 'Shaken Baby',
-            '念珠菌性龟头炎', '念珠菌龟头',
-            '海绵状血管瘤', '血管瘤',
-            '阴唇粘连', '外阴粘连',
-            '先天性心脏病筛查',
-            '单纯性甲状腺肿',
-            '心脏性猝死预防',
-            '变性手术', '性别肯定手术',
-            '感染性疾病通用症状'
-        }
+        # Routing decision cache (ROUTER_ENABLE_CACHE / CACHE_TTL / MAX_CACHE_SIZE)
+        self.decision_cache: Optional[DecisionCache] = None
+        if settings.ENABLE_CACHE:
+            self.decision_cache = DecisionCache(
+                max_size=settings.MAX_CACHE_SIZE,
+                ttl=settings.CACHE_TTL
+            )
 
         logger.info(
-            f"DecisionEngine initialized: {len(self.all_entities_set)} entities, "
-            f"{len(self.weakness_matcher.weaknesses)} weakness patterns"
+            f"DecisionEngine initialized: {len(self._snapshot.all_entities)} entities, "
+            f"{len(self._snapshot.weakness_matcher.weaknesses)} weakness patterns"
+        )
+
+    # ===== Read-only views of the current snapshot =====
+
+    @property
+    def snapshot(self) -> RoutingSnapshot:
+        """Current routing snapshot (read once per request for a consistent view)"""
+        return self._snapshot
+
+    @property
+    def generation(self) -> int:
+        """Generation number of the current snapshot"""
+        return self._snapshot.generation
+
+    @property
+    def entities_by_category(self) -> Mapping[str, Tuple[str, ...]]:
+        return self._snapshot.entities_by_category
+
+    @property
+    def all_entities_set(self) -> Set[str]:
+        return self._snapshot.all_entities
+
+    @property
+    def category_keywords(self) -> Mapping[str, Set[str]]:
+        return self._snapshot.category_keywords
+
+    @property
+    def ood_keywords(self) -> Set[str]:
+        return self._snapshot.ood_keywords
+
+    @property
+    def weakness_matcher(self) -> WeaknessMatcher:
+        return self._snapshot.weakness_matcher
+
+    # ===== Hot-reload =====
+
+    def has_pending_updates(self) -> bool:
+        """
+        Check whether data files changed since they were loaded (without reloading).
+
+        Returns:
+            True if the entity or weakness file is newer than the loaded data
+        """
+        snapshot = self._snapshot
+        self._last_reload_check = datetime.now()
+        return (
+            get_mtime(self.entity_data_path) > snapshot.entity_mtime or
+            get_mtime(self.weaknesses_path) > snapshot.weakness_mtime
+        )
+
+    def _build_snapshot(
+        self,
+        generation: int,
+        previous: Optional[RoutingSnapshot] = None
+    ) -> RoutingSnapshot:
+        """
+        Build a snapshot, preferring the compiled artifact when it is up to date.
+
+        Falls back to parsing the JSON sources if no artifact is configured or
+        the artifact was compiled from older source files.
+        """
+        if self.artifact_path is not None and self.artifact_path.exists():
+            snapshot = load_routing_artifact(
+                self.artifact_path, generation, self.entity_data_path, self.weaknesses_path
+            )
+            if snapshot is not None:
+                return snapshot
+
+        return build_snapshot(
+            self.entity_data_path,
+            self.weaknesses_path,
+            generation=generation,
+            previous=previous
         )
 
-    def _get_mtime(self, filepath: Path) -> float:
-        """Get file modification time"""
-        try:
-            return os.path.getmtime(filepath) if filepath.exists() else 0
-        except Exception:
-            return 0
-
-    def _load_entities(self) -> dict:
-        """Load entity names from JSON file"""
-        if not self.entity_data_path.exists():
-            logger.warning(f"Entity data not found: {self.entity_data_path}")
-            return {'diseases': [], 'examinations': [], 'surgeries': [], 'vaccines': []}
-
-        try:
-            with open(self.entity_data_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load entities: {e}")
-            return {'diseases': [], 'examinations': [], 'surgeries': [], 'vaccines': []}
-
-    def _build_entity_set(self) -> Set[str]:
-        """Build a set of all entity names for fast lookup"""
-        all_entities = set()
-        for category, names in self.entities_by_category.items():
-            all_entities.update(names)
-        return all_entities
+    def _rebuild(self, trigger: str, previous: Optional[RoutingSnapshot] = None):
+        """Build and publish the next snapshot (caller holds the reload lock)"""
+        start = time.perf_counter()
+        self._publish(self._build_snapshot(self._snapshot.generation + 1, previous=previous))
+        RELOAD_SECONDS.labels(trigger=trigger).observe(time.perf_counter() - start)
+        RELOADS.labels(trigger=trigger).inc()
+
+    def add_reload_listener(self, listener: Callable[[RoutingSnapshot], None]):
+        """Register a callback invoked with every newly published snapshot"""
+        self._reload_listeners.append(listener)
+
+    def _publish(self, snapshot: RoutingSnapshot):
+        """Atomically swap in a fully built snapshot and drop stale cached decisions"""
+        self._snapshot = snapshot
+        if self.decision_cache is not None:
+            self.decision_cache.clear()
+
+        for listener in self._reload_listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Reload listener failed: {e}")
+
+        logger.info(
+            f"✓ Hot-reload complete (generation {snapshot.generation}): "
+            f"{len(snapshot.all_entities)} entities, "
+            f"{len(snapshot.weakness_matcher.weaknesses)} weakness patterns"
+        )
 
     def check_for_updates(self) -> bool:
         """
         Check if data files have been updated and reload if necessary.
 
+        Unchanged parts are shared with the current snapshot; the new snapshot
+        is only published once it is completely built.
+
         Returns:
             True if reloaded, False otherwise
         """
-        reloaded = False
-
-        # Check entity names
-        current_entity_mtime = self._get_mtime(self.entity_data_path)
-        if current_entity_mtime > self._entity_mtime:
-            logger.info("Entity names updated, reloading...")
-            self.entities_by_category = self._load_entities()
-            self.all_entities_set = self._build_entity_set()
-            self._entity_mtime = current_entity_mtime
-            reloaded = True
-
-        # Check weakness patterns
-        current_weakness_mtime = self._get_mtime(self.weaknesses_path)
-        if current_weakness_mtime > self._weakness_mtime:
-            logger.info("Weakness patterns updated, reloading...")
-            self.weakness_matcher = WeaknessMatcher(str(self.weaknesses_path))
-            self._weakness_mtime = current_weakness_mtime
-            reloaded = True
-
-        if reloaded:
-            logger.info(
-                f"✓ Hot-reload complete: {len(self.all_entities_set)} entities, "
-                f"{len(self.weakness_matcher.weaknesses)} weakness patterns"
-            )
+        if not self.has_pending_updates():
+            return False
 
-        self._last_reload_check = datetime.now()
-        return reloaded
+        with self._reload_lock:
+            # Another thread may have reloaded while we waited for the lock
+            if not self.has_pending_updates():
+                return False
+
+            logger.info("Router data files updated, rebuilding snapshot...")
+            self._rebuild('file_change', previous=self._snapshot)
+
+        return True
+
+    def reload(self) -> RoutingSnapshot:
+        """
+        Force a full rebuild of the routing snapshot.
+
+        Returns:
+            The newly published snapshot
+        """
+        with self._reload_lock:
+            self._rebuild('forced')
+            self._last_reload_check = datetime.now()
+            return self._snapshot
 
     def should_use_patterns(
         self,
@@ -173,23 +236,37 @@ class DecisionEngine:
         Returns:
             Tuple of (use_patterns, reason, confidence)
         """
-        question_lower = question.lower()
+        return self._should_use_patterns(self._snapshot, question)
+
+    def _should_use_patterns(
+        self,
+        snapshot: RoutingSnapshot,
+        question: str
+    ) -> Tuple[bool, str, float]:
+        """Pattern retrieval decision against a specific snapshot"""
+        # Single pass over the question for all three keyword dictionaries
+        found = snapshot.keyword_automaton.find(question)
+        ood_offset = snapshot.ood_offset
+        category_offset = snapshot.category_offset
 
         # Strategy 1: Check exact entity name match (HIGH confidence)
-        for entity_name in self.all_entities_set:
-            if entity_name in question:
-                return True, f"Exact match: '{entity_name}'", 0.95
+        entity_ids = [k for k in found if k < ood_offset]
+        if entity_ids:
+            entity_name = snapshot.entity_names[min(entity_ids)]
+            return True, f"Exact match: '{entity_name}'", 0.95
 
         # Strategy 2: Check for known out-of-database topics (HIGH confidence)
-        for ood_keyword in self.ood_keywords:
-            if ood_keyword in question:
-                return False, f"Known OOD topic: '{ood_keyword}'", 0.90
+        ood_ids = [k for k in found if ood_offset <= k < category_offset]
+        if ood_ids:
+            ood_keyword = snapshot.ood_names[min(ood_ids) - ood_offset]
+            return False, f"Known OOD topic: '{ood_keyword}'", 0.90
 
         # Strategy 3: Check category keywords (MEDIUM confidence)
-        matched_categories = []
-        for category, keywords in self.category_keywords.items():
-            if any(kw in question for kw in keywords):
-                matched_categories.append(category)
+        category_ids = sorted({
+            snapshot.keyword_category[k - category_offset]
+            for k in found if k >= category_offset
+        })
+        matched_categories = [snapshot.category_names[i] for i in category_ids]
 
         if len(matched_categories) >= 2:
             categories_str = ', '.join(matched_categories)
@@ -198,48 +275,23 @@ class DecisionEngine:
             return True, f"Category match: {matched_categories[0]}", 0.65
 
         # Strategy 4: Check for partial entity matches
-        for entity_name in self.all_entities_set:
-            if len(entity_name) >= 3:
-                prefix = entity_name[:min(3, len(entity_name))]
-                if len(prefix) >= 2 and prefix in question and prefix not in ['检查', '手术', '疫苗']:
-                    return True, f"Partial match: '{entity_name}'", 0.60
+        partial_entity = snapshot.find_partial_match(question)
+        if partial_entity is not None:
+            return True, f"Partial match: '{partial_entity}'", 0.60
 
         # Strategy 5: Default - use pattern retrieval with threshold filtering
         return True, "Uncertain - defer to threshold filter", 0.50
 
-    def get_routing_decision(
+    def _decide(
         self,
+        snapshot: RoutingSnapshot,
+        settings,
         question: str,
-        entity_type: Optional[str] = None,
-        min_confidence: float = 0.70,
-        auto_reload: bool = True
+        entity_type: Optional[str]
     ) -> Dict[str, Any]:
-        """
-        Complete routing decision with CORRECT priority: weakness patterns first, then pattern retrieval.
-
-        This implements the correct three-tier routing strategy:
-        - Tier 1: Weakness pattern matching (check if hits known weakness - HIGHEST PRIORITY)
-        - Pattern Retrieval retrieval for supplemental info (if no weakness match)
-        - Tier 3: Baseline only (if neither applies)
-
-        Args:
-            question: The question text
-            entity_type: Optional entity type ('diseases', 'vaccines', etc.)
-            min_confidence: Minimum confidence for pattern retrieval usage
-            auto_reload: Whether to auto-check for data updates
-
-        Returns:
-            Dictionary with routing decision and weakness patterns
-        """
-        # Hot-reload check
-        if auto_reload:
-            settings = get_router_settings()
-            if settings.ENABLE_HOT_RELOAD:
-                self.check_for_updates()
-
+        """Compute an (uncached) routing decision against a specific snapshot"""
         # Step 1: Check for weakness patterns FIRST (highest priority)
-        settings = get_router_settings()
-        weakness_patterns = self.weakness_matcher.match_weaknesses(
+        weakness_patterns = snapshot.weakness_matcher.match_weaknesses(
             question=question,
             entity_type=entity_type,
             top_k=settings.WEAKNESS_TOP_K,
@@ -251,7 +303,7 @@ class DecisionEngine:
         # Step 2: If no weakness match, check pattern database for supplemental info
         if not has_weaknesses:
             # No weakness pattern hit - check if pattern database has golden-ref content
-            use_patterns, rag_reason, rag_confidence = self.should_use_patterns(question, min_confidence)
+            use_patterns, rag_reason, rag_confidence = self._should_use_patterns(snapshot, question)
         else:
             # Weakness pattern found - use updated prompt with inline reminders
             # pattern retrieval may still supplement with additional context
@@ -278,23 +330,123 @@ class DecisionEngine:
 
         return decision
 
+    def get_routing_decision(
+        self,
+        question: str,
+        entity_type: Optional[str] = None,
+        min_confidence: float = 0.70,
+        auto_reload: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Complete routing decision with CORRECT priority: weakness patterns first, then pattern retrieval.
+
+        This implements the correct three-tier routing strategy:
+        - Tier 1: Weakness pattern matching (check if hits known weakness - HIGHEST PRIORITY)
+        - Pattern Retrieval retrieval for supplemental info (if no weakness match)
+        - Tier 3: Baseline only (if neither applies)
+
+        Args:
+            question: The question text
+            entity_type: Optional entity type ('diseases', 'vaccines', etc.)
+            min_confidence: Minimum confidence for pattern retrieval usage
+            auto_reload: Whether to auto-check for data updates
+
+        Returns:
+            Dictionary with routing decision and weakness patterns
+        """
+        settings = get_router_settings()
+
+        # Hot-reload check (clears the decision cache if data changed)
+        if auto_reload and settings.ENABLE_HOT_RELOAD:
+            self.check_for_updates()
+
+        # Read the snapshot once so the whole decision sees consistent data
+        snapshot = self._snapshot
+        start = time.perf_counter()
+
+        # Serve repeat questions from the decision cache
+        cache_key = None
+        if self.decision_cache is not None:
+            cache_key = DecisionCache.make_key(question, entity_type, min_confidence, snapshot.generation)
+            cached = self.decision_cache.get(cache_key)
+            record_cache_lookup('decision', cached is not None)
+            if cached is not None:
+                ROUTING_DECISION_SECONDS.labels(routing_tier=cached['routing_tier']).observe(
+                    time.perf_counter() - start
+                )
+                return {**cached, 'last_reload_check': self._last_reload_check.isoformat()}
+
+        decision = self._decide(snapshot, settings, question, entity_type)
+
+        if cache_key is not None:
+            self.decision_cache.put(cache_key, decision)
+
+        ROUTING_DECISION_SECONDS.labels(routing_tier=decision['routing_tier']).observe(
+            time.perf_counter() - start
+        )
+        return decision
+
+    def get_routing_decisions(
+        self,
+        items: Sequence[Tuple[str, Optional[str]]],
+        min_confidence: float = 0.70,
+        auto_reload: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Routing decisions for many questions at once (batch API, offline re-scoring).
+
+        Same decisions as `get_routing_decision`, but the hot-reload check runs
+        once, every question is routed against the same snapshot, and repeated
+        questions are computed once. The decision cache is bypassed so a bulk
+        job does not evict the entries serving live traffic.
+
+        Args:
+            items: (question, entity_type) pairs
+            min_confidence: Minimum confidence for pattern retrieval usage
+            auto_reload: Whether to check for data updates first
+
+        Returns:
+            One decision per item, in input order
+        """
+        settings = get_router_settings()
+
+        if auto_reload and settings.ENABLE_HOT_RELOAD:
+            self.check_for_updates()
+
+        snapshot = self._snapshot
+
+        computed: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        decisions = []
+        for item in items:
+            decision = computed.get(item)
+            if decision is None:
+                decision = computed[item] = self._decide(snapshot, settings, item[0], item[1])
+            decisions.append(decision)
+
+        return decisions
+
     def get_stats(self) -> dict:
         """Get statistics about the router configuration"""
-        weakness_stats = self.weakness_matcher.get_stats()
+        snapshot = self._snapshot
+        weakness_stats = snapshot.weakness_matcher.get_stats()
 
         return {
-            'total_entities': len(self.all_entities_set),
-            'diseases': len(self.entities_by_category.get('diseases', [])),
-            'examinations': len(self.entities_by_category.get('examinations', [])),
-            'surgeries': len(self.entities_by_category.get('surgeries', [])),
-            'vaccines': len(self.entities_by_category.get('vaccines', [])),
-            'category_keywords': sum(len(kws) for kws in self.category_keywords.values()),
-            'ood_keywords': len(self.ood_keywords),
+            'total_entities': len(snapshot.all_entities),
+            'diseases': len(snapshot.entities_by_category.get('diseases', [])),
+            'examinations': len(snapshot.entities_by_category.get('examinations', [])),
+            'surgeries': len(snapshot.entities_by_category.get('surgeries', [])),
+            'vaccines': len(snapshot.entities_by_category.get('vaccines', [])),
+            'category_keywords': sum(len(kws) for kws in snapshot.category_keywords.values()),
+            'ood_keywords': len(snapshot.ood_keywords),
             'weakness_patterns': weakness_stats['total_weaknesses'],
             'weakness_categories': weakness_stats['by_category'],
+            'generation': snapshot.generation,
+            'snapshot_created_at': snapshot.created_at,
+            'snapshot_source': snapshot.source,
             'last_reload_check': self._last_reload_check.isoformat(),
-            'entity_file_mtime': datetime.fromtimestamp(self._entity_mtime).isoformat() if self._entity_mtime else None,
-            'weakness_file_mtime': datetime.fromtimestamp(self._weakness_mtime).isoformat() if self._weakness_mtime else None
+            'entity_file_mtime': datetime.fromtimestamp(snapshot.entity_mtime).isoformat() if snapshot.entity_mtime else None,
+            'weakness_file_mtime': datetime.fromtimestamp(snapshot.weakness_mtime).isoformat() if snapshot.weakness_mtime else None,
+            'decision_cache': self.decision_cache.get_stats() if self.decision_cache is not None else None
         }
 
 
@@ -311,8 +463,8 @@ def get_decision_engine() -> DecisionEngine:
 
 
 def reload_decision_engine() -> DecisionEngine:
-    """Force reload the decision engine"""
-    global _decision_engine
+    """Force reload the decision engine's routing data (in place, via snapshot swap)"""
     logger.info("Force reloading decision engine...")
-    _decision_engine = DecisionEngine()
-    return _decision_engine
+    engine = get_decision_engine()
+    engine.reload()
+    return engine
@@ -0,0 +1,168 @@
+"""
+Multi-pattern keyword automaton (Aho-Corasick) for single-pass substring matching.
+
+The router checks questions against large keyword dictionaries (entity names,
+OOD topics, category keywords, weakness triggers). Testing every keyword with
+``kw in question`` costs O(#keywords) per request; this automaton scans the
+question once in O(len(question) + matches) regardless of dictionary size.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Sequence, Set
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed list of keywords.
+
+    Keywords are identified by their position in the list passed to the
+    constructor. `find` returns the ids of every keyword occurring in a text,
+    i.e. exactly the ids for which ``keyword in text`` is True.
+
+    The trie is compiled into flat arrays (sorted edge lists per node plus
+    merged output lists) so the automaton stays compact for catalogs with
+    tens of thousands of keywords.
+    """
+
+    __slots__ = (
+        'num_keywords',
+        '_edge_start', '_edge_chars', '_edge_targets',
+        '_fail', '_out_start', '_out_ids'
+    )
+
+    # Names of the flat uint32 tables, as used by export_tables/from_tables
+    TABLES = ('edge_start', 'edge_chars', 'edge_targets', 'fail', 'out_start', 'out_ids')
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Build the automaton.
+
+        Args:
+            keywords: Keywords to match; ids are their positions in this iterable
+        """
+        goto: List[Dict[int, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        num_keywords = 0
+        for keyword_id, keyword in enumerate(keywords):
+            num_keywords = keyword_id + 1
+            node = 0
+            for ch in keyword:
+                code = ord(ch)
+                child = goto[node].get(code)
+                if child is None:
+                    child = len(goto)
+                    goto[node][code] = child
+                    goto.append({})
+                    outputs.append([])
+                node = child
+            outputs[node].append(keyword_id)
+
+        # Breadth-first pass: failure links and merged outputs
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for code, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and code not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(code, 0)
+                if outputs[fail[child]]:
+                    outputs[child].extend(outputs[fail[child]])
+
+        self.num_keywords = num_keywords
+        self._compile(goto, fail, outputs)
+
+    def _compile(self, goto: List[Dict[int, int]], fail: List[int], outputs: List[List[int]]):
+        """Flatten the dict-based trie into sorted edge and output arrays"""
+        edge_start = array('I', [0])
+        edge_chars = array('I')
+        edge_targets = array('I')
+        out_start = array('I', [0])
+        out_ids = array('I')
+
+        for node_edges, node_outputs in zip(goto, outputs):
+            for code in sorted(node_edges):
+                edge_chars.append(code)
+                edge_targets.append(node_edges[code])
+            edge_start.append(len(edge_chars))
+
+            out_ids.extend(sorted(set(node_outputs)))
+            out_start.append(len(out_ids))
+
+        self._edge_start = edge_start
+        self._edge_chars = edge_chars
+        self._edge_targets = edge_targets
+        self._fail = array('I', fail)
+        self._out_start = out_start
+        self._out_ids = out_ids
+
+    def export_tables(self) -> Dict[str, array]:
+        """Get the compiled uint32 tables (for serialization)"""
+        return {name: getattr(self, '_' + name) for name in self.TABLES}
+
+    @classmethod
+    def from_tables(cls, num_keywords: int, tables: Dict[str, Sequence[int]]) -> 'KeywordAutomaton':
+        """
+        Rebuild an automaton from compiled tables without re-running construction.
+
+        Args:
+            num_keywords: Number of keywords the automaton was built from
+            tables: uint32 sequences keyed by TABLES names (arrays or memoryviews)
+
+        Returns:
+            KeywordAutomaton sharing the given tables
+        """
+        automaton = cls.__new__(cls)
+        automaton.num_keywords = num_keywords
+        for name in cls.TABLES:
+            setattr(automaton, '_' + name, tables[name])
+        return automaton
+
+    def find(self, text: str) -> Set[int]:
+        """
+        Find all keywords occurring in text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of keyword ids found (empty keywords always match)
+        """
+        edge_start = self._edge_start
+        edge_chars = self._edge_chars
+        edge_targets = self._edge_targets
+        fail = self._fail
+        out_start = self._out_start
+        out_ids = self._out_ids
+
+        found = set(out_ids[out_start[0]:out_start[1]])
+        state = 0
+
+        for ch in text:
+            code = ord(ch)
+            while True:
+                lo = edge_start[state]
+                hi = edge_start[state + 1]
+                if lo < hi:
+                    i = bisect_left(edge_chars, code, lo, hi)
+                    if i < hi and edge_chars[i] == code:
+                        state = edge_targets[i]
+                        break
+                if state == 0:
+                    break
+                state = fail[state]
+
+            lo = out_start[state]
+            hi = out_start[state + 1]
+            if lo < hi:
+                found.update(out_ids[lo:hi])
+
+        return found
+
+    def __len__(self) -> int:
+        return self.num_keywords
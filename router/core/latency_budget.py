@@ -0,0 +1,185 @@
+"""
+Latency budgets for chat completions (x_latency_budget_ms).
+
+A request may declare how long it is willing to wait for the response to
+start. Routing itself always runs (it takes well under a millisecond); the
+optional stages that can cost real time - pattern retrieval (a remote
+embeddings call), and weakness enhancement, whose prompt additions also
+lengthen the upstream prefill - only run if their live latency estimate fits
+in what is left of the budget after reserving the upstream's own latency.
+Every skipped stage is reported in the routing decision with the reason.
+
+Estimates are the p90 of recent samples per stage (`StageLatencies`), fed by
+every request whether or not it declares a budget.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from router.config.settings import get_router_settings
+from router.services.circuit_breaker import LatencyWindow
+
+# Stage names
+ROUTING = 'routing'
+PROMPT_BUILD = 'prompt_build'
+PATTERN_RETRIEVAL = 'pattern_retrieval'
+WEAKNESS_ENHANCEMENT = 'weakness_enhancement'
+
+# Percentile used as a stage's latency estimate
+ESTIMATE_PERCENTILE = 0.9
+
+
+def upstream_stage(model: str, stream: bool) -> str:
+    """
+    Stage name of a model's upstream latency (incl. queueing).
+
+    Streams and non-streaming calls are kept apart: a stream's budget covers
+    the time to its first chunk, a non-streaming call's the whole completion.
+
+    Args:
+        model: Model called
+        stream: Whether the call streams
+
+    Returns:
+        'upstream:<model>:ttft' for streams, 'upstream:<model>:total' otherwise
+    """
+    return f"upstream:{model}:{'ttft' if stream else 'total'}"
+
+
+class StageLatencies:
+    """
+    Live per-stage latency estimates.
+
+    Features:
+    - Recent samples per stage (ROUTER_STAGE_LATENCY_WINDOW)
+    - p90 estimate once ROUTER_STAGE_LATENCY_MIN_SAMPLES samples are in
+    """
+
+    def __init__(self, window: int, min_samples: int):
+        """
+        Initialize stage latency estimates.
+
+        Args:
+            window: Samples kept per stage
+            min_samples: Samples needed before a stage has an estimate
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._stages: Dict[str, LatencyWindow] = {}
+
+    def observe(self, stage: str, seconds: float):
+        """Record one run of a stage"""
+        samples = self._stages.get(stage)
+        if samples is None:
+            samples = self._stages[stage] = LatencyWindow(self.window)
+        samples.add(seconds)
+
+    def estimate(self, stage: str) -> Optional[float]:
+        """Estimated latency of a stage in seconds (None until enough samples)"""
+        samples = self._stages.get(stage)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        return samples.percentile(ESTIMATE_PERCENTILE)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the current estimate per stage"""
+        return {
+            stage: {
+                'samples': len(samples),
+                'p90_ms': samples.percentile(ESTIMATE_PERCENTILE) * 1000
+            }
+            for stage, samples in self._stages.items()
+        }
+
+
+class LatencyBudget:
+    """A request's latency budget, checked before each optional stage"""
+
+    def __init__(self, budget_ms: int, reserve: Optional[float], latencies: StageLatencies):
+        """
+        Start the budget clock.
+
+        Args:
+            budget_ms: Time the request is willing to wait for the response to start
+            reserve: Seconds kept for the upstream call (None: no estimate yet)
+            latencies: Stage latency estimates
+        """
+        self.budget = budget_ms / 1000
+        self.reserve = reserve or 0.0
+        self.latencies = latencies
+        self.started = time.perf_counter()
+        self.skipped: List[Dict[str, str]] = []
+
+    def slack(self) -> float:
+        """Seconds left for optional stages (may be negative)"""
+        return self.budget - (time.perf_counter() - self.started) - self.reserve
+
+    def skip(self, stage: str, reason: str):
+        """Record a skipped stage"""
+        self.skipped.append({'stage': stage, 'reason': reason})
+
+    def admit(self, stage: str, estimate: Optional[float] = None) -> bool:
+        """
+        Whether an optional stage fits in the remaining budget (recording it as skipped if not).
+
+        Args:
+            stage: Stage name
+            estimate: Stage latency in seconds (default: the live estimate; stages
+                      without one run if any time is left)
+
+        Returns:
+            True if the stage should run
+        """
+        if estimate is None:
+            estimate = self.latencies.estimate(stage)
+        slack = self.slack()
+        if estimate is None:
+            if slack > 0:
+                return True
+            self.skip(stage, f"no time left, {self.describe(slack)}")
+            return False
+        if estimate <= slack:
+            return True
+        self.skip(stage, f"needs ~{estimate * 1000:.0f}ms, {self.describe(slack)}")
+        return False
+
+    def describe(self, slack: float) -> str:
+        """Human-readable remaining budget, for skip reasons"""
+        return (
+            f"{max(slack, 0.0) * 1000:.0f}ms of the {self.budget * 1000:.0f}ms budget left "
+            f"after ~{self.reserve * 1000:.0f}ms reserved for upstream"
+        )
+
+
+# Global stage latency estimates (per worker)
+_stage_latencies: Optional[StageLatencies] = None
+
+
+def get_stage_latencies() -> StageLatencies:
+    """Get the global stage latency estimates"""
+    global _stage_latencies
+    if _stage_latencies is None:
+        settings = get_router_settings()
+        _stage_latencies = StageLatencies(
+            window=settings.STAGE_LATENCY_WINDOW,
+            min_samples=settings.STAGE_LATENCY_MIN_SAMPLES
+        )
+    return _stage_latencies
+
+
+def start_latency_budget(budget_ms: Optional[int], model: str, stream: bool) -> Optional[LatencyBudget]:
+    """
+    Start a request's latency budget, reserving its model's upstream latency.
+
+    Args:
+        budget_ms: x_latency_budget_ms (None: no budget)
+        model: Requested model
+        stream: Whether the request streams (reserves time to first chunk, not the full completion)
+
+    Returns:
+        LatencyBudget, or None without a budget
+    """
+    if budget_ms is None:
+        return None
+    latencies = get_stage_latencies()
+    return LatencyBudget(budget_ms, latencies.estimate(upstream_stage(model, stream)), latencies)
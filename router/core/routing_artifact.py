@@ -0,0 +1,460 @@
+"""
+Precompiled, memory-mapped routing artifact.
+
+`compile_routing_artifact` writes everything a `RoutingSnapshot` needs to a
+single binary file: the entity/keyword automaton tables, the partial-match
+prefix index, the weakness trigger index and the weakness payloads.
+`load_routing_artifact` maps that file read-only and builds a snapshot whose
+tables are views into the mapping, so all uvicorn workers share the same
+physical pages and startup cost no longer scales with catalog size.
+Strings and weakness payloads are decoded lazily, only when a request
+actually reports them.
+
+File layout (native byte order, sections 8-byte aligned):
+    MAGIC | uint64 directory length | directory (JSON) | section data
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from router.core.keyword_automaton import KeywordAutomaton
+from router.core.routing_snapshot import (
+    CATEGORY_KEYWORDS, OOD_KEYWORDS,
+    PARTIAL_MATCH_MIN_ENTITY_LEN, PARTIAL_MATCH_PREFIX_LEN, PARTIAL_MATCH_STOP_PREFIXES,
+    RoutingSnapshot, get_mtime
+)
+from router.core.weakness_matcher import WeaknessMatcher
+
+
+MAGIC = b'RTRART\x00\x01'
+FORMAT_VERSION = 1
+_ALIGN = 8
+
+
+def keyword_fingerprint() -> str:
+    """
+    Fingerprint of the built-in keyword dictionaries and partial-match rules.
+
+    Artifacts compiled against different code-level keywords are rejected.
+    """
+    payload = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'category_keywords': {k: sorted(v) for k, v in CATEGORY_KEYWORDS.items()},
+        'ood_keywords': sorted(OOD_KEYWORDS),
+        'partial_match': [
+            PARTIAL_MATCH_MIN_ENTITY_LEN,
+            PARTIAL_MATCH_PREFIX_LEN,
+            sorted(PARTIAL_MATCH_STOP_PREFIXES)
+        ]
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _pack_prefix(prefix: str) -> int:
+    """Pack a prefix of up to 3 code points into one uint64 sort key"""
+    key = 0
+    for i in range(3):
+        key = (key << 21) | (ord(prefix[i]) + 1 if i < len(prefix) else 0)
+    return key
+
+
+# ===== Lazy views over mapped sections =====
+
+class _MappedStrings(Sequence):
+    """Sequence of UTF-8 strings stored as an offsets table plus one blob"""
+
+    __slots__ = ('_offsets', '_blob')
+
+    def __init__(self, offsets: Sequence, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._decode(bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]))
+
+    def _decode(self, raw: bytes) -> Any:
+        return raw.decode('utf-8')
+
+
+class _MappedJson(_MappedStrings):
+    """Sequence of JSON documents, decoded on access"""
+
+    __slots__ = ()
+
+    def _decode(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class _IdView(Sequence):
+    """Sequence of items selected from another sequence by an id table"""
+
+    __slots__ = ('_items', '_ids')
+
+    def __init__(self, items: Sequence, ids: Sequence):
+        self._items = items
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._items[j] for j in self._ids[i]]
+        return self._items[self._ids[i]]
+
+
+class _SortedIds(Sequence):
+    """Ascending uint32 ids with O(log n) membership"""
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids: Sequence):
+        self._ids = ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        return self._ids[i]
+
+    def __contains__(self, value) -> bool:
+        i = bisect_left(self._ids, value)
+        return i < len(self._ids) and self._ids[i] == value
+
+
+class _MappedPrefixIndex:
+    """Read-only prefix -> entity rank lookup over sorted packed keys"""
+
+    __slots__ = ('_keys', '_ranks')
+
+    def __init__(self, keys: Sequence, ranks: Sequence):
+        self._keys = keys
+        self._ranks = ranks
+
+    def get(self, prefix: str, default: Optional[int] = None) -> Optional[int]:
+        if len(prefix) > 3:
+            return default
+        key = _pack_prefix(prefix)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._ranks[i]
+        return default
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _MappedTriggerRefs:
+    """trigger id -> ((weakness idx, is_pattern, count), ...) over CSR tables"""
+
+    __slots__ = ('_start', '_weakness', '_is_pattern', '_count')
+
+    def __init__(self, start: Sequence, weakness: Sequence, is_pattern: Sequence, count: Sequence):
+        self._start = start
+        self._weakness = weakness
+        self._is_pattern = is_pattern
+        self._count = count
+
+    def __len__(self) -> int:
+        return len(self._start) - 1
+
+    def __getitem__(self, trigger_id: int) -> List[Tuple[int, int, int]]:
+        lo = self._start[trigger_id]
+        hi = self._start[trigger_id + 1]
+        return list(zip(self._weakness[lo:hi], self._is_pattern[lo:hi], self._count[lo:hi]))
+
+
+# ===== Compile =====
+
+class _SectionWriter:
+    """Accumulates aligned binary sections and their directory entries"""
+
+    def __init__(self):
+        self.sections: Dict[str, List[Any]] = {}
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, name: str, typecode: str, values):
+        data = array(typecode, values).tobytes()
+        self.sections[name] = [self.size, len(data), typecode]
+        self.chunks.append(data)
+        self.size += len(data)
+
+        padding = -self.size % _ALIGN
+        if padding:
+            self.chunks.append(b'\0' * padding)
+            self.size += padding
+
+    def add_strings(self, name: str, strings) -> None:
+        offsets = [0]
+        blob = bytearray()
+        for s in strings:
+            blob += s.encode('utf-8')
+            offsets.append(len(blob))
+        self.add(name + '.offsets', 'Q', offsets)
+        self.add(name + '.blob', 'B', blob)
+
+
+def compile_routing_artifact(snapshot: RoutingSnapshot, output_path: Path) -> Dict[str, Any]:
+    """
+    Write a routing snapshot to a binary artifact.
+
+    The file is written to a temporary path and renamed into place, so
+    workers mapping the previous artifact are never exposed to a partial file.
+
+    Args:
+        snapshot: Snapshot built from the JSON sources
+        output_path: Artifact destination
+
+    Returns:
+        Artifact directory (metadata and section table)
+    """
+    writer = _SectionWriter()
+
+    # Entity/OOD/category automaton and entity names
+    for name, table in snapshot.keyword_automaton.export_tables().items():
+        writer.add(f'keyword_automaton.{name}', 'I', table)
+    writer.add_strings('entity_names', snapshot.entity_names)
+
+    entity_rank = {name: rank for rank, name in enumerate(snapshot.entity_names)}
+    entity_categories = list(snapshot.entities_by_category)
+    for i, category in enumerate(entity_categories):
+        writer.add(f'category_members.{i}', 'I', [entity_rank[n] for n in snapshot.entities_by_category[category]])
+
+    # Partial-match prefix index
+    if any(n > 3 for n in snapshot.prefix_lengths):
+        raise ValueError("Artifact prefix index supports prefixes of at most 3 characters")
+    prefix_items = sorted((_pack_prefix(p), rank) for p, rank in snapshot.prefix_index.items())
+    writer.add('prefix.keys', 'Q', [k for k, _ in prefix_items])
+    writer.add('prefix.ranks', 'I', [r for _, r in prefix_items])
+
+    # Weakness trigger index and payloads
+    matcher = snapshot.weakness_matcher
+    index = matcher.export_index()
+    for name, table in index['trigger_automaton'].export_tables().items():
+        writer.add(f'trigger_automaton.{name}', 'I', table)
+
+    ref_start = [0]
+    ref_weakness, ref_is_pattern, ref_count = [], [], []
+    for refs in index['trigger_refs']:
+        for idx, is_pattern, count in refs:
+            ref_weakness.append(idx)
+            ref_is_pattern.append(int(is_pattern))
+            ref_count.append(count)
+        ref_start.append(len(ref_weakness))
+    writer.add('trigger_refs.start', 'I', ref_start)
+    writer.add('trigger_refs.weakness', 'I', ref_weakness)
+    writer.add('trigger_refs.is_pattern', 'B', ref_is_pattern)
+    writer.add('trigger_refs.count', 'I', ref_count)
+
+    bucket_types = sorted(index['entity_buckets'])
+    for i, entity_type in enumerate(bucket_types):
+        writer.add(f'entity_buckets.{i}', 'I', sorted(index['entity_buckets'][entity_type]))
+
+    writer.add('weakness.keyword_counts', 'I', index['keyword_counts'])
+    writer.add('weakness.pattern_counts', 'I', index['pattern_counts'])
+    writer.add('weakness.frequencies', 'd', [float(f) for f in index['frequencies']])
+    writer.add_strings('weakness.payloads', (
+        json.dumps(w, ensure_ascii=False, separators=(',', ':')) for w in matcher.weaknesses
+    ))
+
+    directory = {
+        'format_version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'created_at': datetime.now().isoformat(),
+        'fingerprint': keyword_fingerprint(),
+        'sources': {
+            'entity_data_path': str(snapshot.entity_data_path),
+            'entity_mtime': snapshot.entity_mtime,
+            'weaknesses_path': str(snapshot.weaknesses_path),
+            'weakness_mtime': snapshot.weakness_mtime
+        },
+        'meta': {
+            'num_keywords': len(snapshot.keyword_automaton),
+            'num_triggers': len(index['trigger_automaton']),
+            'ood_names': list(snapshot.ood_names),
+            'category_names': list(snapshot.category_names),
+            'keyword_category': list(snapshot.keyword_category),
+            'ood_offset': snapshot.ood_offset,
+            'category_offset': snapshot.category_offset,
+            'prefix_lengths': list(snapshot.prefix_lengths),
+            'entity_categories': entity_categories,
+            'bucket_types': bucket_types
+        },
+        'sections': writer.sections
+    }
+
+    directory_bytes = json.dumps(directory, ensure_ascii=False).encode('utf-8')
+    header = MAGIC + struct.pack('=Q', len(directory_bytes)) + directory_bytes
+    header += b'\0' * (-len(header) % _ALIGN)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for chunk in writer.chunks:
+            f.write(chunk)
+    os.replace(tmp_path, output_path)
+
+    logger.info(
+        f"Routing artifact written to {output_path}: "
+        f"{len(snapshot.entity_names)} entities, {len(matcher.weaknesses)} weaknesses, "
+        f"{(len(header) + writer.size) / 1024:.1f} KB"
+    )
+    return directory
+
+
+# ===== Load =====
+
+def read_artifact_directory(artifact_path: Path) -> Dict[str, Any]:
+    """Read only the artifact directory (metadata), without mapping sections"""
+    with open(artifact_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a routing artifact: {artifact_path}")
+        (length,) = struct.unpack('=Q', f.read(8))
+        return json.loads(f.read(length))
+
+
+def load_routing_artifact(
+    artifact_path: Path,
+    generation: int,
+    entity_data_path: Path,
+    weaknesses_path: Path
+) -> Optional[RoutingSnapshot]:
+    """
+    Map a routing artifact and build a snapshot on top of it.
+
+    The artifact is only used if it was compiled from the current versions of
+    the given source files and the current built-in keyword dictionaries.
+
+    Args:
+        artifact_path: Artifact file
+        generation: Generation number for the snapshot
+        entity_data_path: Expected entity source (for staleness check)
+        weaknesses_path: Expected weakness source (for staleness check)
+
+    Returns:
+        Memory-mapped RoutingSnapshot, or None if the artifact is stale or invalid
+    """
+    try:
+        with open(artifact_path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot map routing artifact {artifact_path}: {e}")
+        return None
+
+    buffer = memoryview(mapping)
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        logger.warning(f"Not a routing artifact: {artifact_path}")
+        return None
+
+    (length,) = struct.unpack('=Q', buffer[len(MAGIC):len(MAGIC) + 8])
+    directory_end = len(MAGIC) + 8 + length
+    directory = json.loads(bytes(buffer[len(MAGIC) + 8:directory_end]))
+    base = directory_end + (-directory_end % _ALIGN)
+
+    sources = directory['sources']
+    problems = []
+    if directory.get('format_version') != FORMAT_VERSION:
+        problems.append("format version mismatch")
+    if directory.get('byteorder') != sys.byteorder:
+        problems.append("byte order mismatch")
+    if directory.get('fingerprint') != keyword_fingerprint():
+        problems.append("built-in keywords changed")
+    if get_mtime(entity_data_path) != sources['entity_mtime']:
+        problems.append(f"{entity_data_path} changed since compile")
+    if get_mtime(weaknesses_path) != sources['weakness_mtime']:
+        problems.append(f"{weaknesses_path} changed since compile")
+    if problems:
+        logger.warning(f"Ignoring stale routing artifact {artifact_path}: {'; '.join(problems)}")
+        return None
+
+    def section(name: str):
+        offset, size, typecode = directory['sections'][name]
+        view = buffer[base + offset:base + offset + size]
+        return view if typecode == 'B' else view.cast(typecode)
+
+    def tables(prefix: str) -> Dict[str, Any]:
+        return {name: section(f'{prefix}.{name}') for name in KeywordAutomaton.TABLES}
+
+    meta = directory['meta']
+
+    entity_names = _MappedStrings(section('entity_names.offsets'), section('entity_names.blob'))
+    entities_by_category = MappingProxyType({
+        category: _IdView(entity_names, section(f'category_members.{i}'))
+        for i, category in enumerate(meta['entity_categories'])
+    })
+
+    weaknesses = _MappedJson(section('weakness.payloads.offsets'), section('weakness.payloads.blob'))
+    weakness_matcher = WeaknessMatcher.from_index(
+        str(weaknesses_path),
+        weaknesses,
+        {
+            'trigger_automaton': KeywordAutomaton.from_tables(meta['num_triggers'], tables('trigger_automaton')),
+            'trigger_refs': _MappedTriggerRefs(
+                section('trigger_refs.start'),
+                section('trigger_refs.weakness'),
+                section('trigger_refs.is_pattern'),
+                section('trigger_refs.count')
+            ),
+            'entity_buckets': {
+                entity_type: _SortedIds(section(f'entity_buckets.{i}'))
+                for i, entity_type in enumerate(meta['bucket_types'])
+            },
+            'keyword_counts': section('weakness.keyword_counts'),
+            'pattern_counts': section('weakness.pattern_counts'),
+            'frequencies': section('weakness.frequencies')
+        }
+    )
+
+    snapshot = RoutingSnapshot(
+        generation=generation,
+        created_at=datetime.now().isoformat(),
+        source=f"artifact:{artifact_path}",
+        entity_data_path=entity_data_path,
+        weaknesses_path=weaknesses_path,
+        entity_mtime=sources['entity_mtime'],
+        weakness_mtime=sources['weakness_mtime'],
+        entities_by_category=entities_by_category,
+        all_entities=entity_names,
+        entity_names=entity_names,
+        ood_keywords=OOD_KEYWORDS,
+        ood_names=tuple(meta['ood_names']),
+        ood_offset=meta['ood_offset'],
+        category_keywords=CATEGORY_KEYWORDS,
+        category_names=tuple(meta['category_names']),
+        keyword_category=tuple(meta['keyword_category']),
+        category_offset=meta['category_offset'],
+        keyword_automaton=KeywordAutomaton.from_tables(meta['num_keywords'], tables('keyword_automaton')),
+        prefix_index=_MappedPrefixIndex(section('prefix.keys'), section('prefix.ranks')),
+        prefix_lengths=tuple(meta['prefix_lengths']),
+        weakness_matcher=weakness_matcher
+    )
+
+    logger.info(
+        f"Mapped routing artifact {artifact_path}: {len(entity_names)} entities, "
+        f"{len(weaknesses)} weaknesses (compiled {directory['created_at']})"
+    )
+    return snapshot
@@ -0,0 +1,289 @@
+"""
+Off-loop execution of routing work.
+
+Routing decisions (automaton scans, weakness matching, inline hot-reload) and
+prompt assembly are synchronous CPU work. Running them directly inside the
+`async def` endpoints stalls every other coroutine in the worker, including
+in-flight streaming responses. `RoutingExecutor` runs that work in a bounded
+pool instead.
+
+Modes (ROUTER_ROUTING_EXECUTION_MODE):
+- inline: run on the event loop (lowest overhead, for tiny catalogs)
+- thread: bounded thread pool; the GIL is released every switch interval, so
+  streams keep flowing while a slow decision runs
+- process: bounded process pool; each worker process holds its own decision
+  engine (cheap with a compiled routing artifact, whose pages are shared)
+"""
+
+import asyncio
+import multiprocessing
+from itertools import repeat
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from loguru import logger
+
+from router.config.settings import get_router_settings
+from router.core.decision_engine import get_decision_engine
+from router.utils.prompt_builder import PromptBuilder
+
+
+EXECUTION_MODES = ('inline', 'thread', 'process')
+
+
+# ===== Work functions (module-level so the process pool can pickle them) =====
+
+def _init_process_worker():
+    """Load routing data once per pool process"""
+    get_decision_engine()
+
+
+def _route(
+    question: str,
+    entity_type: Optional[str],
+    min_confidence: float,
+    auto_reload: bool
+) -> Dict[str, Any]:
+    return get_decision_engine().get_routing_decision(
+        question=question,
+        entity_type=entity_type,
+        min_confidence=min_confidence,
+        auto_reload=auto_reload
+    )
+
+
+def _route_batch(
+    items: List[Tuple[str, Optional[str]]],
+    min_confidence: float,
+    auto_reload: bool
+) -> List[Dict[str, Any]]:
+    return get_decision_engine().get_routing_decisions(
+        items=items,
+        min_confidence=min_confidence,
+        auto_reload=auto_reload
+    )
+
+
+def _build_prompt(
+    base_prompt: Optional[str],
+    weakness_patterns: Optional[List[Dict[str, Any]]],
+    rag_context: Optional[str]
+) -> str:
+    return PromptBuilder().build_prompt(
+        base_prompt=base_prompt,
+        weakness_patterns=weakness_patterns,
+        rag_context=rag_context
+    )
+
+
+def _build_prompt_sections(
+    base_prompt: Optional[str],
+    weakness_patterns: Optional[List[Dict[str, Any]]],
+    rag_context: Optional[str]
+) -> Tuple[str, str]:
+    return PromptBuilder().build_prompt_sections(
+        base_prompt=base_prompt,
+        weakness_patterns=weakness_patterns,
+        rag_context=rag_context
+    )
+
+
+def _fit_prompt_budget(
+    base_prompt: Optional[str],
+    weakness_patterns: Optional[List[Dict[str, Any]]],
+    max_tokens: int,
+    rag_context: Optional[str]
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return PromptBuilder().fit_to_budget(
+        max_tokens,
+        base_prompt=base_prompt,
+        weakness_patterns=weakness_patterns,
+        rag_context=rag_context
+    )[:2]
+
+
+class RoutingExecutor:
+    """
+    Runs routing decisions and prompt builds off the event loop.
+
+    Features:
+    - inline / thread / process execution modes
+    - Pool size limit (ROUTER_ROUTING_POOL_SIZE)
+    - Process pool restart on forced reload, so pool processes pick up new data
+    """
+
+    def __init__(self, mode: Optional[str] = None, max_workers: Optional[int] = None):
+        """
+        Initialize routing executor.
+
+        Args:
+            mode: 'inline', 'thread' or 'process' (default: ROUTER_ROUTING_EXECUTION_MODE)
+            max_workers: Pool size (default: ROUTER_ROUTING_POOL_SIZE)
+        """
+        settings = get_router_settings()
+
+        mode = (mode or settings.ROUTING_EXECUTION_MODE).lower()
+        if mode not in EXECUTION_MODES:
+            logger.warning(f"Unknown routing execution mode '{mode}', using thread pool")
+            mode = 'thread'
+
+        self.mode = mode
+        self.max_workers = max(1, max_workers or settings.ROUTING_POOL_SIZE)
+        self._pool: Optional[Executor] = self._create_pool()
+
+    def _create_pool(self) -> Optional[Executor]:
+        if self.mode == 'thread':
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='routing')
+        if self.mode == 'process':
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_process_worker
+            )
+        return None
+
+    async def _run(self, fn, *args):
+        if self._pool is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    async def get_routing_decision(
+        self,
+        question: str,
+        entity_type: Optional[str] = None,
+        min_confidence: float = 0.70,
+        auto_reload: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Compute a routing decision in the pool.
+
+        Args:
+            question: The question text
+            entity_type: Optional entity type hint
+            min_confidence: Minimum confidence for pattern retrieval usage
+            auto_reload: Whether to check for data updates inline
+
+        Returns:
+            Routing decision dictionary (see DecisionEngine.get_routing_decision)
+        """
+        if self.mode == 'process':
+            # Pool processes have no background watcher of their own
+            auto_reload = get_router_settings().ENABLE_HOT_RELOAD
+        return await self._run(_route, question, entity_type, min_confidence, auto_reload)
+
+    def _chunks(self, items: Sequence[Tuple[str, Optional[str]]]) -> List[List[Tuple[str, Optional[str]]]]:
+        """Split a batch into pool tasks of at least BATCH_CHUNK_SIZE items, one per worker"""
+        chunk_size = max(get_router_settings().BATCH_CHUNK_SIZE, -(-len(items) // self.max_workers), 1)
+        return [list(items[i:i + chunk_size]) for i in range(0, len(items), chunk_size)]
+
+    async def get_routing_decisions(
+        self,
+        items: Sequence[Tuple[str, Optional[str]]],
+        min_confidence: float = 0.70,
+        auto_reload: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Route a batch of questions, spread over the pool.
+
+        Args:
+            items: (question, entity_type) pairs
+            min_confidence: Minimum confidence for pattern retrieval usage
+            auto_reload: Whether to check for data updates inline
+
+        Returns:
+            One decision per item, in input order (see DecisionEngine.get_routing_decisions)
+        """
+        if self.mode == 'process':
+            auto_reload = get_router_settings().ENABLE_HOT_RELOAD
+        results = await asyncio.gather(*[
+            self._run(_route_batch, chunk, min_confidence, auto_reload)
+            for chunk in self._chunks(items)
+        ])
+        return [decision for chunk in results for decision in chunk]
+
+    def map_routing_decisions(
+        self,
+        batches: Iterable[List[Tuple[str, Optional[str]]]],
+        min_confidence: float = 0.70
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Route batches synchronously (offline jobs), yielding results in input order.
+
+        Args:
+            batches: Lists of (question, entity_type) pairs
+            min_confidence: Minimum confidence for pattern retrieval usage
+
+        Yields:
+            Decisions for each batch
+        """
+        if self._pool is None:
+            for batch in batches:
+                yield _route_batch(batch, min_confidence, False)
+            return
+        yield from self._pool.map(_route_batch, batches, repeat(min_confidence), repeat(False))
+
+    async def build_prompt(
+        self,
+        base_prompt: Optional[str] = None,
+        weakness_patterns: Optional[List[Dict[str, Any]]] = None,
+        rag_context: Optional[str] = None
+    ) -> str:
+        """Build an enhanced prompt in the pool (see PromptBuilder.build_prompt)"""
+        return await self._run(_build_prompt, base_prompt, weakness_patterns, rag_context)
+
+    async def build_prompt_sections(
+        self,
+        base_prompt: Optional[str] = None,
+        weakness_patterns: Optional[List[Dict[str, Any]]] = None,
+        rag_context: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Build (stable, dynamic) prompt sections in the pool (see PromptBuilder.build_prompt_sections)"""
+        return await self._run(_build_prompt_sections, base_prompt, weakness_patterns, rag_context)
+
+    async def fit_prompt_budget(
+        self,
+        base_prompt: Optional[str],
+        weakness_patterns: Optional[List[Dict[str, Any]]],
+        max_tokens: int,
+        rag_context: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Weakness patterns and pattern context that fit a prompt token budget, in the pool.
+
+        Returns:
+            (weakness_patterns, rag_context) that fit (see PromptBuilder.fit_to_budget)
+        """
+        return await self._run(_fit_prompt_budget, base_prompt, weakness_patterns, max_tokens, rag_context)
+
+    def restart(self):
+        """Replace the process pool so its workers reload routing data"""
+        if self.mode != 'process':
+            return
+        old_pool = self._pool
+        self._pool = self._create_pool()
+        old_pool.shutdown(wait=False)
+        logger.info("Routing process pool restarted")
+
+    def shutdown(self):
+        """Shut down the pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor configuration"""
+        return {
+            'mode': self.mode,
+            'max_workers': self.max_workers if self.mode != 'inline' else 0
+        }
+
+
+# Singleton instance
+_routing_executor: Optional[RoutingExecutor] = None
+
+
+def get_routing_executor() -> RoutingExecutor:
+    """Get the global routing executor instance"""
+    global _routing_executor
+    if _routing_executor is None:
+        _routing_executor = RoutingExecutor()
+    return _routing_executor
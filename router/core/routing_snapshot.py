@@ -0,0 +1,235 @@
+"""
+Immutable routing snapshot for lock-free hot-reload.
+
+All data the decision engine reads per request (entity catalog, keyword
+dictionaries, compiled automaton, prefix index, weakness matcher) lives in a
+single `RoutingSnapshot`. Reloads build a complete new snapshot off to the
+side and publish it with one reference assignment, so concurrent requests
+always see either the old or the new state, never a mix of both.
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+from loguru import logger
+
+from router.core.keyword_automaton import KeywordAutomaton
+from router.core.weakness_matcher import WeaknessMatcher
+
+
+# Category keywords (learned from database)
+CATEGORY_KEYWORDS: Mapping[str, FrozenSet[str]] = MappingProxyType({
+    'diseases': frozenset({
+        '糖尿病', '高血压', '白血病', '肺结节', '半月板', '游走脾',
+        '沙门氏菌', '卡波西肉瘤', '家族性高胆固醇血症', '类鼻疽',
+        '疾病', '症状', '治疗', '病因'
+    }),
+    'examinations': frozenset({
+        '检查', '筛查', 'CT', 'MRI', 'X光', '超声', 'B超',
+        '血常规', '尿检', '心电图', '胃镜', '肠镜', '活检'
+    }),
+    'surgeries': frozenset({
+        '手术', '术后', '操作', '切除', '置换', '移植',
+        '微创', '开放', '腹腔镜', '穿刺'
+    }),
+    'vaccines': frozenset({
+        '疫苗', '接种', '注射', '免疫', '预防针',
+        '乙肝', '流感', '肺炎', '狂犬', 'HPV'
+    })
+})
+
+# Known out-of-database topics (learned from failed retrievals)
+OOD_KEYWORDS: FrozenSet[str] = frozenset({
+    '摇晃综合征', '婴儿摇晃', 'Shaken Baby',
+    '念珠菌性龟头炎', '念珠菌龟头',
+    '海绵状血管瘤', '血管瘤',
+    '阴唇粘连', '外阴粘连',
+    '先天性心脏病筛查',
+    '单纯性甲状腺肿',
+    '心脏性猝死预防',
+    '变性手术', '性别肯定手术',
+    '感染性疾病通用症状'
+})
+
+# Partial-match (Strategy 4) parameters: entities of at least this length are
+# indexed by their leading characters, except for generic stop prefixes.
+PARTIAL_MATCH_MIN_ENTITY_LEN = 3
+PARTIAL_MATCH_PREFIX_LEN = 3
+PARTIAL_MATCH_STOP_PREFIXES = frozenset({'检查', '手术', '疫苗'})
+
+EMPTY_ENTITIES = {'diseases': [], 'examinations': [], 'surgeries': [], 'vaccines': []}
+
+
+class RoutingSnapshot:
+    """
+    Immutable, compact view of all routing data.
+
+    Keyword ids in `keyword_automaton` are laid out as
+    [entities | OOD keywords | category keywords], each block in the iteration
+    order of its source collection, so the lowest matching id in a block is
+    the keyword a per-keyword loop would have hit first.
+    """
+
+    __slots__ = (
+        'generation', 'created_at', 'source',
+        'entity_data_path', 'weaknesses_path', 'entity_mtime', 'weakness_mtime',
+        'entities_by_category', 'all_entities', 'entity_names',
+        'ood_keywords', 'ood_names', 'ood_offset',
+        'category_keywords', 'category_names', 'keyword_category', 'category_offset',
+        'keyword_automaton', 'prefix_index', 'prefix_lengths',
+        'weakness_matcher'
+    )
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("RoutingSnapshot is immutable; build a new one instead")
+
+    def __delattr__(self, name: str):
+        raise AttributeError("RoutingSnapshot is immutable; build a new one instead")
+
+    def find_partial_match(self, question: str) -> Optional[str]:
+        """Return the first entity whose indexed prefix occurs in the question"""
+        prefix_index = self.prefix_index
+        best_rank = None
+
+        for n in self.prefix_lengths:
+            for i in range(len(question) - n + 1):
+                rank = prefix_index.get(question[i:i + n])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank = rank
+
+        return self.entity_names[best_rank] if best_rank is not None else None
+
+
+def get_mtime(filepath: Path) -> float:
+    """Get file modification time (0 if missing)"""
+    try:
+        return os.path.getmtime(filepath) if filepath.exists() else 0
+    except Exception:
+        return 0
+
+
+def _load_entities(entity_data_path: Path) -> dict:
+    """Load entity names from JSON file"""
+    if not entity_data_path.exists():
+        logger.warning(f"Entity data not found: {entity_data_path}")
+        return dict(EMPTY_ENTITIES)
+
+    try:
+        with open(entity_data_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load entities: {e}")
+        return dict(EMPTY_ENTITIES)
+
+
+def _build_entity_fields(entity_data_path: Path) -> Dict[str, Any]:
+    """Load the entity catalog and compile the keyword automaton and prefix index"""
+    entities = _load_entities(entity_data_path)
+
+    entities_by_category = MappingProxyType({
+        category: tuple(names) for category, names in entities.items()
+    })
+    all_entities = frozenset(
+        name for names in entities_by_category.values() for name in names
+    )
+
+    entity_names = tuple(all_entities)
+    ood_names = tuple(OOD_KEYWORDS)
+    category_names = tuple(CATEGORY_KEYWORDS)
+
+    category_words = []
+    keyword_category = []
+    for category_idx, category in enumerate(category_names):
+        for keyword in CATEGORY_KEYWORDS[category]:
+            category_words.append(keyword)
+            keyword_category.append(category_idx)
+
+    # Prefix index: 2/3-character prefix -> rank of first entity carrying it
+    prefix_index: Dict[str, int] = {}
+    for rank, entity_name in enumerate(entity_names):
+        if len(entity_name) < PARTIAL_MATCH_MIN_ENTITY_LEN:
+            continue
+        prefix = entity_name[:PARTIAL_MATCH_PREFIX_LEN]
+        if len(prefix) >= 2 and prefix not in PARTIAL_MATCH_STOP_PREFIXES:
+            prefix_index.setdefault(prefix, rank)
+
+    return {
+        'entities_by_category': entities_by_category,
+        'all_entities': all_entities,
+        'entity_names': entity_names,
+        'ood_keywords': OOD_KEYWORDS,
+        'ood_names': ood_names,
+        'ood_offset': len(entity_names),
+        'category_keywords': CATEGORY_KEYWORDS,
+        'category_names': category_names,
+        'keyword_category': tuple(keyword_category),
+        'category_offset': len(entity_names) + len(ood_names),
+        'keyword_automaton': KeywordAutomaton(entity_names + ood_names + tuple(category_words)),
+        'prefix_index': MappingProxyType(prefix_index),
+        'prefix_lengths': tuple(sorted({len(prefix) for prefix in prefix_index}))
+    }
+
+
+_ENTITY_FIELDS: Tuple[str, ...] = (
+    'entities_by_category', 'all_entities', 'entity_names',
+    'ood_keywords', 'ood_names', 'ood_offset',
+    'category_keywords', 'category_names', 'keyword_category', 'category_offset',
+    'keyword_automaton', 'prefix_index', 'prefix_lengths'
+)
+
+
+def build_snapshot(
+    entity_data_path: Path,
+    weaknesses_path: Path,
+    generation: int,
+    previous: Optional[RoutingSnapshot] = None
+) -> RoutingSnapshot:
+    """
+    Build a complete routing snapshot.
+
+    Parts whose source file is unchanged since `previous` was built are
+    shared with it instead of being reparsed.
+
+    Args:
+        entity_data_path: Path to entity_names.json
+        weaknesses_path: Path to deepseek_weaknesses.json
+        generation: Generation number for the new snapshot
+        previous: Optional snapshot to reuse unchanged parts from
+
+    Returns:
+        New RoutingSnapshot
+    """
+    # Read mtimes before the files so a write during the build triggers another reload
+    entity_mtime = get_mtime(entity_data_path)
+    weakness_mtime = get_mtime(weaknesses_path)
+
+    if (previous is not None and previous.entity_data_path == entity_data_path
+            and previous.entity_mtime == entity_mtime):
+        entity_fields = {name: getattr(previous, name) for name in _ENTITY_FIELDS}
+    else:
+        entity_fields = _build_entity_fields(entity_data_path)
+
+    if (previous is not None and previous.weaknesses_path == weaknesses_path
+            and previous.weakness_mtime == weakness_mtime):
+        weakness_matcher = previous.weakness_matcher
+    else:
+        weakness_matcher = WeaknessMatcher(str(weaknesses_path))
+
+    return RoutingSnapshot(
+        generation=generation,
+        created_at=datetime.now().isoformat(),
+        source='json',
+        entity_data_path=entity_data_path,
+        weaknesses_path=weaknesses_path,
+        entity_mtime=entity_mtime,
+        weakness_mtime=weakness_mtime,
+        weakness_matcher=weakness_matcher,
+        **entity_fields
+    )
@@ -3,11 +3,21 @@ Weakness pattern matcher for identifying DeepSeek API weaknesses.
 Used by router to add targeted prompts even when pattern retrieval doesn't match.
 """
 
+import heapq
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from loguru import logger
 
+from router.core.keyword_automaton import KeywordAutomaton
+from router.utils.json_codec import WeaknessMatch, encode_fields
+
+# Fields copied from a weakness into each match (all but match_score are static per snapshot)
+MATCH_FIELDS = (
+    'weakness_id', 'category', 'subcategory', 'description',
+    'severity', 'frequency', 'prompt_addition'
+)
+
 
 class WeaknessMatcher:
     """
@@ -15,8 +25,9 @@ class WeaknessMatcher:
 
     Strategy:
     1. Load weakness patterns from JSON
-    2. Match question to patterns using keywords and patterns
-    3. Return relevant weakness reminders for prompt augmentation
+    2. Index trigger keywords/question patterns -> weakness ids at load time
+    3. Score only the weaknesses hit by a trigger (or by the entity type)
+    4. Return relevant weakness reminders for prompt augmentation
     """
 
     def __init__(self, weakness_data_path: str = "optimizer/config/deepseek_weaknesses.json"):
@@ -27,7 +38,9 @@ class WeaknessMatcher:
             weakness_data_path: Path to deepseek_weaknesses.json (default: optimizer/config/)
         """
         self.weakness_data_path = Path(weakness_data_path)
-        self.weaknesses = self._load_weaknesses()
+        self.weaknesses: Tuple[Dict[str, Any], ...] = tuple(self._load_weaknesses())
+        self._build_trigger_index()
+        self._static_json: Dict[int, bytes] = {}
 
         logger.info(f"WeaknessMatcher initialized with {len(self.weaknesses)} weakness patterns")
 
@@ -45,6 +58,88 @@ class WeaknessMatcher:
             logger.error(f"Failed to load weaknesses: {e}")
             return []
 
+    def _build_trigger_index(self):
+        """
+        Build the inverted trigger index over the loaded weaknesses.
+
+        - One automaton over all distinct trigger keywords/question patterns
+        - Per trigger: (weakness index, is_pattern, multiplicity) references
+        - Per entity type: weakness indices listing that type
+        - Per weakness: frequency and keyword/pattern counts for scoring
+        """
+        trigger_ids: Dict[str, int] = {}
+        trigger_refs: List[Dict[Tuple[int, bool], int]] = []
+        entity_buckets: Dict[str, List[int]] = {}
+        keyword_counts = []
+        pattern_counts = []
+
+        for idx, weakness in enumerate(self.weaknesses):
+            triggers = weakness.get('triggers') or {}
+            keywords = triggers.get('keywords') or []
+            patterns = triggers.get('question_patterns') or []
+
+            keyword_counts.append(len(keywords))
+            pattern_counts.append(len(patterns))
+
+            for is_pattern, words in ((False, keywords), (True, patterns)):
+                for word in words:
+                    trigger_id = trigger_ids.setdefault(word, len(trigger_ids))
+                    if trigger_id == len(trigger_refs):
+                        trigger_refs.append({})
+                    ref = (idx, is_pattern)
+                    trigger_refs[trigger_id][ref] = trigger_refs[trigger_id].get(ref, 0) + 1
+
+            for entity_type in triggers.get('entity_types') or []:
+                bucket = entity_buckets.setdefault(entity_type, [])
+                if not bucket or bucket[-1] != idx:
+                    bucket.append(idx)
+
+        self._trigger_automaton = KeywordAutomaton(list(trigger_ids))
+        self._trigger_refs = tuple(
+            tuple((idx, is_pattern, count) for (idx, is_pattern), count in refs.items())
+            for refs in trigger_refs
+        )
+        self._entity_buckets = {k: frozenset(v) for k, v in entity_buckets.items()}
+        self._keyword_counts = tuple(keyword_counts)
+        self._pattern_counts = tuple(pattern_counts)
+        self._frequencies = tuple(w.get('frequency', 0) for w in self.weaknesses)
+
+    # Index attributes shared by export_index/from_index
+    INDEX_FIELDS = (
+        'trigger_automaton', 'trigger_refs', 'entity_buckets',
+        'keyword_counts', 'pattern_counts', 'frequencies'
+    )
+
+    def export_index(self) -> Dict[str, Any]:
+        """Get the trigger index structures (for serialization)"""
+        return {name: getattr(self, '_' + name) for name in self.INDEX_FIELDS}
+
+    @classmethod
+    def from_index(
+        cls,
+        weakness_data_path: str,
+        weaknesses: Sequence[Dict[str, Any]],
+        index: Dict[str, Any]
+    ) -> 'WeaknessMatcher':
+        """
+        Create a matcher from a prebuilt trigger index without reading JSON.
+
+        Args:
+            weakness_data_path: Source path (informational)
+            weaknesses: Weakness payloads, indexable by weakness id
+            index: Structures keyed by INDEX_FIELDS (see export_index)
+
+        Returns:
+            WeaknessMatcher using the given index
+        """
+        matcher = cls.__new__(cls)
+        matcher.weakness_data_path = Path(weakness_data_path)
+        matcher.weaknesses = weaknesses
+        for name in cls.INDEX_FIELDS:
+            setattr(matcher, '_' + name, index[name])
+        matcher._static_json = {}
+        return matcher
+
     def match_weaknesses(
         self,
         question: str,
@@ -64,78 +159,99 @@ class WeaknessMatcher:
         Returns:
             List of matched weakness patterns with scores
         """
-        matches = []
+        if not self.weaknesses:
+            return []
+
+        # Collect trigger hits per candidate weakness: idx -> [keyword hits, pattern hits]
+        hits: Dict[int, List[int]] = {}
+        for trigger_id in self._trigger_automaton.find(question):
+            for idx, is_pattern, count in self._trigger_refs[trigger_id]:
+                counts = hits.get(idx)
+                if counts is None:
+                    counts = hits[idx] = [0, 0]
+                counts[is_pattern] += count
 
-        for weakness in self.weaknesses:
+        typed = self._entity_buckets.get(entity_type, frozenset()) if entity_type else frozenset()
+
+        candidates = []
+        frequencies = self._frequencies
+
+        for idx in sorted(hits.keys() | typed):
             # Skip if frequency too low
-            if weakness.get('frequency', 0) < min_frequency:
+            if frequencies[idx] < min_frequency:
                 continue
 
-            # Calculate match score
-            score = self._calculate_match_score(question, weakness, entity_type)
+            score = self._calculate_match_score(idx, hits.get(idx), idx in typed)
 
             if score > 0:
-                matches.append({
-                    'weakness_id': weakness['weakness_id'],
-                    'category': weakness['category'],
-                    'subcategory': weakness['subcategory'],
-                    'description': weakness['description'],
-                    'severity': weakness['severity'],
-                    'frequency': weakness['frequency'],
-                    'prompt_addition': weakness['prompt_addition'],
-                    'match_score': score
-                })
-
-        # Sort by match score (descending) and take top_k
-        matches.sort(key=lambda x: (x['match_score'], x['frequency']), reverse=True)
-        top_matches = matches[:top_k]
+                candidates.append((score, frequencies[idx], idx))
+
+        # Take top_k by match score, then frequency (descending); payloads are
+        # only built for the weaknesses actually returned
+        top_matches = [
+            self._make_match(idx, score)
+            for score, _, idx in heapq.nlargest(top_k, candidates, key=lambda c: (c[0], c[1]))
+        ]
 
         if top_matches:
-            logger.info(
+            logger.debug(
                 f"Matched {len(top_matches)} weakness patterns for question: "
                 f"{[m['weakness_id'] for m in top_matches]}"
             )
 
         return top_matches
 
+    def _make_match(self, idx: int, score: float) -> WeaknessMatch:
+        """
+        Build the match payload for a weakness.
+
+        The static fields are serialized once per weakness and reused by the
+        response encoder, so only match_score is encoded per request.
+        """
+        weakness = self.weaknesses[idx]
+        fields = {name: weakness[name] for name in MATCH_FIELDS}
+
+        static_json = self._static_json.get(idx)
+        if static_json is None:
+            static_json = self._static_json[idx] = encode_fields(fields)
+
+        match = WeaknessMatch(static_json, fields)
+        match['match_score'] = score
+        return match
+
     def _calculate_match_score(
         self,
-        question: str,
-        weakness: Dict[str, Any],
-        entity_type: Optional[str] = None
+        idx: int,
+        trigger_hits: Optional[List[int]],
+        entity_type_match: bool
     ) -> float:
         """
-        Calculate how well a weakness pattern matches the question.
+        Calculate how well a candidate weakness pattern matches the question.
+
+        Args:
+            idx: Weakness index
+            trigger_hits: [keyword hits, question pattern hits] from the trigger index
+            entity_type_match: Whether the request entity type is in the weakness triggers
 
         Returns:
             Match score (0.0 = no match, 1.0 = perfect match)
         """
         score = 0.0
-        question_lower = question.lower()
-
-        triggers = weakness.get('triggers', {})
+        matched_keywords, matched_patterns = trigger_hits or (0, 0)
 
         # Check entity type match (30% weight)
-        entity_types = triggers.get('entity_types', [])
-        if entity_type and entity_types:
-            if entity_type in entity_types:
-                score += 0.30
+        if entity_type_match:
+            score += 0.30
 
         # Check keyword match (40% weight)
-        keywords = triggers.get('keywords', [])
-        if keywords:
-            matched_keywords = sum(1 for kw in keywords if kw in question)
-            if matched_keywords > 0:
-                keyword_score = min(1.0, matched_keywords / len(keywords))
-                score += 0.40 * keyword_score
+        if matched_keywords > 0:
+            keyword_score = min(1.0, matched_keywords / self._keyword_counts[idx])
+            score += 0.40 * keyword_score
 
         # Check question pattern match (30% weight)
-        patterns = triggers.get('question_patterns', [])
-        if patterns:
-            matched_patterns = sum(1 for pat in patterns if pat in question)
-            if matched_patterns > 0:
-                pattern_score = min(1.0, matched_patterns / len(patterns))
-                score += 0.30 * pattern_score
+        if matched_patterns > 0:
+            pattern_score = min(1.0, matched_patterns / self._pattern_counts[idx])
+            score += 0.30 * pattern_score
 
         return score
 
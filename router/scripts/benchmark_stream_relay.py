@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Streaming Relay Benchmark
+
+Measures router-side CPU cost of streaming completions: the parse-and-reencode
+path (`async_chat_completion_stream`) versus the zero-parse relay
+(`async_chat_completion_relay`). A local stub upstream in a separate process
+replays canned SSE chunks as fast as possible, so the number reported is
+tokens relayed per second of router CPU time (i.e. per core).
+
+Usage:
+    python router/scripts/benchmark_stream_relay.py
+    python router/scripts/benchmark_stream_relay.py --streams 200 --tokens 500 --concurrency 20
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from pathlib import Path
+from loguru import logger
+
+# Add repo root to path
+repo_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(repo_root))
+
+# Configure logger
+logger.remove()
+logger.add(sys.stderr, level="WARNING")
+
+MODES = ('parse', 'relay')
+
+
+def parse_args():
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark streaming relay modes against a local stub upstream",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--streams', type=int, default=100, help='Streams per mode (default: 100)')
+    parser.add_argument('--tokens', type=int, default=300, help='Chunks per stream (default: 300)')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent streams (default: 10)')
+    parser.add_argument('--port', type=int, default=18765, help='Stub upstream port (default: 18765)')
+    return parser.parse_args()
+
+
+def run_stub_upstream(port: int, tokens: int):
+    """Serve canned SSE chunks on /v1/chat/completions (runs in a child process)"""
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+
+    def frame(delta: dict, finish_reason=None) -> bytes:
+        chunk = {
+            "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 1700000000,
+            "model": "deepseek-chat",
+            "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    canned = (
+        [frame({"role": "assistant", "content": ""})]
+        + [frame({"content": "糖尿病"}) for _ in range(tokens)]
+        + [frame({}, "stop"), b"data: [DONE]\n\n"]
+    )
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        await request.body()
+
+        async def replay():
+            for chunk in canned:
+                yield chunk
+
+        return StreamingResponse(replay(), media_type="text/event-stream")
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def build_request():
+    """Streaming request sent in every benchmark call"""
+    from router.api.llm_schemas import ChatCompletionRequest, ChatMessage
+
+    return ChatCompletionRequest(
+        model="deepseek-chat",
+        messages=[ChatMessage(role="user", content="糖尿病有哪些症状？")],
+        stream=True
+    )
+
+
+async def run_mode(mode: str, streams: int, args) -> dict:
+    """Run `streams` streams in one mode and measure router CPU time"""
+    from router.services.llm_client import get_llm_client
+
+    client = get_llm_client()
+    stream_method = client.async_chat_completion_relay if mode == 'relay' else client.async_chat_completion_stream
+    request = build_request()
+    decision = {'use_patterns': True, 'routing_tier': 'pattern_retrieval', 'weakness_patterns': []}
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_stream():
+        async with semaphore:
+            async for _ in stream_method(request=request, routing_decision=decision):
+                pass
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    await asyncio.gather(*[one_stream() for _ in range(streams)])
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    tokens = streams * args.tokens
+    return {
+        'mode': mode,
+        'tokens': tokens,
+        'cpu_seconds': cpu,
+        'wall_seconds': wall,
+        'tokens_per_cpu_second': tokens / cpu if cpu else 0.0
+    }
+
+
+async def run_benchmark(args) -> list:
+    """Warm up connections, then benchmark each mode"""
+    for mode in MODES:
+        await run_mode(mode, min(args.concurrency, args.streams), args)
+
+    return [await run_mode(mode, args.streams, args) for mode in MODES]
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args()
+
+    # Point the router's DeepSeek client at the stub (before router modules are imported)
+    os.environ['DEEPSEEK_API_KEY'] = 'stub'
+    os.environ['DEEPSEEK_BASE_URL'] = f'http://127.0.0.1:{args.port}/v1'
+    os.environ['ROUTER_MODEL_MAX_CONCURRENCY'] = str(max(args.concurrency, 1))
+    os.environ['ROUTER_ENABLE_METRICS'] = 'false'
+
+    stub = multiprocessing.Process(target=run_stub_upstream, args=(args.port, args.tokens), daemon=True)
+    stub.start()
+    time.sleep(2.0)
+
+    try:
+        results = asyncio.run(run_benchmark(args))
+    finally:
+        stub.terminate()
+
+    print()
+    print("=" * 60)
+    print(f"Streaming relay benchmark: {args.streams} streams x {args.tokens} chunks, "
+          f"concurrency {args.concurrency}")
+    print("=" * 60)
+    print(f"{'Mode':8s} {'CPU (s)':>10s} {'Wall (s)':>10s} {'Tokens/CPU-s':>15s}")
+    for r in results:
+        print(f"{r['mode']:8s} {r['cpu_seconds']:10.2f} {r['wall_seconds']:10.2f} {r['tokens_per_cpu_second']:15,.0f}")
+
+    parse_rate = results[0]['tokens_per_cpu_second']
+    relay_rate = results[1]['tokens_per_cpu_second']
+    if parse_rate:
+        print(f"\nRelay speedup: {relay_rate / parse_rate:.2f}x tokens per core")
+
+
+if __name__ == "__main__":
+    main()
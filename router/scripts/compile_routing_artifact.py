@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Routing Artifact Compiler
+
+Compiles entity_names.json and deepseek_weaknesses.json into a single binary
+routing artifact (automaton tables, prefix index, weakness trigger index and
+payloads). Router workers memory-map the artifact read-only, so they share
+its pages instead of each parsing the JSON and building their own indexes.
+
+Usage:
+    python router/scripts/compile_routing_artifact.py
+    python router/scripts/compile_routing_artifact.py --output outputs/router/routing.artifact
+    python router/scripts/compile_routing_artifact.py --info outputs/router/routing.artifact
+
+Then point the router at it:
+    ROUTER_ROUTING_ARTIFACT_PATH=outputs/router/routing.artifact python router/scripts/serve_router.py
+
+Re-run after the source files change; stale artifacts are detected and
+ignored (workers fall back to parsing the JSON sources).
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from loguru import logger
+
+# Add repo root to path
+repo_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(repo_root))
+
+# Configure logger
+logger.remove()
+logger.add(sys.stderr, level="INFO")
+
+from router.config.settings import get_router_settings
+from router.core.routing_artifact import compile_routing_artifact, read_artifact_directory
+from router.core.routing_snapshot import build_snapshot
+
+DEFAULT_OUTPUT = Path("outputs/router/routing.artifact")
+
+
+def parse_args():
+    """Parse command-line arguments"""
+    settings = get_router_settings()
+
+    parser = argparse.ArgumentParser(
+        description="Compile router data into a memory-mappable routing artifact",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compile using paths from router settings
+  python router/scripts/compile_routing_artifact.py
+
+  # Custom sources and output
+  python router/scripts/compile_routing_artifact.py \\
+      --entities router/refs/entity_names.json \\
+      --weaknesses optimizer/config/deepseek_weaknesses.json \\
+      --output outputs/router/routing.artifact
+
+  # Inspect an existing artifact
+  python router/scripts/compile_routing_artifact.py --info outputs/router/routing.artifact
+        """
+    )
+
+    parser.add_argument(
+        '--entities',
+        type=Path,
+        default=settings.ENTITY_NAMES_PATH,
+        help=f'Entity names JSON (default: {settings.ENTITY_NAMES_PATH})'
+    )
+
+    parser.add_argument(
+        '--weaknesses',
+        type=Path,
+        default=settings.WEAKNESSES_PATH,
+        help=f'Weakness catalog JSON (default: {settings.WEAKNESSES_PATH})'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=settings.ROUTING_ARTIFACT_PATH or DEFAULT_OUTPUT,
+        help=f'Artifact output path (default: ROUTER_ROUTING_ARTIFACT_PATH or {DEFAULT_OUTPUT})'
+    )
+
+    parser.add_argument(
+        '--info',
+        type=Path,
+        metavar='FILE',
+        help='Print the directory of an existing artifact and exit'
+    )
+
+    return parser.parse_args()
+
+
+def print_info(artifact_path: Path):
+    """Print artifact metadata"""
+    directory = read_artifact_directory(artifact_path)
+    sources = directory['sources']
+    meta = directory['meta']
+
+    print("=" * 60)
+    print(f"Routing artifact: {artifact_path}")
+    print("=" * 60)
+    print(f"Format version: {directory['format_version']} ({directory['byteorder']}-endian)")
+    print(f"Compiled: {directory['created_at']}")
+    print(f"Entity source: {sources['entity_data_path']}")
+    print(f"Weakness source: {sources['weaknesses_path']}")
+    print(f"Keywords in automaton: {meta['num_keywords']}")
+    print(f"Weakness triggers: {meta['num_triggers']}")
+    print(f"Size: {artifact_path.stat().st_size / 1024:.1f} KB")
+    print()
+    print("Sections:")
+    for name, (offset, size, typecode) in directory['sections'].items():
+        print(f"  {name:40s} {typecode}  {size:>10d} bytes")
+
+
+def main():
+    """Compile the routing artifact"""
+    args = parse_args()
+
+    if args.info:
+        print_info(args.info)
+        return
+
+    logger.info(f"Building routing snapshot from {args.entities} and {args.weaknesses}...")
+    start = time.perf_counter()
+    snapshot = build_snapshot(args.entities, args.weaknesses, generation=1)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compile_routing_artifact(snapshot, args.output)
+    write_time = time.perf_counter() - start
+
+    print()
+    print("=" * 60)
+    print("✅ Routing artifact compiled")
+    print("=" * 60)
+    print(f"Output: {args.output}")
+    print(f"Entities: {len(snapshot.entity_names)}")
+    print(f"Weakness patterns: {len(snapshot.weakness_matcher.weaknesses)}")
+    print(f"Build time: {build_time * 1000:.1f}ms, write time: {write_time * 1000:.1f}ms")
+    print()
+    print("💡 Usage:")
+    print(f"   export ROUTER_ROUTING_ARTIFACT_PATH={args.output}")
+    print("   python router/scripts/serve_router.py --workers 4")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-Compatible Upstream
+
+A local stand-in for the DeepSeek/OpenAI APIs, for performance tests that
+should measure the router's (or the pipeline's) own overhead, repeatably and
+without API keys. It serves:
+
+- POST /v1/chat/completions (streaming and non-streaming; also /chat/completions)
+- POST /v1/embeddings (also /embeddings)
+- GET /v1/models, GET /health, GET /stats (injected latencies and errors so far)
+
+Latencies and failures are drawn from configurable distributions (TTFT, token
+rate, completion length, embedding latency, error and mid-stream abort rates)
+with a seeded RNG. Content is deterministic: the same messages always get the
+same completion, and the same text always gets the same embedding (a local
+character n-gram embedding, so similar texts still get similar vectors).
+
+Distributions are given as `kind:params` (milliseconds for latencies, tokens
+per second for rates): `200` or `fixed:200`, `uniform:100,300`,
+`normal:200,50`, `lognormal:200,0.5` (median, sigma) or `exponential:200` (mean).
+
+Usage:
+    python router/scripts/fake_upstream.py --port 18080
+    python router/scripts/fake_upstream.py --ttft-ms lognormal:400,0.3 --tokens-per-second normal:40,8 --error-rate 0.02
+
+    # Point the router (LLMClient) and autoeval's APIClient at it
+    export DEEPSEEK_BASE_URL=http://127.0.0.1:18080/v1 DEEPSEEK_API_KEY=fake
+    export OPENAI_BASE_URL=http://127.0.0.1:18080/v1 OPENAI_API_KEY=fake
+"""
+
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add repo root to path
+repo_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(repo_root))
+
+# Completions are drawn from this vocabulary (one entry per token)
+VOCABULARY = (
+    "患者", "症状", "治疗", "建议", "医生", "检查", "疫苗", "剂量", "注意", "饮食",
+    "可能", "需要", "常见", "及时", "就医", "药物", "手术", "恢复", "预防", "风险",
+    "，", "，", "。", "。", "的", "是", "在", "和", "如果", "通常",
+)
+
+# Error bodies by injected status code
+ERROR_TYPES = {
+    429: ("rate_limit_error", "Rate limit reached (injected by fake upstream)"),
+    500: ("server_error", "Internal server error (injected by fake upstream)"),
+    502: ("server_error", "Bad gateway (injected by fake upstream)"),
+    503: ("server_error", "Service unavailable (injected by fake upstream)"),
+}
+
+
+class Distribution:
+    """A random variable given by a `kind:params` spec (samples are never negative)"""
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exponential': 1}
+
+    def __init__(self, spec: str):
+        """
+        Parse a distribution spec.
+
+        Args:
+            spec: e.g. '200', 'fixed:200', 'uniform:100,300', 'normal:200,50',
+                  'lognormal:200,0.5' (median, sigma), 'exponential:200' (mean)
+
+        Raises:
+            ValueError: If the spec is malformed
+        """
+        kind, _, params = spec.partition(':')
+        if not params:
+            kind, params = 'fixed', kind
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution '{kind}' (expected one of {', '.join(self.KINDS)})")
+
+        self.params = [float(p) for p in params.split(',')]
+        if len(self.params) != self.KINDS[kind]:
+            raise ValueError(f"'{kind}' takes {self.KINDS[kind]} parameter(s), got '{params}'")
+        self.kind = kind
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one value"""
+        if self.kind == 'fixed':
+            value = self.params[0]
+        elif self.kind == 'uniform':
+            value = rng.uniform(*self.params)
+        elif self.kind == 'normal':
+            value = rng.gauss(*self.params)
+        elif self.kind == 'lognormal':
+            median, sigma = self.params
+            value = median * math.exp(rng.gauss(0.0, sigma)) if median > 0 else 0.0
+        else:
+            mean = self.params[0]
+            value = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return self.spec
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (CJK characters ~1 token each, other text ~4 characters per token)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + math.ceil(ascii_chars / 4)
+
+
+class FakeUpstream:
+    """
+    Fake chat completions and embeddings upstream.
+
+    Features:
+    - TTFT, token rate, completion length and embedding latency distributions
+    - Injected HTTP errors (before the first byte) and mid-stream aborts
+    - Deterministic content per request (independent of the latency RNG)
+    - Counters for what was injected (GET /stats)
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        """
+        Initialize fake upstream.
+
+        Args:
+            args: Parsed command-line arguments (see parse_args)
+        """
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self._embedders: Dict[int, Any] = {}
+
+        self.stats = {
+            'chat_completions': 0,
+            'streams': 0,
+            'embeddings': 0,
+            'errors': 0,
+            'aborts': 0,
+            'completion_tokens': 0,
+            'in_flight': 0
+        }
+
+    def content_tokens(self, body: Dict[str, Any]) -> List[str]:
+        """Deterministic completion for a request (same model and messages, same tokens)"""
+        key = json.dumps([body.get('model'), body.get('messages')], ensure_ascii=False, sort_keys=True)
+        rng = random.Random(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest())
+
+        length = max(1, round(self.args.completion_tokens.sample(rng)))
+        if body.get('max_tokens'):
+            length = min(length, body['max_tokens'])
+        return [rng.choice(VOCABULARY) for _ in range(length)]
+
+    def injected_error(self) -> Optional[int]:
+        """Status code of an injected error, or None"""
+        if self.args.error_rate > 0 and self.rng.random() < self.args.error_rate:
+            self.stats['errors'] += 1
+            return self.rng.choice(self.args.error_status)
+        return None
+
+    def token_interval(self) -> float:
+        """Seconds between tokens for one response (0: as fast as possible)"""
+        rate = self.args.tokens_per_second.sample(self.rng)
+        return 1.0 / rate if rate > 0 else 0.0
+
+    def embed(self, text: str, dimension: int) -> List[float]:
+        """Deterministic embedding of a text"""
+        embedder = self._embedders.get(dimension)
+        if embedder is None:
+            from optimizer.pattern_db.embedding_providers import HashedNgramEmbeddingProvider
+
+            embedder = self._embedders[dimension] = HashedNgramEmbeddingProvider(dimension=dimension)
+        return embedder.embed(text)
+
+
+def error_response(status: int):
+    """OpenAI-style error body"""
+    from fastapi.responses import JSONResponse
+
+    error_type, message = ERROR_TYPES.get(status, ("server_error", f"HTTP {status} (injected by fake upstream)"))
+    headers = {'Retry-After': '1'} if status == 429 else None
+    return JSONResponse(
+        status_code=status,
+        content={'error': {'message': message, 'type': error_type, 'code': status}},
+        headers=headers
+    )
+
+
+def usage_dict(body: Dict[str, Any], completion_tokens: int) -> Dict[str, int]:
+    """Usage block for a chat completion"""
+    prompt_tokens = sum(count_tokens(str(m.get('content') or '')) for m in body.get('messages', []))
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+
+def create_app(upstream: FakeUpstream):
+    """Create the fake upstream's FastAPI app"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Fake OpenAI-Compatible Upstream")
+    stats = upstream.stats
+
+    def chunk_frame(completion_id: str, model: str, delta: Dict, finish_reason=None, usage=None) -> bytes:
+        chunk = {
+            'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'logprobs': None, 'finish_reason': finish_reason}]
+        }
+        if usage is not None:
+            chunk['choices'] = []
+            chunk['usage'] = usage
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    async def stream_completion(body: Dict, tokens: List[str], completion_id: str, ttft: float):
+        model = body.get('model', 'fake')
+        interval = upstream.token_interval()
+        abort_at = None
+        if upstream.args.abort_rate > 0 and upstream.rng.random() < upstream.args.abort_rate:
+            abort_at = upstream.rng.randrange(len(tokens))
+
+        stats['in_flight'] += 1
+        try:
+            await asyncio.sleep(ttft)
+            yield chunk_frame(completion_id, model, {'role': 'assistant', 'content': ''})
+
+            # Tokens are scheduled against the clock so sleep overhead does not accumulate
+            started = time.perf_counter()
+            for i, token in enumerate(tokens):
+                if i == abort_at:
+                    stats['aborts'] += 1
+                    raise ConnectionAbortedError("Stream aborted (injected by fake upstream)")
+                delay = started + i * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                yield chunk_frame(completion_id, model, {'content': token})
+                stats['completion_tokens'] += 1
+
+            yield chunk_frame(completion_id, model, {}, 'stop')
+            if (body.get('stream_options') or {}).get('include_usage'):
+                yield chunk_frame(completion_id, model, {}, usage=usage_dict(body, len(tokens)))
+            yield b"data: [DONE]\n\n"
+        finally:
+            stats['in_flight'] -= 1
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats['chat_completions'] += 1
+
+        status = upstream.injected_error()
+        if status is not None:
+            return error_response(status)
+
+        tokens = upstream.content_tokens(body)
+        completion_id = f"chatcmpl-fake{stats['chat_completions']}"
+        ttft = upstream.args.ttft_ms.sample(upstream.rng) / 1000
+
+        if body.get('stream'):
+            stats['streams'] += 1
+            return StreamingResponse(
+                stream_completion(body, tokens, completion_id, ttft),
+                media_type="text/event-stream"
+            )
+
+        # Non-streaming: the whole completion is generated before responding
+        stats['in_flight'] += 1
+        try:
+            await asyncio.sleep(ttft + len(tokens) * upstream.token_interval())
+        finally:
+            stats['in_flight'] -= 1
+        stats['completion_tokens'] += len(tokens)
+
+        return JSONResponse({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                'logprobs': None,
+                'finish_reason': 'length' if len(tokens) == body.get('max_tokens') else 'stop'
+            }],
+            'usage': usage_dict(body, len(tokens))
+        })
+
+    @app.post("/v1/embeddings")
+    @app.post("/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        stats['embeddings'] += 1
+
+        status = upstream.injected_error()
+        if status is not None:
+            return error_response(status)
+
+        texts = body.get('input', '')
+        if isinstance(texts, str):
+            texts = [texts]
+        dimension = body.get('dimensions') or upstream.args.embedding_dimension
+
+        await asyncio.sleep(upstream.args.embedding_latency_ms.sample(upstream.rng) / 1000)
+
+        data = []
+        for i, text in enumerate(texts):
+            embedding = upstream.embed(str(text), dimension)
+            if body.get('encoding_format') == 'base64':
+                import base64
+                import struct
+
+                embedding = base64.b64encode(struct.pack(f'<{len(embedding)}f', *embedding)).decode('ascii')
+            data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+
+        prompt_tokens = sum(count_tokens(str(text)) for text in texts)
+        return {
+            'object': 'list',
+            'data': data,
+            'model': body.get('model', 'fake-embedding'),
+            'usage': {'prompt_tokens': prompt_tokens, 'total_tokens': prompt_tokens}
+        }
+
+    @app.get("/v1/models")
+    @app.get("/models")
+    async def models():
+        return {
+            'object': 'list',
+            'data': [
+                {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'fake-upstream'}
+                for model in upstream.args.models
+            ]
+        }
+
+    @app.get("/health")
+    async def health():
+        return {'status': 'ok'}
+
+    @app.get("/stats")
+    async def get_stats():
+        return {
+            **stats,
+            'config': {
+                'ttft_ms': repr(upstream.args.ttft_ms),
+                'tokens_per_second': repr(upstream.args.tokens_per_second),
+                'completion_tokens': repr(upstream.args.completion_tokens),
+                'embedding_latency_ms': repr(upstream.args.embedding_latency_ms),
+                'error_rate': upstream.args.error_rate,
+                'abort_rate': upstream.args.abort_rate,
+                'seed': upstream.args.seed
+            }
+        }
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Fake OpenAI-compatible upstream for performance tests",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Distributions: 200 | fixed:200 | uniform:100,300 | normal:200,50 | lognormal:200,0.5 | exponential:200
+
+Examples:
+  # Deterministic latencies (default)
+  python router/scripts/fake_upstream.py
+
+  # DeepSeek-like jitter with 2% errors and 1% broken streams
+  python router/scripts/fake_upstream.py --ttft-ms lognormal:400,0.3 --tokens-per-second normal:40,8 \\
+      --error-rate 0.02 --abort-rate 0.01
+
+  # Zero latency (measure router overhead only)
+  python router/scripts/fake_upstream.py --ttft-ms 0 --tokens-per-second 0 --embedding-latency-ms 0
+        """
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind to (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=18080, help='Port to bind to (default: 18080)')
+    parser.add_argument('--ttft-ms', type=Distribution, default=Distribution('300'),
+                        help='Time to first token in ms (default: 300)')
+    parser.add_argument('--tokens-per-second', type=Distribution, default=Distribution('50'),
+                        help='Generation rate per response, 0 = instant (default: 50)')
+    parser.add_argument('--completion-tokens', type=Distribution, default=Distribution('100'),
+                        help='Completion length in tokens, capped by max_tokens (default: 100)')
+    parser.add_argument('--embedding-latency-ms', type=Distribution, default=Distribution('80'),
+                        help='Embeddings call latency in ms (default: 80)')
+    parser.add_argument('--embedding-dimension', type=int, default=3072,
+                        help='Embedding dimension unless the request sets `dimensions` (default: 3072)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Share of requests answered with an HTTP error (default: 0)')
+    parser.add_argument('--error-status', type=int, nargs='+', default=[503, 429, 500],
+                        help='Status codes injected errors are drawn from (default: 503 429 500)')
+    parser.add_argument('--abort-rate', type=float, default=0.0,
+                        help='Share of streams cut off mid-way, logged by uvicorn as errors (default: 0)')
+    parser.add_argument('--models', nargs='+', default=['deepseek-chat', 'gpt-4.1', 'text-embedding-3-large'],
+                        help='Model ids listed by /v1/models (any model is accepted)')
+    parser.add_argument('--seed', type=int, default=42, help='Latency/error RNG seed (default: 42)')
+    parser.add_argument('--log-level', default='warning', choices=['debug', 'info', 'warning', 'error'],
+                        help='Uvicorn log level (default: warning)')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the fake upstream"""
+    import uvicorn
+
+    args = parse_args(argv)
+    print(f"Fake upstream on http://{args.host}:{args.port}/v1 "
+          f"(ttft {args.ttft_ms}ms, {args.tokens_per_second} tok/s, "
+          f"errors {args.error_rate:.1%}, aborts {args.abort_rate:.1%})")
+    uvicorn.run(create_app(FakeUpstream(args)), host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Bulk Routing CLI
+
+Routes every question in a JSONL file through the router's decision engine
+and writes one routing decision per line. Use it to re-score logged traffic
+against a new weakness catalog, or to precompute decisions for analysis.
+
+Questions are routed in batches on a process pool (`RoutingExecutor` in
+process mode); every worker loads the routing data once through
+`DecisionEngine` (from the compiled routing artifact when one is given), so
+decisions are identical to what the API would return.
+
+Input lines are JSON objects with a question field (default: "question") and
+an optional entity type field (default: "entity_type"). Chat completion logs
+work too: without a question field, the last user message in "messages" is
+routed.
+
+Usage:
+    python router/scripts/route_jsonl.py questions.jsonl -o decisions.jsonl
+    python router/scripts/route_jsonl.py logs/2026-09.jsonl -o rescored.jsonl \\
+        --weaknesses optimizer/config/deepseek_weaknesses.new.json --workers 8
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+# Add repo root to path
+repo_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(repo_root))
+
+# Configure logger
+logger.remove()
+logger.add(sys.stderr, level="INFO")
+
+
+def parse_args():
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Route a JSONL file of questions with the router's decision engine",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Route questions with the configured routing data
+  python router/scripts/route_jsonl.py questions.jsonl -o decisions.jsonl
+
+  # Re-score a month of logs against a new weakness catalog
+  python router/scripts/route_jsonl.py logs/2026-09.jsonl -o rescored.jsonl \\
+      --weaknesses optimizer/config/deepseek_weaknesses.new.json --workers 8
+
+  # Use a compiled routing artifact (fastest worker startup)
+  python router/scripts/route_jsonl.py questions.jsonl -o decisions.jsonl \\
+      --artifact outputs/router/routing.artifact
+        """
+    )
+
+    parser.add_argument('input', type=Path, help='Input JSONL file')
+    parser.add_argument('-o', '--output', type=Path, required=True, help='Output JSONL file')
+    parser.add_argument('--entities', type=Path, help='Entity names JSON (default: router settings)')
+    parser.add_argument('--weaknesses', type=Path, help='Weakness catalog JSON (default: router settings)')
+    parser.add_argument('--artifact', type=Path, help='Compiled routing artifact (default: router settings)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Routing processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help='Questions per pool task (default: 2000)')
+    parser.add_argument('--min-confidence', type=float, default=0.70,
+                        help='Minimum pattern retrieval confidence (default: 0.70)')
+    parser.add_argument('--question-field', default='question', help='Question field (default: question)')
+    parser.add_argument('--entity-field', default='entity_type', help='Entity type field (default: entity_type)')
+    parser.add_argument('--full', action='store_true',
+                        help='Write full weakness payloads instead of ids and scores')
+
+    return parser.parse_args()
+
+
+def configure_router(args):
+    """Point router settings at the requested data (before router modules load them)"""
+    overrides = {
+        'ROUTER_ENTITY_NAMES_PATH': args.entities,
+        'ROUTER_WEAKNESSES_PATH': args.weaknesses,
+        'ROUTER_ROUTING_ARTIFACT_PATH': args.artifact
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            os.environ[name] = str(value)
+
+    # Offline job: fixed data, no metrics; pool processes inherit the environment
+    os.environ['ROUTER_ENABLE_HOT_RELOAD'] = 'false'
+    os.environ['ROUTER_ENABLE_METRICS'] = 'false'
+
+
+def extract_question(record: Dict[str, Any], args) -> Tuple[Optional[str], Optional[str]]:
+    """Get (question, entity_type) from an input record"""
+    question = record.get(args.question_field)
+    if not question:
+        user_messages = [m for m in record.get('messages') or [] if m.get('role') == 'user']
+        question = user_messages[-1].get('content') if user_messages else None
+    entity_type = record.get(args.entity_field) or record.get('x_entity_type')
+    return question, entity_type
+
+
+def read_records(path: Path, args, skipped: Counter) -> Iterator[Tuple[Dict[str, Any], Tuple[str, Optional[str]]]]:
+    """Yield (record, (question, entity_type)) for every routable input line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Line {line_no}: invalid JSON, skipped")
+                skipped['invalid_json'] += 1
+                continue
+
+            question, entity_type = extract_question(record, args)
+            if not question:
+                skipped['no_question'] += 1
+                continue
+            yield record, (question, entity_type)
+
+
+def summarize_decision(decision: Dict[str, Any], full: bool) -> Dict[str, Any]:
+    """Decision fields written to the output (weakness ids and scores unless --full)"""
+    patterns = decision['weakness_patterns']
+    if not full:
+        patterns = [
+            {'weakness_id': p['weakness_id'], 'match_score': p['match_score']}
+            for p in patterns
+        ]
+    return {
+        'routing_tier': decision['routing_tier'],
+        'use_patterns': decision['use_patterns'],
+        'rag_reason': decision['rag_reason'],
+        'rag_confidence': decision['rag_confidence'],
+        'weakness_patterns': patterns
+    }
+
+
+def main():
+    """Route the input file"""
+    args = parse_args()
+    configure_router(args)
+
+    from router.core.routing_executor import RoutingExecutor
+    from router.utils.json_codec import dumps
+
+    executor = RoutingExecutor(mode='process', max_workers=args.workers)
+    skipped: Counter = Counter()
+    tiers: Counter = Counter()
+    weaknesses: Counter = Counter()
+    total = 0
+
+    records = read_records(args.input, args, skipped)
+    # Keep a bounded number of batches in flight so huge inputs stream through
+    window = max(args.workers, 1) * 2
+
+    logger.info(f"Routing {args.input} with {executor.max_workers} processes...")
+    start = time.perf_counter()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(args.output, 'wb') as out:
+            while True:
+                batches: List[List[Tuple[Dict[str, Any], Tuple[str, Optional[str]]]]] = [
+                    batch for batch in (list(islice(records, args.chunk_size)) for _ in range(window)) if batch
+                ]
+                if not batches:
+                    break
+
+                results = executor.map_routing_decisions(
+                    [[item for _, item in batch] for batch in batches],
+                    min_confidence=args.min_confidence
+                )
+                for batch, decisions in zip(batches, results):
+                    for (record, _), decision in zip(batch, decisions):
+                        tiers[decision['routing_tier']] += 1
+                        weaknesses.update(p['weakness_id'] for p in decision['weakness_patterns'])
+                        record['routing'] = summarize_decision(decision, args.full)
+                        out.write(dumps(record) + b'\n')
+                    total += len(batch)
+
+                logger.info(f"Routed {total} questions...")
+    finally:
+        executor.shutdown()
+
+    elapsed = time.perf_counter() - start
+
+    print()
+    print("=" * 60)
+    print("✅ Bulk routing complete")
+    print("=" * 60)
+    print(f"Output: {args.output}")
+    print(f"Questions routed: {total} in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f}/s)")
+    if skipped:
+        print(f"Skipped lines: {dict(skipped)}")
+    print()
+    print("Routing tiers:")
+    for tier, count in tiers.most_common():
+        print(f"  {tier:20s} {count:>10d} ({count / total * 100:.1f}%)")
+    if weaknesses:
+        print()
+        print("Top weakness patterns:")
+        for weakness_id, count in weaknesses.most_common(10):
+            print(f"  {weakness_id:30s} {count:>10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -103,6 +103,7 @@ def main():
     print(f"Workers: {workers}")
     print(f"Log Level: {log_level}")
     print(f"Hot-Reload: {'enabled' if settings.ENABLE_HOT_RELOAD else 'disabled'}")
+    print(f"Routing Artifact: {settings.ROUTING_ARTIFACT_PATH or 'disabled (workers parse JSON)'}")
     print(f"Auto-Reload (code): {'enabled' if args.reload else 'disabled'}")
     print()
     print(f"📚 API Documentation: http://{host}:{port}/docs")
@@ -43,7 +43,7 @@ def test_drop_in_replacement():
     # Client 1: Direct DeepSeek API (baseline)
     baseline_client = OpenAI(
         api_key=deepseek_key,
-        base_url="https://api.deepseek.com"
+        base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")  # Or the fake upstream
     )
 
     # Client 2: Router (just change base_url!)
@@ -110,7 +110,7 @@ def test_a_b_comparison():
     # Setup clients
     baseline_client = OpenAI(
         api_key=deepseek_key,
-        base_url="https://api.deepseek.com"
+        base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")  # Or the fake upstream
     )
 
     router_client = OpenAI(
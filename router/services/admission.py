@@ -0,0 +1,212 @@
+"""
+Admission control for the chat completions endpoint.
+
+Without a cap, every request is accepted and then waits on upstream, so an
+overload shows up as timeouts across the board. The admission controller lets
+at most ROUTER_ADMISSION_MAX_IN_FLIGHT completions run per worker; further
+requests wait in a bounded queue for at most ROUTER_ADMISSION_QUEUE_TIMEOUT
+seconds. Requests that find the queue full get an immediate 429 and requests
+whose queue deadline expires get a 503, both OpenAI-style with `Retry-After`.
+
+Only ADMITTED_PATHS are controlled: routing-only endpoints, stats and health
+checks bypass the controller so monitoring stays responsive under load.
+"""
+
+import math
+import time
+from typing import Any, Dict, Optional
+from loguru import logger
+
+from router.api.responses import FastJSONResponse
+from router.config.settings import get_router_settings
+from router.services.concurrency import BoundedQueueSemaphore, QueueRejected
+from router.utils.metrics import (
+    ADMISSION_QUEUE_DEPTH, ADMISSION_QUEUE_WAIT_SECONDS, ADMISSION_REJECTIONS
+)
+
+# Paths subject to admission control (everything else is exempt)
+ADMITTED_PATHS = frozenset({'/v1/chat/completions'})
+
+# Weight of the latest request in the average hold time (Retry-After estimate)
+HOLD_TIME_EWMA_ALPHA = 0.1
+MAX_RETRY_AFTER = 60
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, reason: str, retry_after: int):
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Server overloaded ({reason}), retry after {retry_after}s")
+
+    @property
+    def status_code(self) -> int:
+        """429 when the queue is full, 503 when the queue deadline expired"""
+        return 429 if self.reason == 'queue_full' else 503
+
+    def to_response(self) -> FastJSONResponse:
+        """OpenAI-style error response"""
+        return FastJSONResponse(
+            {
+                'error': {
+                    'message': str(self),
+                    'type': 'rate_limit_error' if self.status_code == 429 else 'server_overloaded',
+                    'param': None,
+                    'code': self.reason
+                }
+            },
+            status_code=self.status_code,
+            headers={'Retry-After': str(self.retry_after)}
+        )
+
+
+class AdmissionController:
+    """
+    In-flight cap with a bounded, deadline-limited wait queue (per worker).
+
+    Features:
+    - At most `max_in_flight` admitted requests, counted until the response
+      (including a full stream) has been sent
+    - At most `max_queue` waiting requests; further requests are rejected at once
+    - Waiters are rejected once they have queued for `queue_timeout` seconds
+    - Retry-After estimated from the average request hold time
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        """
+        Initialize admission controller.
+
+        Args:
+            max_in_flight: Maximum concurrently admitted requests
+            max_queue: Maximum number of waiting requests
+            queue_timeout: Maximum time a request may wait for admission in seconds
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._queue = BoundedQueueSemaphore(
+            max_in_flight, max_queue, queue_timeout, depth_gauge=ADMISSION_QUEUE_DEPTH
+        )
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.avg_hold_time: Optional[float] = None
+
+    @property
+    def active(self) -> int:
+        """Admitted requests in flight"""
+        return self._queue.active
+
+    @property
+    def waiting(self) -> int:
+        """Requests queued for admission"""
+        return self._queue.waiting
+
+    def _retry_after(self) -> int:
+        """Seconds until the current queue should have drained"""
+        if self.avg_hold_time is None:
+            estimate = self.queue_timeout
+        else:
+            estimate = (self.waiting + 1) * self.avg_hold_time / self.max_in_flight
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+    def _reject(self, reason: str):
+        if reason == 'queue_full':
+            self.rejected_queue_full += 1
+        else:
+            self.rejected_timeout += 1
+        ADMISSION_REJECTIONS.labels(reason=reason).inc()
+        logger.warning(f"Request shed ({reason}): {self.active} in flight, {self.waiting} waiting")
+        raise AdmissionRejected(reason, self._retry_after())
+
+    async def acquire(self):
+        """
+        Wait for admission.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the queue deadline expires
+        """
+        try:
+            wait_time = await self._queue.acquire()
+        except QueueRejected as e:
+            self._reject(e.reason)
+
+        ADMISSION_QUEUE_WAIT_SECONDS.observe(wait_time)
+        self.admitted += 1
+
+    def release(self, hold_time: float):
+        """
+        Release an admitted request's slot.
+
+        Args:
+            hold_time: Seconds the request held its slot (feeds the Retry-After estimate)
+        """
+        self._queue.release()
+        if self.avg_hold_time is None:
+            self.avg_hold_time = hold_time
+        else:
+            self.avg_hold_time += HOLD_TIME_EWMA_ALPHA * (hold_time - self.avg_hold_time)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission statistics"""
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'queue_timeout': self.queue_timeout,
+            'active': self.active,
+            'queue_depth': self.waiting,
+            'admitted': self.admitted,
+            'avg_hold_ms': (self.avg_hold_time or 0.0) * 1000,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_timeout': self.rejected_timeout
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control to ADMITTED_PATHS.
+
+    Implemented at the ASGI level so a streaming response holds its slot
+    until the last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        controller = get_admission_controller() if scope['type'] == 'http' else None
+        if controller is None or scope.get('path') not in ADMITTED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await controller.acquire()
+        except AdmissionRejected as e:
+            await e.to_response()(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.perf_counter() - start)
+
+
+# Global admission controller (per worker)
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """Get the admission controller (None unless ROUTER_ENABLE_ADMISSION_CONTROL)"""
+    global _admission_controller
+    settings = get_router_settings()
+    if _admission_controller is None and settings.ENABLE_ADMISSION_CONTROL:
+        _admission_controller = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_queue=settings.ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT
+        )
+    return _admission_controller
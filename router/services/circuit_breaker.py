@@ -0,0 +1,281 @@
+"""
+Per-upstream circuit breakers and latency windows for hedging.
+
+A degraded provider otherwise makes every request wait for the full upstream
+timeout before failing. Each upstream (DeepSeek, OpenAI) gets a breaker that
+watches its recent calls and opens when too many fail or are slow; while open,
+calls fail fast with `CircuitOpenError` (or fail over to a fallback model, see
+`LLMClient`). After a cool-down a single probe call is let through: success
+closes the breaker, failure re-opens it. Only the probe decides: calls started
+before the breaker opened can still finish while it is half-open, and their
+outcomes are dropped.
+
+`LatencyWindow` keeps recent successful call latencies per model; its p95 is
+the delay after which a hedged request is sent to the fallback model.
+"""
+
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from loguru import logger
+
+from router.config.settings import get_router_settings
+from router.services.concurrency import UpstreamBusyError
+from router.utils.metrics import BREAKER_STATE, BREAKER_TRANSITIONS
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Gauge values for router_upstream_breaker_state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(UpstreamBusyError):
+    """Raised when a call is refused because its upstream's breaker is open"""
+
+    def __init__(self, model: str, upstream: str, retry_after: float):
+        self.upstream = upstream
+        super().__init__(model, f"{upstream} circuit open", retry_after)
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls"""
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, latency: float):
+        self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of the window.
+
+        Args:
+            p: Percentile as a fraction (0.95 for p95)
+
+        Returns:
+            Latency in seconds, or None if the window is empty
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))]
+
+
+class BreakerCall:
+    """A call admitted by a breaker, which reports its outcome back to it"""
+
+    __slots__ = ('breaker', 'probe')
+
+    def __init__(self, breaker: 'CircuitBreaker', probe: bool):
+        self.breaker = breaker
+        self.probe = probe
+
+    def record_success(self, latency: Optional[float] = None):
+        self.breaker.record_success(latency, probe=self.probe)
+
+    def record_failure(self):
+        self.breaker.record_failure(probe=self.probe)
+
+    def record_cancelled(self):
+        self.breaker.record_cancelled(probe=self.probe)
+
+
+class CircuitBreaker:
+    """
+    Error-rate and slow-call-rate circuit breaker for one upstream.
+
+    Features:
+    - Sliding window of the last `window` call outcomes
+    - Opens when, over at least `min_calls` calls, the failure rate or the
+      rate of calls slower than `slow_call_seconds` reaches its threshold
+    - Fails fast for `open_seconds`, then lets a single probe call through
+    - State gauge and transition counters
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        window: int,
+        min_calls: int,
+        error_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float
+    ):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            upstream: Upstream name (for metrics and errors)
+            window: Number of recent calls considered
+            min_calls: Minimum calls in the window before the breaker can open
+            error_rate: Failure fraction that opens the breaker
+            slow_call_seconds: Latency above which a successful call counts as slow
+            slow_call_rate: Slow-call fraction that opens the breaker
+            open_seconds: Time the breaker stays open before probing
+        """
+        self.upstream = upstream
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+
+        # (failed, slow) per call
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._failures = 0
+        self._slow = 0
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+        BREAKER_STATE.labels(upstream=upstream).set(STATE_VALUES[CLOSED])
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"Upstream {self.upstream} circuit {self.state} -> {state}")
+        self.state = state
+        BREAKER_STATE.labels(upstream=self.upstream).set(STATE_VALUES[state])
+        BREAKER_TRANSITIONS.labels(upstream=self.upstream, state=state).inc()
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self._outcomes.clear()
+            self._failures = self._slow = 0
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe through"""
+        return max(1.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> Optional[BreakerCall]:
+        """
+        Whether a call may go to this upstream now.
+
+        Returns:
+            The admitted call, to report its outcome through (None: refused).
+            In the half-open state the call is the probe (`probe` set), which
+            must report back (record_success / record_failure / record_cancelled).
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return None
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return None
+            self._probe_in_flight = True
+            return BreakerCall(self, probe=True)
+
+        return BreakerCall(self, probe=False)
+
+    def _settle_probe(self, probe: bool) -> bool:
+        """
+        Handle an outcome reported while half-open.
+
+        Returns:
+            True if the outcome is settled here: it was not the probe's (a call
+            from before the breaker opened, dropped), or the caller applies the
+            probe's verdict
+        """
+        if self.state != HALF_OPEN:
+            return False
+        if probe:
+            self._probe_in_flight = False
+        return True
+
+    def _record(self, failed: bool, slow: bool):
+        if len(self._outcomes) == self._outcomes.maxlen:
+            old_failed, old_slow = self._outcomes[0]
+            self._failures -= old_failed
+            self._slow -= old_slow
+        self._outcomes.append((failed, slow))
+        self._failures += failed
+        self._slow += slow
+
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and (
+            self._failures / calls >= self.error_rate or self._slow / calls >= self.slow_call_rate
+        ):
+            self._transition(OPEN)
+
+    def record_success(self, latency: Optional[float] = None, probe: bool = False):
+        """
+        Report a successful call.
+
+        Args:
+            latency: Call latency in seconds (time to first chunk for streams)
+            probe: Whether the call was the half-open probe
+        """
+        slow = latency is not None and latency > self.slow_call_seconds
+        if self._settle_probe(probe):
+            if probe:
+                self._transition(OPEN if slow else CLOSED)
+            return
+        self._record(False, slow)
+
+    def record_failure(self, probe: bool = False):
+        """Report a failed call (connection error, timeout, 5xx, 429)"""
+        if self._settle_probe(probe):
+            if probe:
+                self._transition(OPEN)
+            return
+        self._record(True, False)
+
+    def record_cancelled(self, probe: bool = False):
+        """Report a call abandoned before it finished (e.g. a hedge loser)"""
+        self._settle_probe(probe)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker statistics"""
+        calls = len(self._outcomes)
+        return {
+            'state': self.state,
+            'window_calls': calls,
+            'failure_rate': self._failures / calls if calls else 0.0,
+            'slow_call_rate': self._slow / calls if calls else 0.0,
+            'times_opened': self.times_opened,
+            'rejected': self.rejected
+        }
+
+
+class UpstreamBreakers:
+    """Lazily created `CircuitBreaker` per upstream"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, upstream: str) -> CircuitBreaker:
+        """Get (or create) the breaker for an upstream"""
+        breaker = self._breakers.get(upstream)
+        if breaker is None:
+            settings = get_router_settings()
+            breaker = CircuitBreaker(
+                upstream=upstream,
+                window=settings.BREAKER_WINDOW,
+                min_calls=settings.BREAKER_MIN_CALLS,
+                error_rate=settings.BREAKER_ERROR_RATE,
+                slow_call_seconds=settings.BREAKER_SLOW_CALL_SECONDS,
+                slow_call_rate=settings.BREAKER_SLOW_CALL_RATE,
+                open_seconds=settings.BREAKER_OPEN_SECONDS
+            )
+            self._breakers[upstream] = breaker
+        return breaker
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get statistics for every upstream seen so far"""
+        return {upstream: breaker.get_stats() for upstream, breaker in self._breakers.items()}
@@ -0,0 +1,227 @@
+"""
+Per-model concurrency limits for upstream LLM calls.
+
+Each model gets a fixed number of concurrent upstream calls. Requests beyond
+that wait in a bounded queue; when the queue is full, or a request has waited
+longer than the queue timeout, it fails fast with `UpstreamBusyError` instead
+of piling more connections onto a rate-limited provider.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+from loguru import logger
+
+from router.config.settings import get_router_settings
+from router.utils.metrics import (
+    UPSTREAM_QUEUE_DEPTH, UPSTREAM_QUEUE_REJECTIONS, UPSTREAM_QUEUE_WAIT_SECONDS
+)
+
+
+class UpstreamBusyError(Exception):
+    """Raised when a request cannot get an upstream slot in time"""
+
+    def __init__(self, model: str, reason: str, retry_after: float):
+        self.model = model
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Upstream {model} is busy ({reason}), retry after {retry_after:.0f}s")
+
+
+class QueueRejected(Exception):
+    """Raised when a caller is not let through a `BoundedQueueSemaphore`"""
+
+    def __init__(self, reason: str):
+        self.reason = reason  # 'queue_full' or 'timeout'
+        super().__init__(reason)
+
+
+class BoundedQueueSemaphore:
+    """
+    Semaphore with a bounded, deadline-limited FIFO wait queue.
+
+    Shared by the per-model upstream limiters and the admission controller,
+    which map rejections to their own errors and metrics.
+
+    Features:
+    - At most `limit` holders
+    - At most `max_queue` waiters; further callers are rejected at once
+    - Waiters give up after `queue_timeout` seconds
+    - A waiter cancelled while queued leaves the queue without taking a slot
+    """
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float, depth_gauge=None):
+        """
+        Initialize semaphore.
+
+        Args:
+            limit: Maximum concurrent holders
+            max_queue: Maximum number of waiters
+            queue_timeout: Maximum time to wait for a slot in seconds
+            depth_gauge: Optional gauge tracking the number of waiters
+        """
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.depth_gauge = depth_gauge
+
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            QueueRejected: If the queue is full or the wait timed out
+        """
+        # Counted on our own counters: the semaphore is only acquired once the
+        # waiter task runs, so it lags behind a burst of simultaneous callers
+        if self.active + self.waiting >= self.limit + self.max_queue:
+            raise QueueRejected('queue_full')
+
+        start = time.perf_counter()
+        self.waiting += 1
+        if self.depth_gauge is not None:
+            self.depth_gauge.inc()
+        try:
+            # A timeout or cancellation cancels the pending acquire, which gives
+            # back a slot it was handed in the meantime (asyncio.Semaphore does)
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise QueueRejected('timeout') from None
+        finally:
+            self.waiting -= 1
+            if self.depth_gauge is not None:
+                self.depth_gauge.dec()
+
+        self.active += 1
+        return time.perf_counter() - start
+
+    def release(self):
+        """Give back a slot taken by acquire"""
+        self.active -= 1
+        self._semaphore.release()
+
+
+class ConcurrencyLimiter:
+    """
+    Concurrency cap with a bounded FIFO wait queue for one model.
+
+    Features:
+    - At most `max_concurrency` calls in flight
+    - At most `max_queue` callers waiting; further callers are rejected
+    - Waiters give up after `queue_timeout` seconds
+    - Queue depth, wait time and rejection counters
+    """
+
+    def __init__(self, model: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        """
+        Initialize limiter.
+
+        Args:
+            model: Model name (for metrics and errors)
+            max_concurrency: Maximum concurrent upstream calls
+            max_queue: Maximum number of waiting callers
+            queue_timeout: Maximum time to wait for a slot in seconds
+        """
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._queue = BoundedQueueSemaphore(
+            max_concurrency, max_queue, queue_timeout,
+            depth_gauge=UPSTREAM_QUEUE_DEPTH.labels(model=model)
+        )
+
+        self.total_acquired = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @property
+    def active(self) -> int:
+        """Calls holding a slot"""
+        return self._queue.active
+
+    @property
+    def waiting(self) -> int:
+        """Calls queued for a slot"""
+        return self._queue.waiting
+
+    def _reject(self, reason: str):
+        if reason == 'queue_full':
+            self.rejected_queue_full += 1
+        else:
+            self.rejected_timeout += 1
+        UPSTREAM_QUEUE_REJECTIONS.labels(model=self.model, reason=reason).inc()
+        logger.warning(
+            f"Upstream {self.model} busy ({reason}): "
+            f"{self.active} active, {self.waiting} waiting"
+        )
+        raise UpstreamBusyError(self.model, reason, retry_after=max(1.0, self.queue_timeout))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one upstream slot for the duration of the block"""
+        try:
+            wait_time = await self._queue.acquire()
+        except QueueRejected as e:
+            self._reject(e.reason)
+
+        UPSTREAM_QUEUE_WAIT_SECONDS.labels(model=self.model).observe(wait_time)
+        self.total_acquired += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        try:
+            yield
+        finally:
+            self._queue.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'queue_timeout': self.queue_timeout,
+            'active': self.active,
+            'queue_depth': self.waiting,
+            'acquired': self.total_acquired,
+            'avg_wait_ms': self.total_wait_time / self.total_acquired * 1000 if self.total_acquired else 0.0,
+            'max_wait_ms': self.max_wait_time * 1000,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_timeout': self.rejected_timeout
+        }
+
+
+class ModelLimiters:
+    """Lazily created `ConcurrencyLimiter` per model"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def get(self, model: str) -> ConcurrencyLimiter:
+        """Get (or create) the limiter for a model"""
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            settings = get_router_settings()
+            limiter = ConcurrencyLimiter(
+                model=model,
+                max_concurrency=settings.MODEL_CONCURRENCY_OVERRIDES.get(model, settings.MODEL_MAX_CONCURRENCY),
+                max_queue=settings.MODEL_QUEUE_SIZE,
+                queue_timeout=settings.MODEL_QUEUE_TIMEOUT
+            )
+            self._limiters[model] = limiter
+        return limiter
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get statistics for every model seen so far"""
+        return {model: limiter.get_stats() for model, limiter in self._limiters.items()}
@@ -1,41 +1,100 @@
 """
 LLM API client for calling external LLMs (DeepSeek, OpenAI, etc.)
+
+Each upstream has a circuit breaker (see `router.services.circuit_breaker`).
+Models with a fallback in ROUTER_FALLBACK_MODELS fail over to it when their
+upstream's circuit is open or the call fails, and non-streaming calls are
+hedged: once the primary call has run longer than its recent p95 latency, the
+fallback is called too and the first answer wins.
 """
+import asyncio
+import json
 import os
+import re
 import time
 import uuid
-from typing import List, Dict, Any, Optional, AsyncIterator
-from openai import OpenAI, AsyncOpenAI
+from collections import Counter
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIStatusError, DefaultHttpxClient, DefaultAsyncHttpxClient
 from loguru import logger
+from router.config.settings import get_router_settings
+from router.services.circuit_breaker import (
+    BreakerCall, CircuitBreaker, CircuitOpenError, LatencyWindow, UpstreamBreakers
+)
+from router.services.concurrency import ModelLimiters, UpstreamBusyError
+from router.utils.json_codec import dumps
+from router.utils.metrics import (
+    HEDGE_WASTED_CALLS, HEDGED_CALLS, UPSTREAM_CACHED_PROMPT_TOKENS, UPSTREAM_CANCELLED_CALLS,
+    UPSTREAM_ERRORS, UPSTREAM_FAILOVERS, UPSTREAM_PROMPT_TOKENS, UPSTREAM_TOKENS_SAVED,
+    UPSTREAM_TOTAL_SECONDS, UPSTREAM_TTFB_SECONDS, StreamTimer
+)
 from router.api.llm_schemas import (
     ChatMessage,
     ChatCompletionRequest,
     ChatCompletionResponse,
     ChatCompletionChoice,
     ChatCompletionUsage,
+    PromptTokensDetails,
     ChatCompletionChunk
 )
 
 
+# Weight of the latest call in the average completion length
+COMPLETION_TOKENS_EWMA_ALPHA = 0.1
+
+# SSE frame separators (a blank line after LF, CRLF or CR line endings)
+SSE_FRAME_END_RE = re.compile(rb"\r\n\r\n|\n\n|\r\r")
+
+# Relay: bytes held back waiting for the first data frame before giving up and forwarding them as is
+FIRST_FRAME_MAX_BYTES = 8192
+
+
 class LLMClient:
     """Client for calling external LLM APIs"""
 
     def __init__(self):
         """Initialize LLM clients"""
+        settings = get_router_settings()
+
+        # Per-model concurrency limits with a bounded wait queue
+        self.limiters = ModelLimiters()
+
+        # Per-upstream circuit breakers, per-model latency windows (hedge delay)
+        self.breakers = UpstreamBreakers()
+        self.latencies: Dict[str, LatencyWindow] = {}
+        self.hedge_stats: Counter = Counter()
+
+        # Average completion tokens per model (estimates tokens saved by cancellation)
+        self.completion_tokens: Dict[str, float] = {}
+
+        # Upstream prefix cache usage per routing tier: [calls, prompt tokens, cached tokens]
+        self.prefix_cache_usage: Dict[str, List[int]] = {}
+
         # DeepSeek client
         self.deepseek_api_key = os.getenv("DEEPSEEK_API_KEY")
         self.deepseek_base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 
         if self.deepseek_api_key:
+            limits = self._pool_limits(settings.DEEPSEEK_MAX_CONNECTIONS, settings.DEEPSEEK_MAX_KEEPALIVE)
             self.deepseek_client = OpenAI(
                 api_key=self.deepseek_api_key,
-                base_url=self.deepseek_base_url
+                base_url=self.deepseek_base_url,
+                max_retries=settings.UPSTREAM_MAX_RETRIES,
+                timeout=self._timeout(),
+                http_client=DefaultHttpxClient(limits=limits)
             )
             self.async_deepseek_client = AsyncOpenAI(
                 api_key=self.deepseek_api_key,
-                base_url=self.deepseek_base_url
+                base_url=self.deepseek_base_url,
+                max_retries=settings.UPSTREAM_MAX_RETRIES,
+                timeout=self._timeout(),
+                http_client=DefaultAsyncHttpxClient(limits=limits)
+            )
+            logger.info(
+                f"✓ DeepSeek client initialized (pool: {settings.DEEPSEEK_MAX_CONNECTIONS} connections, "
+                f"{settings.DEEPSEEK_MAX_KEEPALIVE} keep-alive)"
             )
-            logger.info("✓ DeepSeek client initialized")
         else:
             self.deepseek_client = None
             self.async_deepseek_client = None
@@ -46,20 +105,55 @@ class LLMClient:
         self.openai_base_url = os.getenv("OPENAI_BASE_URL") or os.getenv("POE_BASE_URL", "https://api.openai.com/v1")
 
         if self.openai_api_key:
+            limits = self._pool_limits(settings.OPENAI_MAX_CONNECTIONS, settings.OPENAI_MAX_KEEPALIVE)
             self.openai_client = OpenAI(
                 api_key=self.openai_api_key,
-                base_url=self.openai_base_url
+                base_url=self.openai_base_url,
+                max_retries=settings.UPSTREAM_MAX_RETRIES,
+                timeout=self._timeout(),
+                http_client=DefaultHttpxClient(limits=limits)
             )
             self.async_openai_client = AsyncOpenAI(
                 api_key=self.openai_api_key,
-                base_url=self.openai_base_url
+                base_url=self.openai_base_url,
+                max_retries=settings.UPSTREAM_MAX_RETRIES,
+                timeout=self._timeout(),
+                http_client=DefaultAsyncHttpxClient(limits=limits)
+            )
+            logger.info(
+                f"✓ OpenAI client initialized (pool: {settings.OPENAI_MAX_CONNECTIONS} connections, "
+                f"{settings.OPENAI_MAX_KEEPALIVE} keep-alive)"
             )
-            logger.info("✓ OpenAI client initialized")
         else:
             self.openai_client = None
             self.async_openai_client = None
             logger.warning("OpenAI API key not found, OpenAI calls will fail")
 
+    @staticmethod
+    def _pool_limits(max_connections: int, max_keepalive: int) -> httpx.Limits:
+        """HTTP connection pool limits for one provider"""
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=get_router_settings().UPSTREAM_KEEPALIVE_EXPIRY
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        """Upstream timeouts (the pool timeout bounds waiting for a free connection)"""
+        settings = get_router_settings()
+        return httpx.Timeout(
+            settings.UPSTREAM_READ_TIMEOUT,
+            connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+            pool=settings.MODEL_QUEUE_TIMEOUT
+        )
+
+    @staticmethod
+    def _observe_completion(model: str, elapsed: float):
+        """Record a non-streaming call (the first byte arrives with the full body)"""
+        UPSTREAM_TTFB_SECONDS.labels(model=model).observe(elapsed)
+        UPSTREAM_TOTAL_SECONDS.labels(model=model).observe(elapsed)
+
     def _get_client(self, model: str) -> Optional[OpenAI]:
         """Get appropriate client for model"""
         if "deepseek" in model.lower():
@@ -81,6 +175,100 @@ class LLMClient:
             logger.warning(f"Unknown model '{model}', using async DeepSeek client")
             return self.async_deepseek_client
 
+    @staticmethod
+    def _upstream(model: str) -> str:
+        """Upstream provider serving a model (same rules as _get_client)"""
+        name = model.lower()
+        if "deepseek" not in name and ("gpt" in name or "o1" in name):
+            return "openai"
+        return "deepseek"
+
+    def _breaker(self, model: str) -> Optional[CircuitBreaker]:
+        """Circuit breaker of a model's upstream (None when disabled)"""
+        if not get_router_settings().ENABLE_CIRCUIT_BREAKER:
+            return None
+        return self.breakers.get(self._upstream(model))
+
+    def _admit(self, model: str) -> Optional[BreakerCall]:
+        """
+        Check a model's circuit breaker before calling it.
+
+        Returns:
+            The admitted call to report the outcome through (None when breakers are disabled)
+
+        Raises:
+            CircuitOpenError: If the upstream's circuit is open
+        """
+        breaker = self._breaker(model)
+        if breaker is None:
+            return None
+        breaker_call = breaker.allow()
+        if breaker_call is None:
+            raise CircuitOpenError(model, breaker.upstream, breaker.retry_after())
+        return breaker_call
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds after which a call to `model` is hedged (None: not hedged)"""
+        settings = get_router_settings()
+        window = self.latencies.get(model)
+        if not settings.ENABLE_HEDGING or window is None or len(window) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        return max(settings.HEDGE_MIN_DELAY, window.percentile(settings.HEDGE_PERCENTILE))
+
+    def _record_latency(self, model: str, latency: float):
+        window = self.latencies.get(model)
+        if window is None:
+            window = self.latencies[model] = LatencyWindow(get_router_settings().HEDGE_LATENCY_WINDOW)
+        window.add(latency)
+
+    def _record_completion_tokens(self, model: str, tokens: int):
+        """Fold a finished call's completion length into the model's average (streams: chunks ~ tokens)"""
+        average = self.completion_tokens.get(model)
+        if average is None:
+            self.completion_tokens[model] = float(tokens)
+        else:
+            self.completion_tokens[model] = average + COMPLETION_TOKENS_EWMA_ALPHA * (tokens - average)
+
+    def _record_cancelled(self, model: str, generated: int, max_tokens: Optional[int]):
+        """
+        Count a cancelled upstream call and the completion tokens it will no longer generate.
+
+        Args:
+            model: Model called
+            generated: Tokens (stream chunks) already received
+            max_tokens: Request's max_tokens, which caps the expected completion
+        """
+        UPSTREAM_CANCELLED_CALLS.labels(model=model).inc()
+        expected = self.completion_tokens.get(model, max_tokens or 0)
+        if max_tokens:
+            expected = min(expected, max_tokens)
+        saved = round(expected) - generated
+        if saved > 0:
+            UPSTREAM_TOKENS_SAVED.labels(model=model).inc(saved)
+        logger.info(f"Cancelled {model} call after {generated} tokens (~{max(saved, 0)} tokens saved)")
+
+    def _stream_model(self, model: str) -> Tuple[str, Optional[BreakerCall]]:
+        """
+        Model to stream from: the requested one, or its fallback while the requested upstream's circuit is open.
+
+        Streams are not hedged, so the chosen model's breaker is admitted
+        (see _admit) here.
+
+        Returns:
+            (model, admitted call to report the stream's outcome through)
+        """
+        try:
+            return model, self._admit(model)
+        except CircuitOpenError:
+            fallback = get_router_settings().FALLBACK_MODELS.get(model)
+            if not fallback:
+                raise
+            breaker_call = self._admit(fallback)
+            UPSTREAM_FAILOVERS.labels(model=model, reason='circuit_open').inc()
+            self.hedge_stats['failovers'] += 1
+            logger.warning(f"{model} circuit open, streaming from fallback {fallback}")
+            return fallback, breaker_call
+
     def chat_completion(
         self,
         request: ChatCompletionRequest,
@@ -134,6 +322,7 @@ class LLMClient:
         try:
             response = client.chat.completions.create(**params)
             elapsed = time.time() - start_time
+            self._observe_completion(request.model, elapsed)
             logger.info(f"✓ LLM response received in {elapsed:.2f}s")
 
             # Convert to our response format
@@ -152,14 +341,11 @@ class LLMClient:
                     )
                     for choice in response.choices
                 ],
-                usage=ChatCompletionUsage(
-                    prompt_tokens=response.usage.prompt_tokens,
-                    completion_tokens=response.usage.completion_tokens,
-                    total_tokens=response.usage.total_tokens
-                )
+                usage=_convert_usage(response.usage)
             )
 
         except Exception as e:
+            UPSTREAM_ERRORS.labels(model=request.model).inc()
             logger.error(f"LLM API call failed: {e}")
             raise
 
@@ -171,24 +357,84 @@ class LLMClient:
         """
         Call LLM API for chat completion (asynchronous).
 
+        Without a fallback model this is a single upstream call. With one
+        (ROUTER_FALLBACK_MODELS), the fallback is called when the primary
+        fails (or its circuit is open) and, once the primary has run longer
+        than its recent p95 latency, in parallel as a hedge; the first
+        successful answer wins and the other call is cancelled.
+
         Args:
             request: Original chat completion request
             enhanced_messages: Optional enhanced messages (with routing improvements)
 
         Returns:
-            ChatCompletionResponse
+            ChatCompletionResponse (its `model` is the model that answered)
         """
-        client = self._get_async_client(request.model)
+        messages = enhanced_messages or request.messages
+        primary_model = request.model
+        fallback_model = get_router_settings().FALLBACK_MODELS.get(primary_model)
+        if not fallback_model or fallback_model == primary_model:
+            return await self._completion_call(request, messages, primary_model)
+
+        primary = asyncio.create_task(self._completion_call(request, messages, primary_model))
+        calls = {primary: primary_model}
+        try:
+            done, _ = await asyncio.wait(calls, timeout=self._hedge_delay(primary_model))
+            if not done:
+                logger.info(f"{primary_model} slower than its p{get_router_settings().HEDGE_PERCENTILE * 100:.0f}, hedging with {fallback_model}")
+                self.hedge_stats['hedged'] += 1
+                calls[asyncio.create_task(self._completion_call(request, messages, fallback_model))] = fallback_model
+
+            pending = set(calls)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    if len(calls) > 1:
+                        winner = 'primary' if task is primary else 'fallback'
+                        HEDGED_CALLS.labels(model=primary_model, winner=winner).inc()
+                        self.hedge_stats[f'won_by_{winner}'] += 1
+                        for loser in pending:
+                            HEDGE_WASTED_CALLS.labels(model=calls[loser]).inc()
+                            self.hedge_stats['wasted'] += 1
+                    return task.result()
+
+            # Every call made so far failed
+            error = primary.exception()
+            if len(calls) > 1:
+                HEDGED_CALLS.labels(model=primary_model, winner='none').inc()
+                raise error
+            if not _should_fail_over(error):
+                raise error
+
+            reason = 'circuit_open' if isinstance(error, CircuitOpenError) else 'error'
+            UPSTREAM_FAILOVERS.labels(model=primary_model, reason=reason).inc()
+            self.hedge_stats['failovers'] += 1
+            logger.warning(f"{primary_model} unavailable ({error}), failing over to {fallback_model}")
+            return await self._completion_call(request, messages, fallback_model)
+        finally:
+            for task in calls:
+                if not task.done():
+                    task.cancel()
+
+    async def _completion_call(
+        self,
+        request: ChatCompletionRequest,
+        messages: List[ChatMessage],
+        model: str
+    ) -> ChatCompletionResponse:
+        """One non-streaming upstream call to `model`, behind its circuit breaker and concurrency limit"""
+        client = self._get_async_client(model)
         if not client:
-            raise ValueError(f"No async API client available for model: {request.model}")
+            raise ValueError(f"No async API client available for model: {model}")
+        breaker = self._admit(model)
 
-        # Use enhanced messages if provided
-        messages = enhanced_messages or request.messages
         messages_dict = [{"role": m.role, "content": m.content} for m in messages]
 
         # Build API parameters
         params = {
-            "model": request.model,
+            "model": model,
             "messages": messages_dict,
             "temperature": request.temperature,
             "top_p": request.top_p,
@@ -207,12 +453,21 @@ class LLMClient:
             params["user"] = request.user
 
         # Call LLM API
-        logger.info(f"Calling {request.model} API (async)...")
+        logger.info(f"Calling {model} API (async)...")
         start_time = time.time()
+        upstream_started = False
 
         try:
-            response = await client.chat.completions.create(**params)
+            async with self.limiters.get(model).slot():
+                upstream_started = True
+                response = await client.chat.completions.create(**params)
             elapsed = time.time() - start_time
+            self._observe_completion(model, elapsed)
+            if response.usage is not None:
+                self._record_completion_tokens(model, response.usage.completion_tokens)
+            self._record_latency(model, elapsed)
+            if breaker is not None:
+                breaker.record_success(elapsed)
             logger.info(f"✓ LLM response received in {elapsed:.2f}s")
 
             return ChatCompletionResponse(
@@ -230,16 +485,23 @@ class LLMClient:
                     )
                     for choice in response.choices
                 ],
-                usage=ChatCompletionUsage(
-                    prompt_tokens=response.usage.prompt_tokens,
-                    completion_tokens=response.usage.completion_tokens,
-                    total_tokens=response.usage.total_tokens
-                )
+                usage=_convert_usage(response.usage)
             )
 
+        except UpstreamBusyError as e:
+            _record_outcome(breaker, e)
+            raise
         except Exception as e:
+            _record_outcome(breaker, e)
+            UPSTREAM_ERRORS.labels(model=model).inc()
             logger.error(f"Async LLM API call failed: {e}")
             raise
+        except BaseException as e:
+            # Cancelled (hedge loser, deadline)
+            _record_outcome(breaker, e)
+            if upstream_started:
+                self._record_cancelled(model, 0, request.max_tokens)
+            raise
 
     async def async_chat_completion_stream(
         self,
@@ -258,15 +520,180 @@ class LLMClient:
         Yields:
             Server-sent events (SSE) formatted chunks
         """
-        client = self._get_async_client(request.model)
+        model, breaker = self._stream_model(request.model)
+        client = self._get_async_client(model)
         if not client:
-            raise ValueError(f"No async API client available for model: {request.model}")
+            _record_outcome(breaker, None)
+            raise ValueError(f"No async API client available for model: {model}")
+
+        params = self._stream_params(request, enhanced_messages, model)
 
+        logger.info(f"Calling {model} API (streaming)...")
+
+        timer = StreamTimer(model)
+        upstream_started = False
+
+        try:
+            async with self.limiters.get(model).slot():
+                upstream_started = True
+                stream = await client.chat.completions.create(**params)
+
+                # Generate unique ID
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                created = int(time.time())
+                first_chunk = True
+
+                async for chunk in stream:
+                    timer.chunk()
+
+                    # Build chunk response
+                    chunk_data = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": []
+                    }
+
+                    # Add routing decision to first chunk
+                    if first_chunk and routing_decision:
+                        chunk_data["x_routing_decision"] = routing_decision
+                        first_chunk = False
+
+                    # Add delta content
+                    for choice in chunk.choices:
+                        chunk_data["choices"].append({
+                            "index": choice.index,
+                            "delta": {
+                                "role": choice.delta.role if choice.delta.role else None,
+                                "content": choice.delta.content if choice.delta.content else ""
+                            },
+                            "finish_reason": choice.finish_reason
+                        })
+
+                    # Format as SSE
+                    yield f"data: {dumps(chunk_data).decode('utf-8')}\n\n"
+
+                # Send [DONE] marker
+                yield "data: [DONE]\n\n"
+                timer.finish()
+                self._record_completion_tokens(model, timer.chunks)
+                if breaker is not None:
+                    breaker.record_success(timer.ttfb)
+
+        except UpstreamBusyError as e:
+            _record_outcome(breaker, e)
+            raise
+        except Exception as e:
+            _record_outcome(breaker, e)
+            UPSTREAM_ERRORS.labels(model=model).inc()
+            logger.error(f"Streaming LLM API call failed: {e}")
+            raise
+        except BaseException as e:
+            # Client went away or the deadline passed: the upstream stream is closed on the way out
+            _record_outcome(breaker, e)
+            if upstream_started:
+                self._record_cancelled(model, timer.chunks, request.max_tokens)
+            raise
+
+    async def async_chat_completion_relay(
+        self,
+        request: ChatCompletionRequest,
+        enhanced_messages: Optional[List[ChatMessage]] = None,
+        routing_decision: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Relay an upstream streaming completion without parsing it.
+
+        Upstream SSE bytes are forwarded as received. Only the first data
+        frame is decoded and re-encoded, to inject `x_routing_decision` (and a
+        completion id if upstream sent none); every later frame costs no JSON
+        work at all.
+
+        Args:
+            request: Original chat completion request
+            enhanced_messages: Optional enhanced messages (with routing improvements)
+            routing_decision: Routing decision to include in first chunk
+
+        Yields:
+            Raw server-sent events (SSE) bytes
+        """
+        model, breaker = self._stream_model(request.model)
+        client = self._get_async_client(model)
+        if not client:
+            _record_outcome(breaker, None)
+            raise ValueError(f"No async API client available for model: {model}")
+
+        params = self._stream_params(request, enhanced_messages, model)
+
+        logger.info(f"Calling {model} API (streaming relay)...")
+
+        timer = StreamTimer(model)
+        upstream_started = False
+
+        try:
+            async with self.limiters.get(model).slot():
+                upstream_started = True
+                async with client.chat.completions.with_streaming_response.create(**params) as response:
+                    # Bytes held back until the first data frame is complete
+                    pending: Optional[bytes] = b""
+
+                    async for data in response.iter_bytes():
+                        timer.chunk(_count_frames(data))
+
+                        if pending is None:
+                            yield data
+                            continue
+
+                        pending += data
+                        rewritten = _rewrite_first_frame(pending, routing_decision)
+                        if rewritten is not None:
+                            pending = None
+                            yield rewritten
+                        elif len(pending) > FIRST_FRAME_MAX_BYTES:
+                            # No data frame to annotate in sight: stop buffering the stream
+                            logger.warning(
+                                f"No SSE data frame in the first {len(pending)} bytes from {model}, "
+                                f"relaying without routing metadata"
+                            )
+                            yield pending
+                            pending = None
+
+                    if pending:
+                        yield pending
+
+                timer.finish()
+                self._record_completion_tokens(model, timer.chunks)
+                if breaker is not None:
+                    breaker.record_success(timer.ttfb)
+
+        except UpstreamBusyError as e:
+            _record_outcome(breaker, e)
+            raise
+        except Exception as e:
+            _record_outcome(breaker, e)
+            UPSTREAM_ERRORS.labels(model=model).inc()
+            logger.error(f"Streaming LLM API relay failed: {e}")
+            raise
+        except BaseException as e:
+            # Client went away or the deadline passed: the upstream stream is closed on the way out
+            _record_outcome(breaker, e)
+            if upstream_started:
+                self._record_cancelled(model, timer.chunks, request.max_tokens)
+            raise
+
+    @staticmethod
+    def _stream_params(
+        request: ChatCompletionRequest,
+        enhanced_messages: Optional[List[ChatMessage]],
+        model: str
+    ) -> Dict[str, Any]:
+        """Build API parameters for a streaming call to `model`"""
         messages = enhanced_messages or request.messages
         messages_dict = [{"role": m.role, "content": m.content} for m in messages]
 
         params = {
-            "model": request.model,
+            "model": model,
             "messages": messages_dict,
             "temperature": request.temperature,
             "top_p": request.top_p,
@@ -277,52 +704,204 @@ class LLMClient:
         if request.stop:
             params["stop"] = request.stop
 
-        logger.info(f"Calling {request.model} API (streaming)...")
+        return params
 
-        try:
-            stream = await client.chat.completions.create(**params)
-
-            # Generate unique ID
-            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
-            created = int(time.time())
-            first_chunk = True
-
-            async for chunk in stream:
-                # Build chunk response
-                chunk_data = {
-                    "id": completion_id,
-                    "object": "chat.completion.chunk",
-                    "created": created,
-                    "model": request.model,
-                    "choices": []
-                }
-
-                # Add routing decision to first chunk
-                if first_chunk and routing_decision:
-                    chunk_data["x_routing_decision"] = routing_decision
-                    first_chunk = False
-
-                # Add delta content
-                for choice in chunk.choices:
-                    chunk_data["choices"].append({
-                        "index": choice.index,
-                        "delta": {
-                            "role": choice.delta.role if choice.delta.role else None,
-                            "content": choice.delta.content if choice.delta.content else ""
-                        },
-                        "finish_reason": choice.finish_reason
-                    })
-
-                # Format as SSE
-                import json
-                yield f"data: {json.dumps(chunk_data)}\n\n"
-
-            # Send [DONE] marker
-            yield "data: [DONE]\n\n"
+    async def async_embedding(self, text: str, model: str) -> List[float]:
+        """
+        Embed a text with the OpenAI-compatible embeddings API (pooled async client).
 
-        except Exception as e:
-            logger.error(f"Streaming LLM API call failed: {e}")
-            raise
+        Args:
+            text: Text to embed
+            model: Embedding model (must match the model the searched index was built with)
+
+        Returns:
+            Embedding vector
+        """
+        if self.async_openai_client is None:
+            raise ValueError(f"No API client available for embedding model: {model}")
+
+        start_time = time.time()
+        async with self.limiters.get(model).slot():
+            response = await self.async_openai_client.embeddings.create(model=model, input=text)
+        self._observe_completion(model, time.time() - start_time)
+        return response.data[0].embedding
+
+    def record_prefix_cache_usage(self, model: str, routing_tier: str, usage: ChatCompletionUsage):
+        """
+        Account an upstream call's prompt tokens and prefix cache hits to its routing tier.
+
+        Args:
+            model: Model called
+            routing_tier: Routing tier of the request ('disabled' when routing was skipped)
+            usage: Usage reported by the upstream
+        """
+        cached = usage.cached_tokens
+        UPSTREAM_PROMPT_TOKENS.labels(model=model, routing_tier=routing_tier).inc(usage.prompt_tokens)
+        UPSTREAM_CACHED_PROMPT_TOKENS.labels(model=model, routing_tier=routing_tier).inc(cached)
+
+        totals = self.prefix_cache_usage.setdefault(routing_tier, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += usage.prompt_tokens
+        totals[2] += cached
+
+    def get_prefix_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get upstream prefix cache hit ratio per routing tier"""
+        return {
+            tier: {
+                'calls': calls,
+                'prompt_tokens': prompt_tokens,
+                'cached_tokens': cached_tokens,
+                'hit_ratio': cached_tokens / prompt_tokens if prompt_tokens else 0.0
+            }
+            for tier, (calls, prompt_tokens, cached_tokens) in self.prefix_cache_usage.items()
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-model concurrency limiter statistics (queue depth, wait times)"""
+        return self.limiters.get_stats()
+
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Get circuit breaker states and failover / hedging counts"""
+        return {
+            'breakers': self.breakers.get_stats(),
+            'hedging': dict(self.hedge_stats),
+            'p95_latency': {
+                model: window.percentile(0.95) for model, window in self.latencies.items()
+            }
+        }
+
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error is the upstream's fault (client errors such as 400/401 are not)"""
+    return not (isinstance(error, APIStatusError) and 400 <= error.status_code < 500 and error.status_code != 429)
+
+
+def _should_fail_over(error: BaseException) -> bool:
+    """Whether a failed call is worth retrying on the fallback model"""
+    return isinstance(error, Exception) and _is_upstream_failure(error)
+
+
+def _record_outcome(breaker: Optional[BreakerCall], error: Optional[BaseException]):
+    """
+    Report a call that did not succeed to its breaker.
+
+    Upstream faults count as failures; client errors show the upstream is
+    up; calls that never reached it (limiter rejection, missing client) or
+    were abandoned (cancelled) only release a half-open probe.
+    """
+    if breaker is None:
+        return
+    if error is None or isinstance(error, UpstreamBusyError) or not isinstance(error, Exception):
+        breaker.record_cancelled()
+    elif _is_upstream_failure(error):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _convert_usage(usage) -> ChatCompletionUsage:
+    """Convert SDK usage, keeping the provider's prefix cache fields (OpenAI details / DeepSeek extras)"""
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return ChatCompletionUsage(
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        total_tokens=usage.total_tokens,
+        prompt_tokens_details=(
+            PromptTokensDetails(cached_tokens=details.cached_tokens) if details is not None else None
+        ),
+        prompt_cache_hit_tokens=getattr(usage, 'prompt_cache_hit_tokens', None),
+        prompt_cache_miss_tokens=getattr(usage, 'prompt_cache_miss_tokens', None)
+    )
+
+
+def _count_frames(data: bytes) -> int:
+    """Number of SSE frames a read completes (LF framing checked first: the common case)"""
+    frames = data.count(b"\n\n")
+    if b"\r" in data:
+        # Raw CR only appears in line endings (JSON escapes it inside strings)
+        frames += data.count(b"\r\n\r\n") + data.count(b"\r\r")
+    return frames
+
+
+def _rewrite_first_frame(
+    buffer: bytes,
+    routing_decision: Optional[Dict[str, Any]]
+) -> Optional[bytes]:
+    """
+    Rewrite the first `data: {...}` SSE frame in a buffer.
+
+    Adds `x_routing_decision` and fills in a missing completion id. Comment,
+    event and [DONE] frames before it are kept as they are.
+
+    Args:
+        buffer: Stream bytes received so far
+        routing_decision: Routing decision to inject (None: leave as is)
+
+    Returns:
+        The rewritten buffer, or None if no complete data frame was received yet
+    """
+    start = 0
+    while True:
+        separator = SSE_FRAME_END_RE.search(buffer, start)
+        if separator is None:
+            return None
+
+        end = separator.start()
+        frame = buffer[start:end]
+        payload = frame[5:].strip() if frame.startswith(b"data:") else b""
+        if payload.startswith(b"{"):
+            chunk = json.loads(payload)
+            if routing_decision is not None:
+                chunk["x_routing_decision"] = routing_decision
+            if not chunk.get("id"):
+                chunk["id"] = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            return buffer[:start] + b"data: " + dumps(chunk) + buffer[end:]
+
+        start = separator.end()
+
+
+async def with_routing_decision(
+    stream: AsyncIterator[Any],
+    routing_decision: Optional[Dict[str, Any]]
+) -> AsyncIterator[Any]:
+    """
+    Inject a routing decision into the first data frame of an SSE stream.
+
+    Used for coalesced streams: the shared upstream stream carries no routing
+    metadata, and each subscriber adds its own decision. Works on both the
+    relay (bytes) and the re-encoded (str) chunk streams.
+
+    Args:
+        stream: SSE chunk iterator (bytes or str chunks)
+        routing_decision: Routing decision to inject (None: pass through)
+
+    Yields:
+        The stream's chunks, the first data frame annotated
+    """
+    try:
+        # Bytes held back until the first data frame is complete (None: done)
+        pending: Optional[bytes] = b"" if routing_decision else None
+        text = False
+
+        async for chunk in stream:
+            if pending is None:
+                yield chunk
+                continue
+
+            text = isinstance(chunk, str)
+            pending += chunk.encode('utf-8') if text else chunk
+            rewritten = _rewrite_first_frame(pending, routing_decision)
+            if rewritten is None and len(pending) <= FIRST_FRAME_MAX_BYTES:
+                continue
+
+            out = pending if rewritten is None else rewritten
+            pending = None
+            yield out.decode('utf-8') if text else out
+
+        if pending:
+            yield pending.decode('utf-8') if text else pending
+    finally:
+        await stream.aclose()
 
 
 # Global instance
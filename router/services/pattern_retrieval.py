@@ -0,0 +1,250 @@
+"""
+Async pattern retrieval for chat completions.
+
+The error-pattern store built by the optimizer (`PatternStorage`: FAISS index
+over pattern embeddings) is searched with the question's embedding, which
+needs a remote embeddings call. `PatternRetriever` keeps that off the
+critical path:
+
+- the retrieval starts before routing and runs concurrently with weakness
+  matching; its result is only used if the decision says `use_patterns`
+- query embeddings are cached (LRU + TTL), and concurrent misses for the same
+  question share one embeddings call
+- the caller waits at most ROUTER_PATTERN_RETRIEVAL_TIMEOUT (or what is left of
+  its latency budget) and otherwise answers without patterns; an embeddings
+  call that misses the timeout still completes in the background and fills
+  the cache, so the next identical question gets its patterns
+- the FAISS search runs in a worker thread
+
+With a local embedding provider (EMBEDDING_PROVIDER=hashed_ngram in the
+optimizer settings) there is no remote call at all: the question is embedded
+in the same worker thread as the search, well under a millisecond.
+
+The store is loaded once at startup; `faiss` and the optimizer package are
+optional dependencies, and retrieval stays off if they or the store are missing.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from router.config.settings import get_router_settings
+from router.core.decision_cache import DecisionCache
+from router.core.latency_budget import PATTERN_RETRIEVAL, get_stage_latencies
+from router.services.llm_client import get_llm_client
+from router.utils.metrics import PATTERN_RETRIEVALS, record_cache_lookup
+
+# Questions are truncated like the optimizer's Embedder does (embedding model token limit)
+MAX_QUERY_CHARS = 5500
+
+
+class PatternRetriever:
+    """
+    Retrieves relevant error patterns for a question without blocking the event loop.
+
+    Features:
+    - Query embedding cache with in-flight sharing; timed-out embeddings still fill it
+    - Timeout per retrieval (the caller continues without patterns)
+    - FAISS search in a worker thread
+    - Outcome counters (ok, timeout, error, unused)
+    """
+
+    def __init__(self, storage=None):
+        """
+        Initialize pattern retriever.
+
+        Args:
+            storage: Pattern store with `patterns`, `settings.EMBEDDING_MODEL`,
+                     `embedder` and `search(embedding, k, category, threshold=...)`
+                     (default: load the optimizer's PatternStorage)
+        """
+        settings = get_router_settings()
+        self.storage = storage if storage is not None else self._load_storage()
+        self.embeddings = DecisionCache(
+            max_size=settings.EMBEDDING_CACHE_MAX_SIZE,
+            ttl=settings.EMBEDDING_CACHE_TTL
+        )
+        self._pending: Dict[str, asyncio.Task] = {}
+
+        self.retrievals = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.unused = 0
+
+    @staticmethod
+    def _load_storage():
+        """Load the optimizer's pattern store (None if unavailable or empty)"""
+        try:
+            from optimizer.core.pattern_storage import PatternStorage
+        except ImportError as e:
+            logger.warning(f"Pattern retrieval disabled: {e}")
+            return None
+
+        storage = PatternStorage()
+        if not storage.patterns:
+            logger.warning("Pattern retrieval disabled: no error patterns in storage")
+            return None
+        logger.info(
+            f"✓ Pattern retrieval: {len(storage.patterns)} error patterns "
+            f"({storage.embedder.provider.name} embeddings)"
+        )
+        return storage
+
+    @property
+    def available(self) -> bool:
+        """Whether there is a pattern store to search"""
+        return self.storage is not None
+
+    async def _embed(self, question: str) -> List[float]:
+        """Embed a question, sharing the call with concurrent misses and caching the result"""
+        task = self._pending.get(question)
+        if task is None:
+            task = asyncio.create_task(
+                get_llm_client().async_embedding(question, self.storage.settings.EMBEDDING_MODEL)
+            )
+            self._pending[question] = task
+            task.add_done_callback(lambda done: self._embedded(question, done))
+        # Shielded: a caller timing out must not cancel the call the cache is waiting for
+        return await asyncio.shield(task)
+
+    def _embedded(self, question: str, task: asyncio.Task):
+        """Cache a finished embeddings call"""
+        self._pending.pop(question, None)
+        if not task.cancelled() and task.exception() is None:
+            self.embeddings.put(question, task.result())
+
+    @property
+    def provider(self):
+        """The store's embedding provider (None if it does not expose one)"""
+        return getattr(getattr(self.storage, 'embedder', None), 'provider', None)
+
+    @property
+    def local(self) -> bool:
+        """Whether the store embeds questions locally (no embeddings call)"""
+        return self.provider is not None and not self.provider.remote
+
+    def _search_local(self, question: str, **kwargs) -> List[Dict[str, Any]]:
+        """Embed a question with the store's local provider and search (worker thread)"""
+        return self.storage.search(self.storage.embedder.embed(question), **kwargs)
+
+    async def _retrieve(self, question: str, category: Optional[str]) -> List[Dict[str, Any]]:
+        settings = get_router_settings()
+        question = question[:MAX_QUERY_CHARS]
+
+        if self.local:
+            return await asyncio.to_thread(
+                self._search_local,
+                question,
+                k=settings.PATTERN_RETRIEVAL_TOP_K,
+                category=category,
+                threshold=settings.PATTERN_MIN_RELEVANCE
+            )
+
+        embedding = self.embeddings.get(question)
+        record_cache_lookup('embedding', embedding is not None)
+        if embedding is None:
+            embedding = await self._embed(question)
+
+        return await asyncio.to_thread(
+            self.storage.search,
+            embedding,
+            k=settings.PATTERN_RETRIEVAL_TOP_K,
+            category=category,
+            threshold=settings.PATTERN_MIN_RELEVANCE
+        )
+
+    async def retrieve(
+        self,
+        question: str,
+        category: Optional[str],
+        timeout: float
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Retrieve the error patterns most relevant to a question.
+
+        Args:
+            question: The question text
+            category: Optional entity type filter (diseases, vaccines, ...)
+            timeout: Seconds to wait for the embedding and search
+
+        Returns:
+            Relevant patterns (possibly empty), or None if retrieval timed out or failed
+        """
+        self.retrievals += 1
+        latencies = get_stage_latencies()
+        start = time.perf_counter()
+        try:
+            patterns = await asyncio.wait_for(self._retrieve(question, category), max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            PATTERN_RETRIEVALS.labels(result='timeout').inc()
+            # The true latency is only known to be above the timeout, which a tight
+            # latency budget may have cut to a few ms: never let it lower the estimate
+            estimate = latencies.estimate(PATTERN_RETRIEVAL)
+            if estimate is None:
+                estimate = get_router_settings().PATTERN_RETRIEVAL_TIMEOUT
+            latencies.observe(PATTERN_RETRIEVAL, max(timeout, estimate))
+            logger.info(f"Pattern retrieval timed out after {timeout * 1000:.0f}ms, continuing without patterns")
+            return None
+        except Exception as e:
+            self.errors += 1
+            PATTERN_RETRIEVALS.labels(result='error').inc()
+            latencies.observe(PATTERN_RETRIEVAL, time.perf_counter() - start)
+            logger.warning(f"Pattern retrieval failed: {e}")
+            return None
+
+        latencies.observe(PATTERN_RETRIEVAL, time.perf_counter() - start)
+        PATTERN_RETRIEVALS.labels(result='ok').inc()
+        return patterns
+
+    def discard(self, retrieval: asyncio.Task):
+        """Drop a speculative retrieval the routing decision does not need (its embedding is still cached)"""
+        self.unused += 1
+        PATTERN_RETRIEVALS.labels(result='unused').inc()
+        retrieval.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retrieval statistics"""
+        return {
+            'patterns': len(self.storage.patterns) if self.storage is not None else 0,
+            'embedding_provider': self.provider.name if self.provider is not None else None,
+            'retrievals': self.retrievals,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'unused': self.unused,
+            'embeddings_in_flight': len(self._pending),
+            'embedding_cache': self.embeddings.get_stats()
+        }
+
+
+def format_pattern_context(patterns: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Render retrieved patterns as prompt context (the guideline, or the description if none).
+
+    Args:
+        patterns: Retrieved patterns, most relevant first
+
+    Returns:
+        Context text, or None if there are no patterns
+    """
+    lines = [
+        f"- {pattern.get('guideline') or pattern.get('description', '')}"
+        for pattern in patterns
+        if pattern.get('guideline') or pattern.get('description')
+    ]
+    return "\n".join(lines) or None
+
+
+# Global pattern retriever (per worker)
+_pattern_retriever: Optional[PatternRetriever] = None
+
+
+def get_pattern_retriever() -> Optional[PatternRetriever]:
+    """Get the pattern retriever (None unless ROUTER_ENABLE_PATTERN_RETRIEVAL and a store is available)"""
+    global _pattern_retriever
+    if not get_router_settings().ENABLE_PATTERN_RETRIEVAL:
+        return None
+    if _pattern_retriever is None:
+        _pattern_retriever = PatternRetriever()
+    return _pattern_retriever if _pattern_retriever.available else None
@@ -0,0 +1,320 @@
+"""
+Exact-match cache for deterministic chat completions.
+
+Requests with `temperature` at or below ROUTER_RESPONSE_CACHE_MAX_TEMPERATURE
+(0 by default) are answered from the cache when the final (enhanced) message
+list, model and sampling parameters match a previous call exactly.
+
+Tiers:
+- memory: LRU with TTL (per worker)
+- disk: optional sqlite file shared by all workers and kept across restarts
+
+Entries are tagged with the routing data version (entity/weakness file
+mtimes); when the decision engine publishes new data, the memory tier is
+cleared and disk entries from other data versions are purged.
+
+Request handlers use `async_get` / `async_put`: the memory tier is checked
+inline, while sqlite reads and writes run on a single dedicated thread so
+disk I/O (including WAL writes) never blocks the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+
+from router.api.llm_schemas import ChatCompletionRequest, ChatCompletionResponse, ChatMessage
+from router.config.settings import get_router_settings
+from router.core.decision_cache import DecisionCache
+from router.core.decision_engine import get_decision_engine
+from router.core.routing_snapshot import RoutingSnapshot
+from router.utils.json_codec import dumps
+from router.utils.metrics import record_cache_lookup
+
+
+def data_version(snapshot: RoutingSnapshot) -> str:
+    """Routing data version: identical across workers that loaded the same files"""
+    return f"{snapshot.entity_mtime}:{snapshot.weakness_mtime}"
+
+
+def is_deterministic(request: ChatCompletionRequest, max_temperature: float = 0.0) -> bool:
+    """Whether identical requests get the same completion (low temperature, a single choice)"""
+    temperature = request.temperature if request.temperature is not None else 1.0
+    return temperature <= max_temperature and (request.n or 1) == 1
+
+
+def completion_fingerprint(
+    request: ChatCompletionRequest,
+    messages: List[ChatMessage],
+    version: str = ''
+) -> str:
+    """
+    Hash of everything that determines an upstream completion.
+
+    Args:
+        request: Chat completion request (model and sampling parameters)
+        messages: Messages actually sent upstream (after prompt enhancement)
+        version: Optional extra discriminator (e.g. routing data version)
+
+    Returns:
+        Hex digest
+    """
+    payload = {
+        'version': version,
+        'model': request.model,
+        'messages': [[m.role, m.content, m.name] for m in messages],
+        'temperature': request.temperature,
+        'top_p': request.top_p,
+        'n': request.n,
+        'max_tokens': request.max_tokens,
+        'stop': request.stop,
+        'presence_penalty': request.presence_penalty,
+        'frequency_penalty': request.frequency_penalty,
+        'logit_bias': request.logit_bias
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + optional sqlite) cache of chat completion responses.
+
+    Features:
+    - Keys on final messages, model and every sampling parameter
+    - Only deterministic requests are cached (temperature threshold, n=1)
+    - TTL on both tiers
+    - Invalidated when routing data changes
+    - Replay of cached responses as SSE for stream=true
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: float = 3600,
+        db_path: Optional[Path] = None,
+        max_temperature: float = 0.0
+    ):
+        """
+        Initialize response cache.
+
+        Args:
+            max_size: Maximum number of responses in the memory tier
+            ttl: Time-to-live per entry in seconds
+            db_path: sqlite file for the disk tier (None: memory only)
+            max_temperature: Highest temperature considered deterministic
+        """
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.memory = DecisionCache(max_size=max_size, ttl=ttl)
+
+        self.db_path = Path(db_path) if db_path else None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # One thread: disk writes are applied in order, and never on the event loop
+        self._db_executor: Optional[ThreadPoolExecutor] = None
+        self.disk_hits = 0
+        self.disk_misses = 0
+        if self.db_path is not None:
+            self._open_db()
+
+    def _open_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, data_version TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, body TEXT NOT NULL)"
+        )
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='response-cache')
+        logger.info(f"Response cache disk tier: {self.db_path}")
+
+    def accepts(self, request: ChatCompletionRequest) -> bool:
+        """Whether the request is deterministic enough to cache"""
+        return is_deterministic(request, self.max_temperature)
+
+    @staticmethod
+    def make_key(
+        request: ChatCompletionRequest,
+        messages: List[ChatMessage],
+        version: str
+    ) -> str:
+        """Build cache key from the final message list, model, sampling parameters and data version"""
+        return completion_fingerprint(request, messages, version)
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        body = self.memory.get(key)
+        record_cache_lookup('response', body is not None)
+        return body
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up the disk tier (blocking), promoting a hit to the memory tier"""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT body FROM responses WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        record_cache_lookup('response_disk', row is not None)
+        if row is None:
+            self.disk_misses += 1
+            return None
+
+        self.disk_hits += 1
+        body = json.loads(row[0])
+        self.memory.put(key, body)
+        return body
+
+    def _disk_put(self, key: str, body: Dict[str, Any], version: str):
+        """Write an entry to the disk tier (blocking)"""
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, data_version, expires_at, body) VALUES (?, ?, ?, ?)",
+                    (key, version, time.time() + self.ttl, json.dumps(body, ensure_ascii=False))
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache disk write failed: {e}")
+
+    @staticmethod
+    def _storable(response: ChatCompletionResponse) -> Dict[str, Any]:
+        """Cached form of a response (without router metadata)"""
+        return response.model_dump(exclude={'x_routing_decision', 'x_enhanced_prompt_used'})
+
+    def get(self, key: str) -> Optional[ChatCompletionResponse]:
+        """
+        Look up a cached response (memory first, then disk; blocking).
+
+        Returns:
+            A fresh ChatCompletionResponse copy, or None on miss
+        """
+        body = self._memory_get(key)
+        if body is None and self._db is not None:
+            body = self._disk_get(key)
+        return ChatCompletionResponse.model_validate(body) if body is not None else None
+
+    async def async_get(self, key: str) -> Optional[ChatCompletionResponse]:
+        """
+        Look up a cached response without blocking the event loop (disk tier on the cache thread).
+
+        Returns:
+            A fresh ChatCompletionResponse copy, or None on miss
+        """
+        body = self._memory_get(key)
+        if body is None and self._db is not None:
+            body = await asyncio.get_running_loop().run_in_executor(self._db_executor, self._disk_get, key)
+        return ChatCompletionResponse.model_validate(body) if body is not None else None
+
+    def put(self, key: str, response: ChatCompletionResponse, version: str):
+        """Store an upstream response (blocking)"""
+        body = self._storable(response)
+        self.memory.put(key, body)
+        if self._db is not None:
+            self._disk_put(key, body, version)
+
+    def async_put(self, key: str, response: ChatCompletionResponse, version: str):
+        """
+        Store an upstream response from the event loop.
+
+        The memory tier is updated at once; the disk write is queued on the
+        cache thread and not waited for, so it does not delay the response.
+        """
+        body = self._storable(response)
+        self.memory.put(key, body)
+        if self._db is not None:
+            self._db_executor.submit(self._disk_put, key, body, version)
+
+    def invalidate(self, snapshot: RoutingSnapshot):
+        """Drop entries built against other routing data (decision engine reload listener)"""
+        self.memory.clear()
+        if self._db is not None:
+            # Queued behind pending writes, so entries of the old version cannot land after the purge
+            self._db_executor.submit(self._disk_purge, data_version(snapshot))
+
+    def _disk_purge(self, version: str):
+        """Delete disk entries of other data versions and expired ones (blocking)"""
+        with self._db_lock:
+            deleted = self._db.execute(
+                "DELETE FROM responses WHERE data_version != ? OR expires_at <= ?",
+                (version, time.time())
+            ).rowcount
+        if deleted:
+            logger.info(f"Response cache: purged {deleted} stale disk entries")
+
+    @staticmethod
+    def replay_sse(
+        response: ChatCompletionResponse,
+        routing_decision: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """
+        Replay a cached response as a chat.completion.chunk SSE stream.
+
+        Args:
+            response: Cached response
+            routing_decision: Routing decision to include in the first chunk
+
+        Yields:
+            SSE formatted chunks, ending with [DONE]
+        """
+        base = {
+            "id": response.id,
+            "object": "chat.completion.chunk",
+            "created": response.created,
+            "model": response.model
+        }
+
+        first = {**base, "choices": [
+            {
+                "index": choice.index,
+                "delta": {"role": choice.message.role, "content": choice.message.content},
+                "finish_reason": None
+            }
+            for choice in response.choices
+        ]}
+        if routing_decision:
+            first["x_routing_decision"] = routing_decision
+        yield f"data: {dumps(first).decode('utf-8')}\n\n"
+
+        last = {**base, "choices": [
+            {"index": choice.index, "delta": {}, "finish_reason": choice.finish_reason}
+            for choice in response.choices
+        ]}
+        yield f"data: {dumps(last).decode('utf-8')}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            'memory': self.memory.get_stats(),
+            'disk': {
+                'path': str(self.db_path),
+                'hits': self.disk_hits,
+                'misses': self.disk_misses
+            } if self.db_path is not None else None,
+            'max_temperature': self.max_temperature
+        }
+
+
+# Singleton instance
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the global response cache (None unless ROUTER_ENABLE_RESPONSE_CACHE)"""
+    global _response_cache
+    settings = get_router_settings()
+    if _response_cache is None and settings.ENABLE_RESPONSE_CACHE:
+        _response_cache = ResponseCache(
+            max_size=settings.RESPONSE_CACHE_MAX_SIZE,
+            ttl=settings.RESPONSE_CACHE_TTL,
+            db_path=settings.RESPONSE_CACHE_DB_PATH,
+            max_temperature=settings.RESPONSE_CACHE_MAX_TEMPERATURE
+        )
+        get_decision_engine().add_reload_listener(_response_cache.invalidate)
+    return _response_cache
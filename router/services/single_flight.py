@@ -0,0 +1,197 @@
+"""
+Single-flight coalescing of identical in-flight chat completions.
+
+When a question trends, many identical requests (same final messages, model
+and sampling parameters) arrive within the same second. For deterministic
+requests (the router does not coalesce sampled ones, which should get
+independent completions) only the first one (the leader) calls upstream; the
+others (followers) share its result:
+
+- completions: followers await the leader's upstream call and get a copy of
+  its response
+- streams: the upstream stream is drained by a background task into a chunk
+  log; every subscriber, leader included, replays the log from the start and
+  then follows it live, so late followers receive every chunk already sent;
+  the shared stream carries no routing metadata, each subscriber adds its own
+
+The upstream call belongs to the flight, not to the leader, so a leader whose
+client disconnects does not break its followers. A call is cancelled only once
+its last waiter (completions) or subscriber (streams) has gone.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from router.api.llm_schemas import ChatCompletionResponse
+from router.utils.metrics import COALESCED_REQUESTS
+
+
+class _Broadcast:
+    """Chunk log of one upstream stream, shared by all of its subscribers"""
+
+    __slots__ = ('chunks', 'done', 'error', 'subscribers', 'task', '_changed')
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        """Wake up subscribers waiting for new chunks"""
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent upstream calls.
+
+    Features:
+    - One upstream call per key at a time (completions and streams separately)
+    - Streaming followers replay chunks already sent, then follow live
+    - The upstream call is cancelled once nobody is waiting for it
+    - Coalesced request counters
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+
+        self.coalesced_completions = 0
+        self.coalesced_streams = 0
+
+    async def do(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[ChatCompletionResponse]]
+    ) -> Tuple[ChatCompletionResponse, bool]:
+        """
+        Run `call`, or join an identical call already in flight.
+
+        Args:
+            key: Request fingerprint
+            call: Factory for the upstream call
+
+        Returns:
+            (response, shared) - followers get a deep copy and shared=True
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced_completions += 1
+            COALESCED_REQUESTS.labels(mode='completion').inc()
+        else:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            response = await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    logger.info("All waiters gone, cancelling upstream call")
+                    task.cancel()
+
+        return (response.model_copy(deep=True), True) if shared else (response, False)
+
+    def stream(
+        self,
+        key: str,
+        open_stream: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Subscribe to the upstream stream for `key`, starting it if needed.
+
+        Args:
+            key: Request fingerprint
+            open_stream: Factory for the upstream SSE chunk iterator
+
+        Returns:
+            Iterator over every chunk of the shared stream, from the first one
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._pump(key, broadcast, open_stream))
+        else:
+            self.coalesced_streams += 1
+            COALESCED_REQUESTS.labels(mode='stream').inc()
+
+        broadcast.subscribers += 1
+        return self._subscribe(broadcast)
+
+    async def _pump(
+        self,
+        key: str,
+        broadcast: _Broadcast,
+        open_stream: Callable[[], AsyncIterator[str]]
+    ):
+        """Drain the upstream stream into the broadcast log"""
+        try:
+            async for chunk in open_stream():
+                broadcast.chunks.append(chunk)
+                broadcast.notify()
+        except asyncio.CancelledError:
+            broadcast.error = ConnectionError("Upstream stream cancelled")
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            broadcast.done = True
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            broadcast.notify()
+
+    async def _subscribe(self, broadcast: _Broadcast) -> AsyncIterator[str]:
+        """Replay the chunk log, then follow it until the stream ends"""
+        position = 0
+        try:
+            while True:
+                if position < len(broadcast.chunks):
+                    chunk = broadcast.chunks[position]
+                    position += 1
+                    yield chunk
+                elif broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                else:
+                    await broadcast.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                logger.info("All stream subscribers gone, cancelling upstream stream")
+                broadcast.task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing statistics"""
+        return {
+            'in_flight_completions': len(self._calls),
+            'in_flight_streams': len(self._streams),
+            'coalesced_completions': self.coalesced_completions,
+            'coalesced_streams': self.coalesced_streams
+        }
+
+
+# Singleton instance
+_single_flight: Optional[SingleFlight] = None
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the global single-flight coordinator"""
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight()
+    return _single_flight
@@ -0,0 +1,115 @@
+"""
+Fast JSON encoding for router responses.
+
+Uses orjson when installed and falls back to the stdlib `json` module.
+
+Matched weakness patterns are the bulk of every routing payload, and all of
+their fields except `match_score` are fixed for the lifetime of a routing
+snapshot. `WeaknessMatch` carries those fields pre-serialized (built once per
+weakness per snapshot by the matcher), and `dumps` splices the bytes into the
+output instead of re-encoding each pattern on every request.
+"""
+
+import json
+import re
+import uuid
+from typing import Any, Dict, List
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# orjson >= 3.9 embeds pre-serialized JSON natively
+_Fragment = getattr(orjson, 'Fragment', None)
+
+# Older orjson: fragments are emitted as unique placeholder strings, then substituted
+_PLACEHOLDER = f"__json_fragment_{uuid.uuid4().hex}_"
+_PLACEHOLDER_RE = re.compile(b'"' + _PLACEHOLDER.encode('ascii') + b'(\\d+)"')
+
+
+class WeaknessMatch(dict):
+    """
+    Matched weakness pattern: a plain dict plus its pre-serialized static fields.
+
+    Behaves exactly like the dict the matcher used to return (and pickles like
+    one for the process pool); only `dumps` looks at `static_json`.
+    """
+
+    __slots__ = ('static_json',)
+
+    def __init__(self, static_json: bytes, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.static_json = static_json
+
+    def __reduce__(self):
+        return (WeaknessMatch, (self.static_json, dict(self)))
+
+    def to_json(self) -> bytes:
+        """Serialized pattern: cached static fields + this match's score"""
+        return b'{' + self.static_json + b',"match_score":' + dumps(self['match_score']) + b'}'
+
+
+def encode_fields(fields: Dict[str, Any]) -> bytes:
+    """Serialize a dict's members without the enclosing braces (for `WeaknessMatch.static_json`)"""
+    return dumps(fields)[1:-1]
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not serialize natively (with OPT_PASSTHROUGH_SUBCLASS)"""
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, (list, tuple)):
+        return list(obj)
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _stdlib_default(obj: Any) -> Any:
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON, splicing in pre-serialized weakness matches.
+
+    Args:
+        obj: JSON-compatible value (dicts, lists, scalars, pydantic models)
+
+    Returns:
+        JSON bytes
+    """
+    if orjson is None:
+        return json.dumps(
+            obj, ensure_ascii=False, separators=(',', ':'), default=_stdlib_default
+        ).encode('utf-8')
+
+    if _Fragment is not None:
+        def default(o):
+            if isinstance(o, WeaknessMatch):
+                return _Fragment(o.to_json())
+            return _default(o)
+
+        return orjson.dumps(obj, default=default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+    fragments: List[bytes] = []
+
+    def default(o):
+        if isinstance(o, WeaknessMatch):
+            fragments.append(o.to_json())
+            return f"{_PLACEHOLDER}{len(fragments) - 1}"
+        return _default(o)
+
+    data = orjson.dumps(obj, default=default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+    if fragments:
+        data = _PLACEHOLDER_RE.sub(lambda m: fragments[int(m.group(1))], data)
+    return data
@@ -0,0 +1,387 @@
+"""
+Prometheus metrics for the Smart Router.
+
+Exposes per-stage latency histograms (routing decision, prompt build,
+upstream time-to-first-byte and total time), streaming chunk rates, cache
+lookups, data reloads, event-loop lag and in-flight request gauges on a
+separate port (ROUTER_METRICS_PORT) when ROUTER_ENABLE_METRICS is on.
+
+`prometheus_client` is optional: without it, or with metrics disabled, every
+metric below is a no-op and nothing is exported.
+
+Multiple workers: set PROMETHEUS_MULTIPROC_DIR to an empty directory before
+starting the server so all workers record into shared files; whichever worker
+binds METRICS_PORT first serves the aggregate.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+
+from router.config.settings import get_router_settings
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+
+# Latency buckets (seconds)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+UPSTREAM_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+RELOAD_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHUNK_RATE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Paths tracked by the in-flight gauge; anything else is reported as 'other'
+TRACKED_PATHS = frozenset({
+    '/api/v1/route', '/api/v1/route:batch', '/api/v1/prompt', '/api/v1/health',
+    '/api/v1/stats', '/api/v1/reload', '/v1/chat/completions'
+})
+
+
+class _NoopMetric:
+    """Stand-in for every metric type when metrics are disabled"""
+
+    def labels(self, *args, **kwargs) -> '_NoopMetric':
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, value: float = 1):
+        pass
+
+    def dec(self, value: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+
+def metrics_enabled() -> bool:
+    """Whether metrics are recorded (ROUTER_ENABLE_METRICS and prometheus_client installed)"""
+    return prometheus_client is not None and get_router_settings().ENABLE_METRICS
+
+
+def _histogram(name: str, documentation: str, labelnames=(), buckets=FAST_BUCKETS):
+    if not metrics_enabled():
+        return _NoopMetric()
+    return prometheus_client.Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+def _counter(name: str, documentation: str, labelnames=()):
+    if not metrics_enabled():
+        return _NoopMetric()
+    return prometheus_client.Counter(name, documentation, labelnames)
+
+
+def _gauge(name: str, documentation: str, labelnames=()):
+    if not metrics_enabled():
+        return _NoopMetric()
+    return prometheus_client.Gauge(name, documentation, labelnames, multiprocess_mode='livesum')
+
+
+# ===== Metric definitions =====
+
+ROUTING_DECISION_SECONDS = _histogram(
+    'router_routing_decision_seconds',
+    'Time to compute a routing decision',
+    ['routing_tier']
+)
+PROMPT_BUILD_SECONDS = _histogram(
+    'router_prompt_build_seconds',
+    'Time to produce an enhanced prompt, by prompt cache result (hit/miss/disabled)',
+    ['result']
+)
+PROMPT_SECTIONS_DROPPED = _counter(
+    'router_prompt_sections_dropped_total',
+    'Prompt sections dropped to fit the prompt token budget',
+    ['section']
+)
+UPSTREAM_TTFB_SECONDS = _histogram(
+    'router_upstream_ttfb_seconds',
+    'Time from upstream request to first response byte (first chunk when streaming)',
+    ['model'],
+    buckets=UPSTREAM_BUCKETS
+)
+UPSTREAM_TOTAL_SECONDS = _histogram(
+    'router_upstream_total_seconds',
+    'Total upstream call time, including the full stream',
+    ['model'],
+    buckets=UPSTREAM_BUCKETS
+)
+UPSTREAM_ERRORS = _counter(
+    'router_upstream_errors_total',
+    'Failed upstream calls',
+    ['model']
+)
+UPSTREAM_QUEUE_DEPTH = _gauge(
+    'router_upstream_queue_depth',
+    'Requests waiting for a per-model upstream concurrency slot',
+    ['model']
+)
+UPSTREAM_QUEUE_WAIT_SECONDS = _histogram(
+    'router_upstream_queue_wait_seconds',
+    'Time spent waiting for a per-model upstream concurrency slot',
+    ['model'],
+    buckets=UPSTREAM_BUCKETS
+)
+UPSTREAM_QUEUE_REJECTIONS = _counter(
+    'router_upstream_queue_rejections_total',
+    'Requests rejected by the per-model upstream limiter (queue_full, timeout)',
+    ['model', 'reason']
+)
+UPSTREAM_PROMPT_TOKENS = _counter(
+    'router_upstream_prompt_tokens_total',
+    'Prompt tokens billed by the upstream, by routing tier',
+    ['model', 'routing_tier']
+)
+UPSTREAM_CACHED_PROMPT_TOKENS = _counter(
+    'router_upstream_cached_prompt_tokens_total',
+    'Prompt tokens served from the upstream prefix cache (hit ratio = cached / prompt tokens)',
+    ['model', 'routing_tier']
+)
+ADMISSION_QUEUE_DEPTH = _gauge(
+    'router_admission_queue_depth',
+    'Chat completion requests waiting for admission'
+)
+ADMISSION_QUEUE_WAIT_SECONDS = _histogram(
+    'router_admission_queue_wait_seconds',
+    'Time admitted chat completion requests waited in the admission queue',
+    buckets=UPSTREAM_BUCKETS
+)
+ADMISSION_REJECTIONS = _counter(
+    'router_admission_rejections_total',
+    'Chat completion requests shed by admission control (queue_full -> 429, timeout -> 503)',
+    ['reason']
+)
+BREAKER_STATE = _gauge(
+    'router_upstream_breaker_state',
+    'Upstream circuit breaker state (0 closed, 1 half-open, 2 open)',
+    ['upstream']
+)
+BREAKER_TRANSITIONS = _counter(
+    'router_upstream_breaker_transitions_total',
+    'Upstream circuit breaker state changes, by new state',
+    ['upstream', 'state']
+)
+UPSTREAM_FAILOVERS = _counter(
+    'router_upstream_failovers_total',
+    'Calls sent to the fallback model instead of the requested one (circuit_open, error)',
+    ['model', 'reason']
+)
+HEDGED_CALLS = _counter(
+    'router_hedged_calls_total',
+    'Hedged calls sent to the fallback model, by which call answered first (primary, fallback, none)',
+    ['model', 'winner']
+)
+HEDGE_WASTED_CALLS = _counter(
+    'router_hedge_wasted_calls_total',
+    'Upstream calls cancelled because the other hedged call answered first',
+    ['model']
+)
+STREAM_CHUNKS = _counter(
+    'router_stream_chunks_total',
+    'Streamed chunks relayed to clients',
+    ['model']
+)
+STREAM_CHUNK_RATE = _histogram(
+    'router_stream_chunk_rate',
+    'Chunks per second over each streamed completion',
+    ['model'],
+    buckets=CHUNK_RATE_BUCKETS
+)
+STREAM_ABORTS = _counter(
+    'router_stream_aborts_total',
+    'Streams cut off before the upstream finished (disconnect, deadline)',
+    ['reason']
+)
+UPSTREAM_CANCELLED_CALLS = _counter(
+    'router_upstream_cancelled_calls_total',
+    'Upstream calls cancelled before completion (client gone, deadline, hedge loser)',
+    ['model']
+)
+UPSTREAM_TOKENS_SAVED = _counter(
+    'router_upstream_tokens_saved_total',
+    'Estimated completion tokens not generated because the upstream call was cancelled',
+    ['model']
+)
+COALESCED_REQUESTS = _counter(
+    'router_coalesced_requests_total',
+    'Requests served by joining an identical in-flight upstream call',
+    ['mode']
+)
+PATTERN_RETRIEVALS = _counter(
+    'router_pattern_retrievals_total',
+    'Pattern retrievals for chat completions (ok, timeout, error, unused)',
+    ['result']
+)
+CACHE_LOOKUPS = _counter(
+    'router_cache_lookups_total',
+    'Cache lookups by cache and result (hit ratio = hit / (hit + miss))',
+    ['cache', 'result']
+)
+RELOADS = _counter(
+    'router_reloads_total',
+    'Routing data reloads',
+    ['trigger']
+)
+RELOAD_SECONDS = _histogram(
+    'router_reload_seconds',
+    'Time to build and publish a new routing snapshot',
+    ['trigger'],
+    buckets=RELOAD_BUCKETS
+)
+EVENT_LOOP_LAG_SECONDS = _histogram(
+    'router_event_loop_lag_seconds',
+    'How late the event loop wakes a sleeping coroutine (time blocked by synchronous work)',
+    buckets=LOOP_LAG_BUCKETS
+)
+IN_FLIGHT_REQUESTS = _gauge(
+    'router_in_flight_requests',
+    'Requests currently being handled',
+    ['endpoint']
+)
+
+
+# Labelled children are looked up once: labels() costs more than the increment itself
+_cache_lookup_counters: Dict[Tuple[str, bool], Any] = {}
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    counter = _cache_lookup_counters.get((cache, hit))
+    if counter is None:
+        counter = _cache_lookup_counters[(cache, hit)] = CACHE_LOOKUPS.labels(
+            cache=cache, result='hit' if hit else 'miss'
+        )
+    counter.inc()
+
+
+class InFlightMiddleware:
+    """
+    ASGI middleware tracking in-flight HTTP requests per endpoint.
+
+    Implemented at the ASGI level (not as an `@app.middleware`) so that
+    streaming responses count as in flight until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get('path', '')
+        gauge = IN_FLIGHT_REQUESTS.labels(endpoint=path if path in TRACKED_PATHS else 'other')
+        gauge.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gauge.dec()
+
+
+class StreamTimer:
+    """Records TTFB, total time and chunk rate for one streamed upstream call"""
+
+    __slots__ = ('model', 'start', 'first_chunk_at', 'chunks')
+
+    def __init__(self, model: str):
+        self.model = model
+        self.start = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+        self.chunks = 0
+
+    @property
+    def ttfb(self) -> Optional[float]:
+        """Seconds to the first chunk (None before it arrived)"""
+        return None if self.first_chunk_at is None else self.first_chunk_at - self.start
+
+    def chunk(self, count: int = 1):
+        """Call for every read from upstream, with the number of chunks it completed"""
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+            UPSTREAM_TTFB_SECONDS.labels(model=self.model).observe(self.first_chunk_at - self.start)
+        self.chunks += count
+
+    def finish(self):
+        """Call once the stream has ended"""
+        end = time.perf_counter()
+        UPSTREAM_TOTAL_SECONDS.labels(model=self.model).observe(end - self.start)
+        if self.chunks:
+            STREAM_CHUNKS.labels(model=self.model).inc(self.chunks)
+            streaming_time = end - self.first_chunk_at
+            if streaming_time > 0:
+                STREAM_CHUNK_RATE.labels(model=self.model).observe(self.chunks / streaming_time)
+
+
+async def monitor_event_loop_lag(interval: Optional[float] = None):
+    """
+    Sample event-loop lag until cancelled.
+
+    Sleeps `interval` seconds and records how much later than requested the
+    loop resumed; sustained lag means synchronous work is blocking streams.
+
+    Args:
+        interval: Sampling interval in seconds (default: ROUTER_LOOP_LAG_INTERVAL)
+    """
+    interval = interval or get_router_settings().LOOP_LAG_INTERVAL
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - expected))
+
+
+# ===== Exporter =====
+
+_metrics_server_started = False
+
+
+def start_metrics_server(port: Optional[int] = None) -> bool:
+    """
+    Serve /metrics on a dedicated port (no-op if disabled or already started).
+
+    With several workers only the first one binds the port; the others log and
+    continue (their samples are still exported when PROMETHEUS_MULTIPROC_DIR
+    is set).
+
+    Args:
+        port: Port to listen on (default: ROUTER_METRICS_PORT)
+
+    Returns:
+        True if this process is serving metrics
+    """
+    global _metrics_server_started
+    if _metrics_server_started:
+        return True
+
+    settings = get_router_settings()
+    if not settings.ENABLE_METRICS:
+        return False
+    if prometheus_client is None:
+        logger.warning("prometheus_client not installed, metrics endpoint disabled")
+        return False
+
+    port = port or settings.METRICS_PORT
+    registry = prometheus_client.REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    try:
+        prometheus_client.start_http_server(port, registry=registry)
+    except OSError as e:
+        logger.info(f"Metrics port {port} not bound by this worker ({e})")
+        return False
+
+    _metrics_server_started = True
+    logger.info(f"📈 Metrics exported on http://{settings.HOST}:{port}/metrics")
+    return True
+
@@ -1,10 +1,43 @@
 """
 Prompt builder utility for constructing enhanced prompts with weakness patterns.
+
+Assembled prompts depend only on the base prompt, category rules, pattern
+retrieval context and the ordered weakness patterns, and the same weakness
+combinations recur constantly. They are memoized in a bounded LRU cache keyed
+on the text inputs plus the weakness-id tuple, which is cleared
+whenever the decision engine publishes new routing data.
+
+Enhancement can be held to a token budget (ROUTER_MAX_PROMPT_TOKENS, per tier
+or per request): `fit_to_budget` drops the lowest-value sections until the
+estimated prompt fits.
 """
 
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from loguru import logger
 
+from router.config.settings import get_router_settings
+from router.core.decision_cache import DecisionCache
+from router.core.decision_engine import get_decision_engine
+from router.core.routing_snapshot import RoutingSnapshot
+from router.utils.metrics import PROMPT_BUILD_SECONDS, PROMPT_SECTIONS_DROPPED, record_cache_lookup
+from router.utils.token_estimator import estimate_tokens
+
+
+# Per-result histogram children, bound once (labels() dominates a cache hit otherwise)
+_BUILD_SECONDS = {
+    result: PROMPT_BUILD_SECONDS.labels(result=result) for result in ('hit', 'miss', 'disabled')
+}
+
+
+# Weakness reminders are dropped lowest severity first, then lowest match score
+SEVERITY_RANK = {'critical': 3, 'major': 2, 'minor': 1}
+
+# Section headers, shared by assembly and budget accounting
+CATEGORY_RULES_HEADER = "\n\n## 领域专项规则\n\n"
+RAG_CONTEXT_HEADER = "\n\n## 权威医学参考资料\n\n"
+WEAKNESS_HEADER = "\n\n## ⚠️ 针对该问题类型的特别提醒\n"
+
 
 class PromptBuilder:
     """Build enhanced prompts with weakness pattern reminders"""
@@ -32,6 +65,16 @@ class PromptBuilder:
 3. 给出实用建议
 4. 说明何时需要就医"""
 
+    def __init__(self, cache: Optional[DecisionCache] = None):
+        """
+        Initialize prompt builder.
+
+        Args:
+            cache: Prompt cache (default: the shared cache from get_prompt_cache(),
+                   None when ROUTER_ENABLE_PROMPT_CACHE is off)
+        """
+        self.cache = cache if cache is not None else get_prompt_cache()
+
     def build_prompt(
         self,
         base_prompt: Optional[str] = None,
@@ -49,25 +92,7 @@ class PromptBuilder:
         Returns:
             Enhanced prompt string
         """
-        # Use default or provided base prompt
-        prompt = base_prompt or self.DEFAULT_BASE_PROMPT
-
-        # Add pattern retrieval context if provided
-        if rag_context:
-            prompt += f"\n\n## 权威医学参考资料\n\n{rag_context}"
-
-        # Add weakness pattern reminders
-        if weakness_patterns and len(weakness_patterns) > 0:
-            prompt += "\n\n## ⚠️ 针对该问题类型的特别提醒\n"
-
-            for i, pattern in enumerate(weakness_patterns, 1):
-                prompt_addition = pattern.get('prompt_addition', '')
-                if prompt_addition:
-                    prompt += f"\n{prompt_addition}\n"
-
-            logger.debug(f"Added {len(weakness_patterns)} weakness pattern reminders to prompt")
-
-        return prompt
+        return self._build(base_prompt, None, rag_context, weakness_patterns)
 
     def build_multipart_prompt(
         self,
@@ -94,27 +119,200 @@ class PromptBuilder:
         Returns:
             Complete enhanced prompt
         """
-        # Start with base
-        prompt = base_prompt or self.DEFAULT_BASE_PROMPT
+        return self._build(base_prompt, category_rules, rag_context, weakness_patterns)
+
+    def build_prompt_sections(
+        self,
+        base_prompt: Optional[str] = None,
+        weakness_patterns: Optional[List[Dict[str, Any]]] = None,
+        rag_context: Optional[str] = None,
+        category_rules: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Build the prompt split for upstream prefix caching (PROMPT_LAYOUT=prefix_cache).
 
-        # Tier 1: Category rules
+        The stable section is identical for every question sharing the same
+        base prompt and category rules, so the upstream can reuse its cached
+        prefix; question-specific content goes into the dynamic section, with
+        weakness reminders in weakness_id order so the same set always renders
+        the same text.
+
+        Args:
+            base_prompt: Base system prompt (uses default if not provided)
+            weakness_patterns: List of matched weakness patterns
+            rag_context: Optional pattern-retrieved context
+            category_rules: Optional category-specific guidelines
+
+        Returns:
+            (stable, dynamic) - dynamic is empty when there is nothing question-specific
+        """
+        stable = base_prompt or self.DEFAULT_BASE_PROMPT
         if category_rules:
-            prompt += f"\n\n## 领域专项规则\n\n{category_rules}"
+            stable = f"{stable}{CATEGORY_RULES_HEADER}{category_rules}"
+
+        if not rag_context and not weakness_patterns:
+            return stable, ''
+
+        ordered = sorted(weakness_patterns or (), key=lambda p: p.get('weakness_id') or '')
+        dynamic = self._build(None, None, rag_context, ordered, dynamic_only=True)
+        return stable, dynamic
+
+    def _build(
+        self,
+        base_prompt: Optional[str],
+        category_rules: Optional[str],
+        rag_context: Optional[str],
+        weakness_patterns: Optional[List[Dict[str, Any]]],
+        dynamic_only: bool = False
+    ) -> str:
+        """Serve the prompt from the cache, or assemble and cache it"""
+        start = time.perf_counter()
+
+        if self.cache is None:
+            prompt = self._assemble(base_prompt, category_rules, rag_context, weakness_patterns, dynamic_only)
+            _BUILD_SECONDS['disabled'].observe(time.perf_counter() - start)
+            return prompt
+
+        key = self._cache_key(base_prompt, category_rules, rag_context, weakness_patterns, dynamic_only)
+        prompt = self.cache.get(key)
+        record_cache_lookup('prompt', prompt is not None)
+
+        if prompt is None:
+            prompt = self._assemble(base_prompt, category_rules, rag_context, weakness_patterns, dynamic_only)
+            self.cache.put(key, prompt)
+            _BUILD_SECONDS['miss'].observe(time.perf_counter() - start)
+        else:
+            _BUILD_SECONDS['hit'].observe(time.perf_counter() - start)
+
+        return prompt
+
+    @staticmethod
+    def _cache_key(
+        base_prompt: Optional[str],
+        category_rules: Optional[str],
+        rag_context: Optional[str],
+        weakness_patterns: Optional[List[Dict[str, Any]]],
+        dynamic_only: bool
+    ) -> Tuple[Any, ...]:
+        """
+        Cache key: routing data generation, text inputs, ordered weakness ids.
+
+        The text inputs are keyed by value (hashed by the cache dict); weakness
+        ids stand for their prompt additions within one generation of routing
+        data, and patterns without an id are keyed on their text.
+        """
+        weakness_ids = tuple(
+            pattern.get('weakness_id') or pattern.get('prompt_addition', '')
+            for pattern in weakness_patterns or ()
+        )
+        return (
+            _prompt_cache_generation,
+            dynamic_only,
+            base_prompt or None,
+            category_rules or None,
+            rag_context or None,
+            weakness_ids
+        )
+
+    def _assemble(
+        self,
+        base_prompt: Optional[str],
+        category_rules: Optional[str],
+        rag_context: Optional[str],
+        weakness_patterns: Optional[List[Dict[str, Any]]],
+        dynamic_only: bool = False
+    ) -> str:
+        """Assemble the prompt sections in a single join (only the question-specific ones if dynamic_only)"""
+        parts = []
+
+        if not dynamic_only:
+            # Tier 0: Base prompt
+            parts.append(base_prompt or self.DEFAULT_BASE_PROMPT)
+
+            # Tier 1: Category rules
+            if category_rules:
+                parts.append(f"{CATEGORY_RULES_HEADER}{category_rules}")
 
         # Pattern Retrieval context
         if rag_context:
-            prompt += f"\n\n## 权威医学参考资料\n\n{rag_context}"
+            parts.append(f"{RAG_CONTEXT_HEADER}{rag_context}")
 
         # Tier 3: Weakness reminders
-        if weakness_patterns and len(weakness_patterns) > 0:
-            prompt += "\n\n## ⚠️ 针对该问题类型的特别提醒\n"
+        if weakness_patterns:
+            parts.append(WEAKNESS_HEADER)
 
             for pattern in weakness_patterns:
                 prompt_addition = pattern.get('prompt_addition', '')
                 if prompt_addition:
-                    prompt += f"\n{prompt_addition}\n"
+                    parts.append(f"\n{prompt_addition}\n")
 
-        return prompt
+            logger.debug(f"Added {len(weakness_patterns)} weakness pattern reminders to prompt")
+
+        prompt = ''.join(parts)
+        # A standalone dynamic section does not need the separator from the previous section
+        return prompt.lstrip('\n') if dynamic_only else prompt
+
+    def fit_to_budget(
+        self,
+        max_tokens: Optional[int],
+        base_prompt: Optional[str] = None,
+        weakness_patterns: Optional[List[Dict[str, Any]]] = None,
+        rag_context: Optional[str] = None,
+        category_rules: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Drop the lowest-value sections until the assembled prompt fits a token budget.
+
+        Sections go in this order: the pattern retrieval context (bulk
+        reference text), then weakness reminders from lowest severity / match
+        score up, then category rules. The base prompt is always kept, even if
+        it alone exceeds the budget.
+
+        Args:
+            max_tokens: Token budget for the whole prompt (None: no budget)
+            base_prompt: Base system prompt (uses default if not provided)
+            weakness_patterns: Matched weakness patterns
+            rag_context: Pattern-retrieved context
+            category_rules: Category-specific guidelines
+
+        Returns:
+            (weakness_patterns, rag_context, category_rules) that fit, patterns in their original order
+        """
+        weakness_patterns = list(weakness_patterns or ())
+        if max_tokens is None:
+            return weakness_patterns, rag_context, category_rules
+
+        drop_order = sorted(
+            range(len(weakness_patterns)),
+            key=lambda i: (
+                SEVERITY_RANK.get(weakness_patterns[i].get('severity'), 0),
+                weakness_patterns[i].get('match_score', 0.0)
+            )
+        )
+        steps = (
+            (['rag_context'] if rag_context else [])
+            + ['weakness'] * len(weakness_patterns)
+            + (['category_rules'] if category_rules else [])
+        )
+
+        kept = weakness_patterns
+        dropped = set()
+        for section in steps:
+            prompt = self._assemble(base_prompt, category_rules, rag_context, kept)
+            if estimate_tokens(prompt) <= max_tokens:
+                break
+            if section == 'rag_context':
+                rag_context = None
+            elif section == 'weakness':
+                dropped.add(drop_order[len(dropped)])
+                kept = [p for i, p in enumerate(weakness_patterns) if i not in dropped]
+            else:
+                category_rules = None
+            PROMPT_SECTIONS_DROPPED.labels(section=section).inc()
+
+        if dropped:
+            logger.debug(f"Dropped {len(dropped)} weakness reminders to fit {max_tokens} prompt tokens")
+        return kept, rag_context, category_rules
 
     def format_weakness_section(
         self,
@@ -161,7 +359,36 @@ class PromptBuilder:
             'total_length': len(prompt),
             'char_count': len(prompt),
             'line_count': len(prompt.split('\n')),
-            'estimated_tokens': len(prompt) // 2,  # Rough estimate for Chinese
+            'estimated_tokens': estimate_tokens(prompt),
             'has_pattern_section': '权威医学参考资料' in prompt,
             'has_weakness_section': '特别提醒' in prompt
         }
+
+
+# Shared prompt cache (per process)
+_prompt_cache: Optional[DecisionCache] = None
+_prompt_cache_generation = 0
+
+
+def _invalidate_prompt_cache(snapshot: RoutingSnapshot):
+    """Decision engine reload listener: weakness ids may now map to new prompt additions"""
+    global _prompt_cache_generation
+    # Builds that started before the reload store under the old generation, which is never read again
+    _prompt_cache_generation = snapshot.generation
+    if _prompt_cache is not None:
+        _prompt_cache.clear()
+
+
+def get_prompt_cache() -> Optional[DecisionCache]:
+    """Get the shared prompt cache (None unless ROUTER_ENABLE_PROMPT_CACHE)"""
+    global _prompt_cache, _prompt_cache_generation
+    settings = get_router_settings()
+    if _prompt_cache is None and settings.ENABLE_PROMPT_CACHE:
+        engine = get_decision_engine()
+        _prompt_cache_generation = engine.generation
+        _prompt_cache = DecisionCache(
+            max_size=settings.PROMPT_CACHE_MAX_SIZE,
+            ttl=settings.PROMPT_CACHE_TTL
+        )
+        engine.add_reload_listener(_invalidate_prompt_cache)
+    return _prompt_cache
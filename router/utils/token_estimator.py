@@ -0,0 +1,58 @@
+"""
+Local token count estimator for mixed Chinese/English prompts.
+
+Approximates the upstream BPE tokenizers (DeepSeek / OpenAI) without loading
+a vocabulary: CJK characters cost ~0.6 tokens each, ASCII words one token per
+~6 letters, digit runs one token per 3 digits, and every other symbol
+(punctuation, full-width punctuation, emoji) one token. Newline runs count as
+one token; spaces are absorbed into the following word.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+# Tokens per CJK ideograph (DeepSeek: ~0.6, cl100k: ~0.7-1.0)
+CJK_TOKENS_PER_CHAR = 0.6
+# Letters per token in an ASCII word (common words are a single token)
+LETTERS_PER_TOKEN = 6
+DIGITS_PER_TOKEN = 3
+
+_CJK_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+_WORD_RE = re.compile(r'[A-Za-z]+')
+_DIGITS_RE = re.compile(r'[0-9]+')
+_NEWLINES_RE = re.compile(r'\n+')
+_SPACE_RE = re.compile(r'\s')
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text: Prompt text (any mix of Chinese and English)
+
+    Returns:
+        Estimated token count (0 for an empty text)
+    """
+    if not text:
+        return 0
+
+    cjk = len(_CJK_RE.findall(text))
+    words = _WORD_RE.findall(text)
+    digit_runs = _DIGITS_RE.findall(text)
+    newline_runs = len(_NEWLINES_RE.findall(text))
+
+    letters = sum(map(len, words))
+    digits = sum(map(len, digit_runs))
+    spaces = len(_SPACE_RE.findall(text))
+    symbols = len(text) - cjk - letters - digits - spaces
+
+    return (
+        math.ceil(cjk * CJK_TOKENS_PER_CHAR)
+        + sum((len(word) + LETTERS_PER_TOKEN - 1) // LETTERS_PER_TOKEN for word in words)
+        + sum((len(run) + DIGITS_PER_TOKEN - 1) // DIGITS_PER_TOKEN for run in digit_runs)
+        + newline_runs
+        + symbols
+    )
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Embedding Recall Comparison Tool
+Checks how closely a local embedding provider reproduces the remote model's
+pattern rankings (recall@k against the OpenAI index) and how much faster it embeds
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# Add repo root to path
+repo_root = Path(__file__).parent.parent
+sys.path.insert(0, str(repo_root))
+
+from optimizer.core.pattern_storage import PatternStorage
+from optimizer.pattern_db.embedder import Embedder
+from optimizer.pattern_db.embedding_providers import EMBEDDING_PROVIDERS, get_embedding_provider
+from loguru import logger
+
+
+def load_queries(queries_file: Path = None, max_examples: int = 50, storage: PatternStorage = None) -> List[Dict]:
+    """
+    Load evaluation queries.
+
+    Args:
+        queries_file: JSONL file with {"question": ..., "category": ...} per line
+        max_examples: Example questions to take from stored patterns (without a queries file)
+        storage: Pattern storage to take example questions from
+
+    Returns:
+        List of {"question", "category"} dicts
+    """
+    if queries_file is not None:
+        with open(queries_file, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # The threshold tool's test questions plus questions the patterns were mined from
+    from tools.optimize_threshold import TEST_QUESTIONS
+
+    queries = list(TEST_QUESTIONS)
+    for pattern in storage.patterns:
+        for example in pattern.get('examples', []):
+            if len(queries) >= len(TEST_QUESTIONS) + max_examples:
+                return queries
+            if isinstance(example, str) and example.strip():
+                queries.append({"question": example, "category": None})
+    return queries
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (0 for no values)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def compare(reference: PatternStorage, candidate: PatternStorage, queries: List[Dict], ks: List[int]) -> Dict:
+    """
+    Rank the stored patterns for each query with both stores and compare the rankings.
+
+    Args:
+        reference: Store searched with the remote model's embeddings
+        candidate: Store searched with the local provider's embeddings
+        queries: Evaluation queries
+        ks: Cut-offs to report recall at
+
+    Returns:
+        Recall@k (share of the reference top-k the candidate also ranks in its top-k),
+        top-1 agreement and embedding latency per provider
+    """
+    max_k = max(ks)
+    overlap = {k: 0.0 for k in ks}
+    top1_agree = 0
+    latencies = {'reference': [], 'candidate': []}
+    evaluated = 0
+
+    for query in queries:
+        question = query['question']
+        category = query.get('category')
+
+        rankings = {}
+        for name, storage in (('reference', reference), ('candidate', candidate)):
+            # Time the provider itself: the Embedder's disk cache would hide the round-trip
+            start = time.perf_counter()
+            embedding = storage.embedder.provider.embed(question)
+            latencies[name].append(time.perf_counter() - start)
+
+            patterns = storage.search(embedding, k=max_k, category=category, threshold=0.0)
+            rankings[name] = [p['id'] for p in patterns]
+
+        if not rankings['reference']:
+            continue
+        evaluated += 1
+
+        for k in ks:
+            expected = set(rankings['reference'][:k])
+            overlap[k] += len(expected & set(rankings['candidate'][:k])) / len(expected)
+        if rankings['candidate'][:1] == rankings['reference'][:1]:
+            top1_agree += 1
+
+    return {
+        'queries': evaluated,
+        'recall_at_k': {k: overlap[k] / evaluated if evaluated else 0.0 for k in ks},
+        'top1_agreement': top1_agree / evaluated if evaluated else 0.0,
+        'embed_latency_ms': {
+            name: {
+                'p50': percentile(samples, 0.50) * 1000,
+                'p95': percentile(samples, 0.95) * 1000
+            }
+            for name, samples in latencies.items()
+        }
+    }
+
+
+def main():
+    """Run the embedding recall comparison"""
+    parser = argparse.ArgumentParser(description="Compare a local embedding provider's pattern recall with the remote model")
+    parser.add_argument('--provider', default='hashed_ngram', choices=[p for p in EMBEDDING_PROVIDERS if p != 'openai'],
+                        help='Local provider to evaluate')
+    parser.add_argument('--queries', type=Path, default=None, help='JSONL file of {"question", "category"} queries')
+    parser.add_argument('--max-examples', type=int, default=50,
+                        help='Example questions taken from stored patterns (without --queries)')
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 3, 5], help='Recall cut-offs')
+    parser.add_argument('--output', type=Path, default=None, help='Write the results as JSON')
+    args = parser.parse_args()
+
+    logger.info("=" * 80)
+    logger.info("Embedding Recall Comparison")
+    logger.info("=" * 80)
+
+    reference = PatternStorage(Embedder(get_embedding_provider('openai')))
+    if reference.index is None or not reference.patterns:
+        logger.error("No OpenAI pattern index found. Build one with optimizer/scripts/optimize.py first.")
+        return 1
+
+    # Indexes the stored patterns with the local provider if it has no index yet
+    candidate = PatternStorage(Embedder(get_embedding_provider(args.provider)))
+    logger.info(f"✓ {len(reference.patterns)} patterns; reference: openai, candidate: {args.provider}")
+
+    queries = load_queries(args.queries, args.max_examples, reference)
+    logger.info(f"Comparing rankings on {len(queries)} queries...")
+    result = compare(reference, candidate, queries, sorted(set(args.k)))
+
+    print("\n" + "=" * 80)
+    print(f"EMBEDDING RECALL: {args.provider} vs openai ({result['queries']} queries)")
+    print("=" * 80)
+    for k, recall in result['recall_at_k'].items():
+        print(f"  Recall@{k:<3d}: {recall * 100:6.1f}%")
+    print(f"  Top-1 agreement: {result['top1_agreement'] * 100:.1f}%")
+    print()
+    print(f"{'Provider':>12} | {'p50 embed':>10} | {'p95 embed':>10}")
+    print("-" * 40)
+    for name, label in (('reference', 'openai'), ('candidate', args.provider)):
+        latency = result['embed_latency_ms'][name]
+        print(f"{label:>12} | {latency['p50']:>8.2f}ms | {latency['p95']:>8.2f}ms")
+    print()
+    print("Note: relevance scores are not comparable across providers -")
+    print("re-run tools/optimize_threshold.py to pick PATTERN_RELEVANCE_THRESHOLD for the local provider.")
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Results saved to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())